@@ -0,0 +1,165 @@
+"""
+Локальная замена Telegram Bot API для нагрузочных и сквозных проверок.
+
+FakeTelegramSession - сессия aiogram, которая не ходит в сеть: записывает
+каждый вызов метода Bot API и возвращает правдоподобный ответ (Message для
+send_*/edit_*, True для остальных). Бот с такой сессией работает с любым
+токеном правильного формата.
+
+UpdateFactory строит Update (сообщения, нажатия inline-кнопок и
+inline-запросы) для Dispatcher.feed_update.
+"""
+import asyncio
+import itertools
+import time
+import typing
+from datetime import datetime
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, Update, User
+
+FAKE_TOKEN = "123456:FAKE-token-for-local-tests"
+FAKE_BOT_USER = {"id": 123456, "is_bot": True, "first_name": "FakeMedsBot", "username": "fake_meds_bot"}
+
+
+class FakeTelegramSession(BaseSession):
+    """Сессия aiogram без сети: записывает вызовы и отвечает сама.
+
+    latency - искусственная задержка ответа "сервера" в секундах.
+    """
+
+    def __init__(self, latency: float = 0.0, record: bool = True):
+        super().__init__()
+        self.latency = latency
+        self.record = record
+        self.calls = []
+        self.call_counts = {}
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int = None):
+        name = type(method).__name__
+        self.call_counts[name] = self.call_counts.get(name, 0) + 1
+        if self.record:
+            self.calls.append((time.perf_counter(), method))
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        return self._result(bot, method)
+
+    def _result(self, bot: Bot, method: TelegramMethod):
+        if _returns(method, User):
+            return User.model_validate(FAKE_BOT_USER, context={"bot": bot})
+        if _returns(method, Message):
+            chat_id = getattr(method, "chat_id", None) or 0
+            text = getattr(method, "text", None) or getattr(method, "caption", None)
+            return Message.model_validate(
+                {
+                    "message_id": getattr(method, "message_id", None) or next(self._message_ids),
+                    "date": int(datetime.now().timestamp()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "from": FAKE_BOT_USER,
+                    "text": text,
+                },
+                context={"bot": bot}
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+    def texts(self):
+        """Тексты всех записанных сообщений (send_message, edit_message_text, подписи документов)."""
+        result = []
+        for _, method in self.calls:
+            text = getattr(method, "text", None) or getattr(method, "caption", None)
+            if isinstance(text, str):
+                result.append(text)
+        return result
+
+
+def _returns(method: TelegramMethod, result_type) -> bool:
+    """Проверяет, что метод возвращает result_type (или объединение с ним, как Message | bool)."""
+    returning = method.__returning__
+    return returning is result_type or result_type in typing.get_args(returning)
+
+
+def create_fake_bot(session: FakeTelegramSession = None) -> Bot:
+    """Бот с FakeTelegramSession и теми же настройками, что в main.py."""
+    return Bot(
+        token=FAKE_TOKEN,
+        session=session or FakeTelegramSession(),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+
+
+class UpdateFactory:
+    """Создаёт входящие обновления от имени пользователей."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1_000_000)
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+    def message(self, user_id: int, text: str) -> Update:
+        """Текстовое сообщение (команда или нажатие кнопки reply-клавиатуры)."""
+        return Update.model_validate(
+            {
+                "update_id": next(self._update_ids),
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(datetime.now().timestamp()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": self._user(user_id),
+                    "text": text,
+                },
+            },
+            context={"bot": self.bot}
+        )
+
+    def callback(self, user_id: int, data: str) -> Update:
+        """Нажатие inline-кнопки под сообщением бота."""
+        return Update.model_validate(
+            {
+                "update_id": next(self._update_ids),
+                "callback_query": {
+                    "id": str(next(self._update_ids)),
+                    "from": self._user(user_id),
+                    "chat_instance": str(user_id),
+                    "data": data,
+                    "message": {
+                        "message_id": next(self._message_ids),
+                        "date": int(datetime.now().timestamp()),
+                        "chat": {"id": user_id, "type": "private"},
+                        "from": FAKE_BOT_USER,
+                        "text": "...",
+                    },
+                },
+            },
+            context={"bot": self.bot}
+        )
+
+    def inline_query(self, user_id: int, query: str) -> Update:
+        """Inline-запрос «@bot query»."""
+        return Update.model_validate(
+            {
+                "update_id": next(self._update_ids),
+                "inline_query": {
+                    "id": str(next(self._update_ids)),
+                    "from": self._user(user_id),
+                    "query": query,
+                    "offset": "",
+                },
+            },
+            context={"bot": self.bot}
+        )
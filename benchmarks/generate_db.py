@@ -0,0 +1,153 @@
+"""
+Генерация синтетической БД для бенчмарков.
+
+   python benchmarks/generate_db.py --output /tmp/bench.db \
+       --households 10 --medicines 1000 --purchases 1000000 --users 10000
+
+Схема создаётся через db.init_db(), поэтому совпадает с рабочей. Лекарства,
+пользователи и покупки равномерно распределяются по домохозяйствам; данные
+детерминированы (--seed), чтобы результаты разных версий можно было сравнивать.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+
+BATCH_SIZE = 10000
+HISTORY_DAYS = 730
+
+
+def _batched(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def generate(path: str, households: int, medicines: int, purchases: int, users: int, seed: int = 42):
+    """Создаёт БД path с заданным объёмом данных. Существующий файл перезаписывается."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    db.DB_NAME = path
+    db.init_db()
+
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.now().isoformat()
+
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+
+    try:
+        household_ids = []
+        for index in range(households):
+            cursor.execute(
+                "INSERT INTO households (name, created_at) VALUES (?, ?)",
+                (f"Бенчмарк {index + 1}", now)
+            )
+            household_ids.append(cursor.lastrowid)
+
+        cursor.executemany(
+            "INSERT INTO users (tg_user_id, first_name, created_at, household_id) VALUES (?, ?, ?, ?)",
+            (
+                (10 ** 9 + index, f"user{index}", now, household_ids[index % households])
+                for index in range(users)
+            )
+        )
+
+        medicine_rows = []
+        for index in range(medicines):
+            daily_dose = rng.choice([0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 8.0])
+            medicine_rows.append((
+                household_ids[index % households],
+                f"Лекарство {index + 1}",
+                f"Medicamentum {index + 1}" if index % 3 else None,
+                daily_dose,
+                rng.randint(0, 200),
+                rng.choice([7, 14, 21]),
+                "10,30,100" if index % 2 else None,
+            ))
+        cursor.executemany(
+            """INSERT INTO medicines (household_id, name, latin_name, daily_dose, current_stock,
+                                      notify_before_days, package_sizes)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            medicine_rows
+        )
+
+        cursor.execute("SELECT id, household_id FROM medicines WHERE name LIKE 'Лекарство %' ORDER BY id")
+        medicine_households = dict(cursor.fetchall())
+        medicine_ids = list(medicine_households)
+
+        # Рецепт у двух лекарств из трёх, даты - от месяца назад до года вперёд
+        cursor.executemany(
+            "INSERT INTO prescriptions (medicine_id, expiry_date) VALUES (?, ?)",
+            (
+                (medicine_id, (today + timedelta(days=rng.randint(-30, 365))).isoformat())
+                for index, medicine_id in enumerate(medicine_ids) if index % 3 != 2
+            )
+        )
+
+        start = datetime.now() - timedelta(days=HISTORY_DAYS)
+        purchase_rows = (
+            (
+                medicine_id,
+                medicine_households[medicine_id],
+                rng.choice([10, 20, 30, 50, 100]) if rng.random() > 0.05 else -rng.randint(1, 10),
+                (start + timedelta(seconds=rng.randint(0, HISTORY_DAYS * 86400))).isoformat(),
+                round(rng.uniform(200, 5000), 2) if rng.random() > 0.3 else None,
+            )
+            for medicine_id in (rng.choice(medicine_ids) for _ in range(purchases))
+        )
+        for batch in _batched(purchase_rows):
+            cursor.executemany(
+                "INSERT INTO purchases (medicine_id, household_id, quantity, purchased_at, price)"
+                " VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+        db.rebuild_purchase_rollups(cursor)
+
+        for household_id in household_ids:
+            db.refresh_runout_dates(cursor, household_id)
+
+        conn.commit()
+        cursor.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    return household_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетической БД для бенчмарков")
+    parser.add_argument("--output", default="bench.db", help="путь к создаваемой БД")
+    parser.add_argument("--households", type=int, default=10)
+    parser.add_argument("--medicines", type=int, default=1000)
+    parser.add_argument("--purchases", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generate(args.output, args.households, args.medicines, args.purchases, args.users, args.seed)
+    print(
+        f"БД {args.output} создана за {time.perf_counter() - started:.1f} с: "
+        f"домохозяйств {args.households}, лекарств {args.medicines}, "
+        f"покупок {args.purchases}, пользователей {args.users}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Нагрузочный прогон хендлеров бота без Telegram и без токена.
+
+   python benchmarks/load_test.py --users 200 --rounds 3
+   python benchmarks/load_test.py --db /tmp/bench.db --users 500 --latency 0.02 --output load.json
+
+Диспетчер собирается так же, как в main.py (main.create_dispatcher), бот
+работает через FakeTelegramSession. Каждый смоделированный пользователь
+--rounds раз проходит сценарии: /add_purchase (выбор лекарства кнопкой,
+ввод количества), /set_prescription (выбор лекарства, ввод даты), кнопки
+«Запас наличия» и «Ближайшие закупки». Пользователи работают параллельно,
+обновления внутри одного пользователя идут по очереди, как в Telegram.
+
+Результат: обновлений в секунду и p50/p95/p99 времени обработки одного
+обновления (Dispatcher.feed_update), число вызовов Bot API по методам и
+ответов с ошибкой. Работа идёт на копии БД (или на новой БД во временной папке).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+import db  # noqa: E402
+from benchmarks.fake_telegram import FakeTelegramSession, UpdateFactory, create_fake_bot  # noqa: E402
+from utils.emojis import BUTTON_STATUS, BUTTON_REPORT, EMOJI_ERROR  # noqa: E402
+
+FIRST_USER_ID = 2_000_000_000
+
+
+def _percentile(values: list, percent: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+async def _user_flow(dp, bot, updates: UpdateFactory, user_id: int, medicine_ids: list,
+                     rounds: int, latencies: list):
+    """Сценарии одного пользователя; время каждого feed_update пишется в latencies (мс)."""
+    async def feed(update):
+        started = time.perf_counter()
+        await dp.feed_update(bot, update)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    for round_index in range(rounds):
+        medicine_id = medicine_ids[(user_id + round_index) % len(medicine_ids)]
+
+        await feed(updates.message(user_id, "/add_purchase"))
+        await feed(updates.callback(user_id, f"purchase_med_{medicine_id}"))
+        await feed(updates.message(user_id, str(1 + round_index % 5)))
+
+        await feed(updates.message(user_id, "/set_prescription"))
+        await feed(updates.callback(user_id, f"presc_med_{medicine_id}"))
+        await feed(updates.message(user_id, f"{1 + user_id % 28:02d}.{1 + round_index % 12:02d}.2030"))
+
+        await feed(updates.message(user_id, BUTTON_STATUS))
+        await feed(updates.message(user_id, BUTTON_REPORT))
+
+
+async def run_load(users: int, rounds: int, latency: float) -> dict:
+    # Хендлеры импортируются после настройки БД и списка разрешённых пользователей
+    from main import create_dispatcher
+    from services import meds_service
+
+    user_ids = [FIRST_USER_ID + index for index in range(users)]
+    config.ALLOWED_USER_IDS.extend(user_ids)
+
+    household_id = meds_service.get_user_household_id(user_ids[0], "load")
+    medicine_ids = [med["id"] for med in meds_service.get_all_medicines(household_id)]
+    if not medicine_ids:
+        raise SystemExit("В БД нет лекарств для сценариев")
+
+    session = FakeTelegramSession(latency=latency)
+    bot = create_fake_bot(session)
+    dp = create_dispatcher()
+    updates = UpdateFactory(bot)
+
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _user_flow(dp, bot, updates, user_id, medicine_ids, rounds, latencies)
+        for user_id in user_ids
+    ))
+    elapsed = time.perf_counter() - started
+    await bot.session.close()
+
+    errors = sum(1 for text in session.texts() if text.startswith(EMOJI_ERROR))
+    return {
+        "users": users,
+        "rounds": rounds,
+        "api_latency_s": latency,
+        "updates": len(latencies),
+        "duration_s": round(elapsed, 3),
+        "updates_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p95": round(_percentile(latencies, 95), 3),
+            "p99": round(_percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "api_calls": dict(sorted(session.call_counts.items())),
+        "error_replies": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон хендлеров с фальшивым Bot API")
+    parser.add_argument("--db", help="исходная БД (копируется); по умолчанию - новая БД из конфига")
+    parser.add_argument("--users", type=int, default=100, help="число параллельных пользователей")
+    parser.add_argument("--rounds", type=int, default=3, help="сколько раз каждый проходит сценарии")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа Bot API, секунд")
+    parser.add_argument("--output", help="файл для результатов JSON (по умолчанию - stdout)")
+    args = parser.parse_args()
+
+    # Логи хендлеров на каждое обновление искажают замер
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_db = os.path.join(tmp, "load.db")
+        if args.db:
+            shutil.copyfile(args.db, work_db)
+        db.DB_NAME = work_db
+        db.init_db()
+
+        report = asyncio.run(run_load(args.users, args.rounds, args.latency))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
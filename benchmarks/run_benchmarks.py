@@ -0,0 +1,231 @@
+"""
+Бенчмарки сервисных функций и ночных задач на синтетической БД.
+
+   python benchmarks/generate_db.py --output /tmp/bench.db
+   python benchmarks/run_benchmarks.py --db /tmp/bench.db --output results.json
+   python benchmarks/run_benchmarks.py --db /tmp/bench.db --compare results.json
+
+Каждый замер: один инструментированный запуск (число SQL-запросов через
+db.set_trace_callback и пик памяти через tracemalloc), затем --repeat чистых
+запусков для времени. Результат - JSON с метаданными (версии, размеры таблиц,
+коммит), чтобы сравнивать релизы между собой (--compare).
+
+Функции, меняющие данные (add_purchase, decrease_daily_stock, ночные задачи),
+выполняются на копии БД, если не указан --in-place.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+from services import meds_service, analytics, purchase_planner, calendar_feed, data_transfer  # noqa: E402
+from services import scheduler  # noqa: E402
+
+
+class FakeBot:
+    """Заглушка aiogram.Bot для ночных задач: только считает отправленные сообщения."""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent += 1
+
+
+class _NullWriter:
+    """Файловый объект, который только считает записанные байты."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def _pick_household(path: str) -> int:
+    """Домохозяйство с наибольшим числом лекарств - самый тяжёлый случай."""
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute(
+            "SELECT household_id FROM medicines GROUP BY household_id ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()
+        return row[0]
+    finally:
+        conn.close()
+
+
+def _table_sizes(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("households", "users", "medicines", "prescriptions", "purchases")
+        }
+    finally:
+        conn.close()
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_cases(household_id: int, medicine_id: int):
+    """Список замеров: имя -> функция без аргументов (может вернуть корутину)."""
+    bot = FakeBot()
+    return {
+        "meds_service.get_all_medicines": lambda: meds_service.get_all_medicines(household_id),
+        "meds_service.get_status_for_user": lambda: meds_service.get_status_for_user(household_id),
+        "meds_service.get_expiring_items[30]": lambda: meds_service.get_expiring_items(household_id, 30),
+        "meds_service.get_expiring_items[365]": lambda: meds_service.get_expiring_items(household_id, 365),
+        "meds_service.get_purchase_history": lambda: meds_service.get_purchase_history(household_id),
+        "meds_service.add_purchase": lambda: meds_service.add_purchase(medicine_id, 1),
+        "meds_service.decrease_daily_stock": lambda: meds_service.decrease_daily_stock(household_id),
+        "analytics.get_consumption_rates": lambda: analytics.get_consumption_rates(household_id),
+        "purchase_planner.plan_purchases": lambda: purchase_planner.plan_purchases(
+            meds_service.get_all_medicines(household_id)
+        ),
+        "calendar_feed.build_feed": lambda: calendar_feed.build_feed(household_id),
+        "data_transfer.export_household[json]": lambda: data_transfer.export_household(
+            household_id, "json", _NullWriter()
+        ),
+        "scheduler.check_stock": lambda: scheduler.check_stock(bot),
+        "scheduler.check_prescriptions": lambda: scheduler.check_prescriptions(bot),
+    }
+
+
+def measure(func, repeat: int, loop) -> dict:
+    """Замеряет одну функцию: запросы и пик памяти за один запуск, время - за repeat запусков."""
+    def call():
+        result = func()
+        if asyncio.iscoroutine(result):
+            loop.run_until_complete(result)
+
+    queries = []
+    db.set_trace_callback(queries.append)
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        db.set_trace_callback(None)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "queries": len(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "repeat": repeat,
+    }
+
+
+def run(db_path: str, repeat: int, only: list = None) -> dict:
+    db.DB_NAME = db_path
+    household_id = _pick_household(db_path)
+    medicine_id = meds_service.get_all_medicines(household_id)[0]["id"]
+
+    results = {}
+    loop = asyncio.new_event_loop()
+    try:
+        for name, func in build_cases(household_id, medicine_id).items():
+            if only and not any(part in name for part in only):
+                continue
+            results[name] = measure(func, repeat, loop)
+            print(
+                f"{name:45} {results[name]['median_ms']:10.2f} мс  "
+                f"запросов {results[name]['queries']:6}  пик {results[name]['peak_memory_kb']:10.1f} КБ",
+                file=sys.stderr
+            )
+    finally:
+        loop.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "household_id": household_id,
+            "tables": _table_sizes(db_path),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict):
+    """Печатает изменение медианного времени и числа запросов относительно baseline."""
+    print(f"{'замер':45} {'было мс':>10} {'стало мс':>10} {'изм.':>8} {'запросы':>15}")
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            print(f"{name:45} {'-':>10} {result['median_ms']:10.2f} {'новый':>8}")
+            continue
+        change = (result["median_ms"] / old["median_ms"] - 1) * 100 if old["median_ms"] else 0.0
+        print(
+            f"{name:45} {old['median_ms']:10.2f} {result['median_ms']:10.2f} {change:+7.1f}% "
+            f"{old['queries']:>7} -> {result['queries']:<6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки бота на синтетической БД")
+    parser.add_argument("--db", required=True, help="БД, созданная benchmarks/generate_db.py")
+    parser.add_argument("--repeat", type=int, default=5, help="число запусков для замера времени")
+    parser.add_argument("--only", nargs="*", help="запускать только замеры, в имени которых есть подстрока")
+    parser.add_argument("--output", help="файл для результатов JSON (по умолчанию - stdout)")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для сравнения")
+    parser.add_argument("--in-place", action="store_true", help="не копировать БД перед запуском")
+    args = parser.parse_args()
+
+    if args.in_place:
+        report = run(args.db, args.repeat, args.only)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            work_db = os.path.join(tmp, "bench.db")
+            shutil.copyfile(args.db, work_db)
+            report = run(work_db, args.repeat, args.only)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Стресс-тест одновременных изменений остатков.
+
+   python benchmarks/stress_stock.py --threads 16 --purchases 2000 --decrements 40
+   python benchmarks/stress_stock.py --db /tmp/bench.db --threads 32 --output stress.json
+
+Из множества потоков вперемешку вызываются meds_service.add_purchase
+(покупки и отрицательные коррекции), add_purchases (пачки) и ночное
+decrease_daily_stock одного домохозяйства - как если бы несколько
+опекунов вносили покупки во время ночной задачи или работали несколько
+процессов бота. У каждого вызова своё соединение с БД.
+
+Перед прогоном остатки поднимаются так, чтобы не упираться в ноль, поэтому
+итог можно посчитать точно: начальный остаток + сумма покупок - число
+списаний * сегодняшняя доза (округлённая вверх, как при списании). Любое
+расхождение - потерянное обновление. Дополнительно сверяются число записей
+в purchases и помесячные итоги purchase_monthly. Код выхода 1 при
+расхождении. Работа идёт на копии БД (или на новой БД во временной папке).
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+from services import dose_schedule, meds_service  # noqa: E402
+
+INITIAL_STOCK = 100_000
+
+
+def _prepare(household_id: int) -> dict:
+    """Поднимает остатки и возвращает {medicine_id: списание за одну ночь}."""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("UPDATE medicines SET current_stock = ? WHERE household_id = ?", (INITIAL_STOCK, household_id))
+        cursor.execute("SELECT id, daily_dose, dose_schedule FROM medicines WHERE household_id = ?", (household_id,))
+        drops = {}
+        for med_id, daily_dose, schedule_json in cursor.fetchall():
+            dose = dose_schedule.dose_on(dose_schedule.parse_schedule(schedule_json), daily_dose, date.today())
+            drops[med_id] = math.ceil(dose) if dose > 0 else 0
+        conn.commit()
+        return drops
+    finally:
+        conn.close()
+
+
+def _snapshot(household_id: int) -> dict:
+    """Остатки, число покупок и сумма количества в итогах по лекарствам."""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT id, current_stock FROM medicines WHERE household_id = ?", (household_id,))
+        stock = dict(cursor.fetchall())
+        cursor.execute("""
+            SELECT p.medicine_id, COUNT(*) FROM purchases p
+            JOIN medicines m ON m.id = p.medicine_id
+            WHERE m.household_id = ? GROUP BY p.medicine_id
+        """, (household_id,))
+        purchases = dict(cursor.fetchall())
+        cursor.execute("""
+            SELECT r.medicine_id, SUM(r.quantity) FROM purchase_monthly r
+            JOIN medicines m ON m.id = r.medicine_id
+            WHERE m.household_id = ? GROUP BY r.medicine_id
+        """, (household_id,))
+        rollup = dict(cursor.fetchall())
+        return {"stock": stock, "purchases": purchases, "rollup": rollup}
+    finally:
+        conn.close()
+
+
+def _operations(medicine_ids: list, purchases: int, decrements: int, seed: int) -> list:
+    """Перемешанный список операций: ("purchase", id, qty), ("batch", [(id, qty)]), ("decrement",)."""
+    rng = random.Random(seed)
+    operations = [("decrement",)] * decrements
+    remaining = purchases
+    while remaining > 0:
+        if remaining >= 3 and rng.random() < 0.2:
+            items = [(rng.choice(medicine_ids), rng.randint(1, 60)) for _ in range(3)]
+            operations.append(("batch", items))
+            remaining -= 3
+        else:
+            # Каждая десятая - отрицательная коррекция
+            quantity = -rng.randint(1, 5) if rng.random() < 0.1 else rng.randint(1, 60)
+            operations.append(("purchase", rng.choice(medicine_ids), quantity))
+            remaining -= 1
+    rng.shuffle(operations)
+    return operations
+
+
+def run_stress(threads: int, purchases: int, decrements: int, seed: int) -> dict:
+    household_id = meds_service.get_all_households()[0]["id"]
+    drops = _prepare(household_id)
+    medicine_ids = sorted(drops)
+    if not medicine_ids:
+        raise SystemExit("В БД нет лекарств для прогона")
+
+    before = _snapshot(household_id)
+    operations = _operations(medicine_ids, purchases, decrements, seed)
+
+    def apply(operation):
+        kind = operation[0]
+        if kind == "purchase":
+            meds_service.add_purchase(operation[1], operation[2])
+        elif kind == "batch":
+            meds_service.add_purchases(household_id, [
+                {"medicine_id": medicine_id, "quantity": quantity, "price": None}
+                for medicine_id, quantity in operation[1]
+            ])
+        else:
+            meds_service.decrease_daily_stock(household_id)
+        return operation
+
+    applied = []
+    errors = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(apply, operation) for operation in operations]
+        for future in futures:
+            try:
+                applied.append(future.result())
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    # Ожидаемый итог считается только по операциям, которые завершились успешно
+    expected = dict(before["stock"])
+    expected_purchases = {medicine_id: before["purchases"].get(medicine_id, 0) for medicine_id in medicine_ids}
+    expected_rollup = {medicine_id: before["rollup"].get(medicine_id, 0) for medicine_id in medicine_ids}
+    for operation in applied:
+        if operation[0] == "decrement":
+            for medicine_id, drop in drops.items():
+                expected[medicine_id] -= drop
+            continue
+        items = [operation[1:]] if operation[0] == "purchase" else operation[1]
+        for medicine_id, quantity in items:
+            expected[medicine_id] += quantity
+            expected_purchases[medicine_id] += 1
+            if quantity > 0:
+                expected_rollup[medicine_id] += quantity
+
+    after = _snapshot(household_id)
+    mismatches = {
+        medicine_id: {
+            "stock": [expected[medicine_id], after["stock"][medicine_id]],
+            "purchases": [expected_purchases[medicine_id], after["purchases"].get(medicine_id, 0)],
+            "rollup_quantity": [expected_rollup[medicine_id], after["rollup"].get(medicine_id, 0)],
+        }
+        for medicine_id in medicine_ids
+        if (expected[medicine_id], expected_purchases[medicine_id], expected_rollup[medicine_id])
+        != (after["stock"][medicine_id], after["purchases"].get(medicine_id, 0), after["rollup"].get(medicine_id, 0))
+    }
+
+    return {
+        "threads": threads,
+        "operations": len(operations),
+        "applied": len(applied),
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "operations_per_s": round(len(operations) / elapsed, 1) if elapsed else None,
+        "mismatches": mismatches,
+        "ok": not mismatches and not errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Стресс-тест одновременных изменений остатков")
+    parser.add_argument("--db", help="исходная БД (копируется); по умолчанию - новая БД из конфига")
+    parser.add_argument("--threads", type=int, default=16, help="число потоков")
+    parser.add_argument("--purchases", type=int, default=2000, help="сколько покупок внести")
+    parser.add_argument("--decrements", type=int, default=40, help="сколько раз выполнить ночное списание")
+    parser.add_argument("--seed", type=int, default=1, help="seed для генератора операций")
+    parser.add_argument("--output", help="файл для результатов JSON (по умолчанию - stdout)")
+    args = parser.parse_args()
+
+    # Логи на каждую покупку искажают замер
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_db = os.path.join(tmp, "stress.db")
+        if args.db:
+            shutil.copyfile(args.db, work_db)
+        db.DB_NAME = work_db
+        db.init_db()
+
+        report = run_stress(args.threads, args.purchases, args.decrements, args.seed)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Командная строка для обслуживания БД.
+
+   python cli.py export --format json --output meds.jsonl.gz
+   python cli.py import meds.jsonl.gz
+"""
+import argparse
+import sys
+
+import db
+from utils.logging_config import setup_logging
+
+
+def cmd_export(args):
+    from services import data_transfer
+    
+    output = args.output or data_transfer.export_filename(args.format)
+    with open(output, "wb") as f:
+        data_transfer.export_household(args.household, args.format, f)
+    print(f"Экспорт сохранён в {output}")
+
+
+def cmd_import(args):
+    from services import data_transfer
+    
+    with open(args.file, "rb") as f:
+        data = f.read()
+    
+    result = data_transfer.import_household(args.household, data)
+    print(
+        f"Импортировано: лекарств {result['medicines']}, "
+        f"рецептов {result['prescriptions']}, покупок {result['purchases']}"
+        f" (уже были в истории: {result['duplicates']})"
+    )
+    for error in result["errors"]:
+        print(f"  {error}", file=sys.stderr)
+    if result["error_count"]:
+        print(f"Строк с ошибками: {result['error_count']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание БД бота лекарств")
+    parser.add_argument("--db", default=db.DB_NAME, help="путь к файлу БД (по умолчанию meds.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="экспорт лекарств, рецептов и покупок")
+    export_parser.add_argument("--household", type=int, default=1, help="id домохозяйства")
+    export_parser.add_argument("--format", choices=["json", "csv"], default="json")
+    export_parser.add_argument("--output", help="файл для сохранения")
+    export_parser.set_defaults(func=cmd_export)
+    
+    import_parser = subparsers.add_parser("import", help="импорт из файла экспорта")
+    import_parser.add_argument("file", help="файл .jsonl.gz, .jsonl или .zip с CSV")
+    import_parser.add_argument("--household", type=int, default=1, help="id домохозяйства")
+    import_parser.set_defaults(func=cmd_import)
+    
+    args = parser.parse_args()
+    
+    from services.meds_service import get_projection_rates
+    
+    setup_logging()
+    db.DB_NAME = args.db
+    db.init_db(rates_loader=get_projection_rates)
+    
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
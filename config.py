@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -9,18 +10,100 @@ ALLOWED_USER_IDS = [
     199728431,
 ]
 
-# Фиксированный список лекарств для мамы
-# latin_name - необязательное поле, можно не указывать
-MEDICINES_CONFIG = [
-    {"name": "Алзепил", "latin_name": "Donepezili", "daily_dose": 1.0},
-    {"name": "ПК Мерц 100", "latin_name": "Amantadini", "daily_dose": 2.0},
-    {"name": "Тиаприд 100", "daily_dose": 1.5},
-    {"name": "Клоназепам 2", "latin_name": "Clonazepam", "daily_dose": 0.5},
-    {"name": "Мадопар 250", "latin_name": "Леводопа", "daily_dose": 8.0},
-    {"name": "Мемантин", "latin_name": "Акатинол", "daily_dose": 1.0},
-    {"name": "Сероквель", "latin_name": "Кветиапин", "daily_dose": 0.25},
+# Администраторы бота (доступ к /perf и другим служебным командам)
+ADMIN_USER_IDS = [
+    199728431,
 ]
 
+# Каталог домохозяйств (пациентов) и их лекарств - JSON-файл catalog.json:
+# {"households": [{"name": ..., "members": [user_id, ...], "medicines": [...]}]}
+# members - user_id тех, кто получает напоминания по этому пациенту.
+# Пользователи, не указанные ни в одном members, попадают в первое домохозяйство.
+# У лекарства обязательны name и daily_dose; latin_name - необязательное поле;
+# schedule - необязательная схема приёма (дозы по дням недели, периоды, снижение дозы),
+# формат описан в services/dose_schedule.py. daily_dose при этом остаётся средней дозой.
+# package_sizes - необязательный список размеров упаковок (в единицах), например [30, 100]
+# Бот проверяет файл каждые CATALOG_POLL_SECONDS и применяет изменения без
+# перезапуска (services/catalog.py).
+CATALOG_FILE = os.getenv("CATALOG_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json"))
+CATALOG_POLL_SECONDS = 10
+
+
+def load_catalog(path: str = CATALOG_FILE) -> list:
+    """Читает список домохозяйств из файла каталога."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["households"]
+
+
+# Текущий каталог. При перечитывании файла список обновляется на месте,
+# поэтому модули, импортировавшие HOUSEHOLDS_CONFIG, видят новые данные.
+HOUSEHOLDS_CONFIG = load_catalog()
+
+# Выбор ведущего процесса для ночных задач (при нескольких копиях бота).
+# Аренда продлевается каждые SCHEDULER_HEARTBEAT_SECONDS и истекает через
+# SCHEDULER_LEASE_TTL_SECONDS, если ведущий процесс перестал отвечать.
+SCHEDULER_LEASE_TTL_SECONDS = 60
+SCHEDULER_HEARTBEAT_SECONDS = 15
+
+# Резервные копии БД (ночная задача и /backup): каталог снимков и сколько хранить
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_KEEP = 14
+
+# Аналитика фактического расхода по истории покупок.
+# Факт считается, если история покрывает не меньше CONSUMPTION_MIN_HISTORY_DAYS дней;
+# расхождение с daily_dose больше CONSUMPTION_DIVERGENCE_THRESHOLD (доля) отмечается.
+# USE_OBSERVED_CONSUMPTION - считать "хватит на N дней" по фактическому расходу.
+CONSUMPTION_MIN_HISTORY_DAYS = 14
+CONSUMPTION_DIVERGENCE_THRESHOLD = 0.2
+USE_OBSERVED_CONSUMPTION = False
+
+# Счётчики производительности (/perf): время хендлеров, SQL-запросов, ночных задач
+# и вызовов Bot API. Для каждой метрики хранится не больше PERF_RESERVOIR_SIZE замеров
+PERF_METRICS_ENABLED = True
+PERF_RESERVOIR_SIZE = 1024
+
+# Отладочная трассировка SQL: сводка запросов по каждому обновлению и ночной задаче
+# и предупреждение, если один и тот же запрос выполнился больше
+# SQL_TRACE_REPEAT_THRESHOLD раз (признак N+1)
+SQL_TRACE_ENABLED = False
+SQL_TRACE_REPEAT_THRESHOLD = 10
+
+# /readyz в режиме polling: процесс не готов, если getUpdates не отвечал
+# успешно дольше этого времени (секунд)
+READINESS_POLLING_STALE_SECONDS = 120
+
+# Горизонт /report по умолчанию и максимальный (дней)
+REPORT_DEFAULT_HORIZON_DAYS = 30
+REPORT_MAX_HORIZON_DAYS = 730
+
+# Нечёткий поиск лекарств: минимальная доля совпавших триграмм запроса
+SEARCH_MIN_SCORE = 0.5
+
+# Inline-режим (@bot запрос): сколько карточек отдавать и сколько секунд
+# Telegram может кэшировать ответ (остатки меняются раз в сутки и при покупках)
+INLINE_MAX_RESULTS = 20
+INLINE_CACHE_TIME_SECONDS = 60
+
+# /spend: сколько месяцев показывать по умолчанию и максимум
+SPEND_DEFAULT_MONTHS = 12
+SPEND_MAX_MONTHS = 60
+
+# Горизонт /plan по умолчанию (дней), если у лекарства не задан рецепт, и максимальный
+# (не больше dose_schedule.CALENDAR_HORIZON_DAYS - дальше расход по схеме не считается)
+PLAN_DEFAULT_HORIZON_DAYS = 30
+PLAN_MAX_HORIZON_DAYS = 730
+
+# Рабочие процессы для графиков и отчётов (services/workers.py)
+WORKER_PROCESSES = 1
+
+# /chart: сколько дней истории и сколько дней прогноза показывать
+CHART_HISTORY_DAYS = 90
+CHART_FORECAST_DAYS = 120
+
+# /doctor_report: период журнала покупок и покрытия по умолчанию и максимальный (дней)
+DOCTOR_REPORT_DEFAULT_DAYS = 180
+DOCTOR_REPORT_MAX_DAYS = 730
+
 
 class Config:
     """Класс для работы с конфигурацией бота."""
@@ -34,3 +117,35 @@ class Config:
                 "Создайте файл .env и укажите BOT_TOKEN=your_token_here"
             )
 
+        # Режим получения обновлений: polling (по умолчанию) или webhook
+        self.BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+
+        if self.BOT_MODE not in ("polling", "webhook"):
+            raise ValueError(
+                f"Неизвестный BOT_MODE: {self.BOT_MODE}. Допустимые значения: polling, webhook"
+            )
+
+        # Настройки HTTP-сервера для режима webhook
+        self.WEB_SERVER_HOST = os.getenv("WEB_SERVER_HOST", "0.0.0.0")
+        self.WEB_SERVER_PORT = int(os.getenv("WEB_SERVER_PORT", "8080"))
+        self.WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+        # Публичный адрес (например, https://bot.example.com), за reverse proxy.
+        # Если не задан, set_webhook не вызывается — удобно для локальной проверки.
+        self.WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL")
+        self.WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+
+        if self.BOT_MODE == "webhook" and not self.WEBHOOK_SECRET:
+            raise ValueError(
+                "Для режима webhook необходимо указать WEBHOOK_SECRET в .env "
+                "(допустимы символы A-Z, a-z, 0-9, _ и -)"
+            )
+
+        # HTTP-сервер в режиме polling (для календаря и /healthz); в режиме webhook он запущен всегда
+        self.HTTP_SERVER_ENABLED = os.getenv("HTTP_SERVER_ENABLED", "false").strip().lower() in ("1", "true", "yes")
+        # /metrics отдаёт названия лекарств - отключите, если порт доступен извне
+        self.METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+        # Публичный адрес HTTP-сервера для ссылок (по умолчанию - адрес webhook)
+        self.PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL") or self.WEBHOOK_BASE_URL
+        # Секрет для ссылок на календарь (.ics); если не задан, календарь по HTTP не отдаётся
+        self.CALENDAR_SECRET = os.getenv("CALENDAR_SECRET")
+
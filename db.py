@@ -1,42 +1,152 @@
 import sqlite3
 import logging
-from config import MEDICINES_CONFIG
+import time
+from datetime import datetime, date, timedelta
+from config import HOUSEHOLDS_CONFIG, PERF_METRICS_ENABLED, SQL_TRACE_ENABLED
+from services.dose_schedule import schedule_to_json, runout_date
+from services.purchase_planner import package_sizes_to_text
+from utils.dates import to_iso_date
+from utils import perf, sql_trace
 
 logger = logging.getLogger(__name__)
 
 DB_NAME = "meds.db"
 
+# Необязательная функция, которая получает текст каждого SQL-запроса
+# (подсчёт запросов в бенчмарках); None - трассировка выключена
+_trace_callback = None
+
+
+def set_trace_callback(callback):
+    """Включает (callback) или выключает (None) трассировку запросов для новых соединений."""
+    global _trace_callback
+    _trace_callback = callback
+
+
+def _record_query(sql: str, started: float):
+    """Записывает время запроса в счётчики utils.perf (по типу: SELECT, INSERT, ...) и в трассировку SQL."""
+    duration_ms = (time.perf_counter() - started) * 1000
+    
+    if PERF_METRICS_ENABLED:
+        kind = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "EMPTY"
+        perf.increment("db.queries")
+        perf.record_timing(f"db.{kind}", duration_ms)
+    
+    if SQL_TRACE_ENABLED:
+        sql_trace.record(sql, duration_ms)
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """Курсор, замеряющий execute/executemany (без времени последующего fetch)."""
+    
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_query(sql, started)
+    
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_query(sql, started)
+
+
+class _TimedConnection(sqlite3.Connection):
+    """Соединение, чьи курсоры (в том числе у conn.execute) замеряют запросы."""
+    
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
 
 def get_connection():
     """Возвращает соединение с базой данных."""
-    return sqlite3.connect(DB_NAME)
+    factory = _TimedConnection if PERF_METRICS_ENABLED or SQL_TRACE_ENABLED else sqlite3.Connection
+    conn = sqlite3.connect(DB_NAME, factory=factory)
+    if _trace_callback is not None:
+        conn.set_trace_callback(_trace_callback)
+    return conn
+
+
+def begin_immediate(cursor):
+    """Открывает транзакцию сразу с блокировкой на запись (BEGIN IMMEDIATE).
+    
+    Транзакция, начатая с чтения, не всегда может повысить блокировку до
+    записи и падает с "database is locked", не дождавшись timeout соединения.
+    BEGIN IMMEDIATE ждёт своей очереди заранее, поэтому одновременные
+    изменения остатков выполняются строго по очереди.
+    """
+    cursor.execute("BEGIN IMMEDIATE")
 
 
-def init_db():
-    """Инициализирует базу данных и создаёт таблицы, если их нет."""
+def init_db(rates_loader=None):
+    """Инициализирует базу данных и создаёт таблицы, если их нет.
+    
+    rates_loader(household_id) -> {medicine_id: расход в день} - для пересчёта
+    дат окончания (см. _sync_households_config).
+    """
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
+        # WAL позволяет нескольким процессам бота читать БД во время записи
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
+        # Создание таблицы households (пациенты)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS households (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                created_at TEXT NOT NULL
+            )
+        """)
+        
+        # Версия каталога лекарств: растёт при каждом изменении списка лекарств,
+        # по ней перестраивается поисковый индекс (services/medicine_search.py)
+        try:
+            cursor.execute("ALTER TABLE households ADD COLUMN catalog_version INTEGER NOT NULL DEFAULT 0")
+            logger.info("Добавлена колонка catalog_version в таблицу households")
+        except sqlite3.OperationalError:
+            # Колонка уже существует
+            pass
+        
         # Создание таблицы users
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 tg_user_id INTEGER UNIQUE NOT NULL,
                 first_name TEXT NULL,
-                created_at TEXT NOT NULL
+                created_at TEXT NOT NULL,
+                household_id INTEGER NULL
             )
         """)
         
-        # Создание таблицы medicines
+        # Добавляем колонку household_id, если её нет (для существующих БД)
+        try:
+            cursor.execute("ALTER TABLE users ADD COLUMN household_id INTEGER NULL")
+            logger.info("Добавлена колонка household_id в таблицу users")
+        except sqlite3.OperationalError:
+            # Колонка уже существует
+            pass
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_household ON users(household_id)")
+        
+        # Создание таблицы medicines (название уникально в пределах домохозяйства)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS medicines (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
+                household_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
                 latin_name TEXT NULL,
                 daily_dose REAL NOT NULL,
                 current_stock INTEGER NOT NULL DEFAULT 0,
-                notify_before_days INTEGER NOT NULL DEFAULT 14
+                notify_before_days INTEGER NOT NULL DEFAULT 14,
+                dose_schedule TEXT NULL,
+                package_sizes TEXT NULL,
+                runout_date TEXT NULL,
+                UNIQUE(household_id, name)
             )
         """)
         
@@ -48,6 +158,39 @@ def init_db():
             # Колонка уже существует
             pass
         
+        # Старые БД: лекарства без household_id переносим в первое домохозяйство
+        _migrate_medicines_to_households(cursor)
+        
+        # Схема приёма (JSON, см. services/dose_schedule.py); NULL - постоянная daily_dose
+        try:
+            cursor.execute("ALTER TABLE medicines ADD COLUMN dose_schedule TEXT NULL")
+            logger.info("Добавлена колонка dose_schedule в таблицу medicines")
+        except sqlite3.OperationalError:
+            # Колонка уже существует
+            pass
+        
+        # Размеры упаковок через запятую ("30,100"); NULL - не заданы
+        try:
+            cursor.execute("ALTER TABLE medicines ADD COLUMN package_sizes TEXT NULL")
+            logger.info("Добавлена колонка package_sizes в таблицу medicines")
+        except sqlite3.OperationalError:
+            # Колонка уже существует
+            pass
+        
+        # Прогнозная дата окончания остатка (YYYY-MM-DD), см. refresh_runout_dates;
+        # NULL - лекарство не расходуется
+        try:
+            cursor.execute("ALTER TABLE medicines ADD COLUMN runout_date TEXT NULL")
+            logger.info("Добавлена колонка runout_date в таблицу medicines")
+        except sqlite3.OperationalError:
+            # Колонка уже существует
+            pass
+        
+        # Отчёт /report выбирает лекарства домохозяйства по диапазону дат окончания
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_medicines_household_runout ON medicines(household_id, runout_date)"
+        )
+        
         # Создание таблицы prescriptions
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS prescriptions (
@@ -58,6 +201,14 @@ def init_db():
             )
         """)
         
+        # Даты рецептов храним только как YYYY-MM-DD, чтобы сравнивать их в SQL
+        _canonicalize_prescription_dates(cursor)
+        
+        # Индекс для выборки рецептов по диапазону дат окончания
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_prescriptions_expiry ON prescriptions(expiry_date)"
+        )
+        
         # Создание таблицы purchases
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS purchases (
@@ -68,10 +219,92 @@ def init_db():
             )
         """)
         
+        # Индекс для истории покупок по лекарству (keyset-пагинация по дате)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_purchases_medicine_date ON purchases(medicine_id, purchased_at)"
+        )
+        
+        # Цена покупки (сумма за всю покупку, руб.); NULL - не указана
+        try:
+            cursor.execute("ALTER TABLE purchases ADD COLUMN price REAL NULL")
+            logger.info("Добавлена колонка price в таблицу purchases")
+        except sqlite3.OperationalError:
+            # Колонка уже существует
+            pass
+        
+        # Домохозяйство покупки (копия medicines.household_id): история домохозяйства
+        # идёт по индексу в порядке (purchased_at, id) без сортировки во временном B-дереве
+        try:
+            cursor.execute("ALTER TABLE purchases ADD COLUMN household_id INTEGER NULL")
+            cursor.execute("""
+                UPDATE purchases SET household_id = (
+                    SELECT household_id FROM medicines WHERE id = purchases.medicine_id
+                )
+            """)
+            logger.info("Добавлена колонка household_id в таблицу purchases")
+        except sqlite3.OperationalError:
+            # Колонка уже существует
+            pass
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_purchases_household_date ON purchases(household_id, purchased_at)"
+        )
+        
+        # Помесячные итоги покупок по лекарству для /spend, см. add_purchase_to_rollup
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'purchase_monthly'")
+        rollup_exists = cursor.fetchone() is not None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS purchase_monthly (
+                medicine_id INTEGER NOT NULL,
+                month TEXT NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                purchases INTEGER NOT NULL DEFAULT 0,
+                cost REAL NOT NULL DEFAULT 0,
+                priced_purchases INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY(medicine_id, month)
+            ) WITHOUT ROWID
+        """)
+        if not rollup_exists:
+            # Существующие БД: один раз собираем итоги по уже записанным покупкам
+            rebuild_purchase_rollups(cursor)
+            logger.info("Заполнена таблица purchase_monthly по истории покупок")
+        
+        # Аренда роли ведущего планировщика (одна строка на имя аренды)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scheduler_leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        
+        # Закреплённое сообщение со сводкой (одно на пользователя, /live_status);
+        # content_hash - sha256 последнего отправленного текста
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS status_boards (
+                tg_user_id INTEGER PRIMARY KEY,
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        
+        # Запуски ночных задач: не более одного на задачу в день
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS job_runs (
+                job_id TEXT NOT NULL,
+                run_date TEXT NOT NULL,
+                worker_id TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                finished_at TEXT NULL,
+                PRIMARY KEY(job_id, run_date)
+            )
+        """)
+        
         conn.commit()
         
-        # Синхронизация фиксированного списка лекарств с БД
-        _sync_medicines_config(cursor, conn)
+        # Синхронизация домохозяйств и их списков лекарств с БД
+        _sync_households_config(cursor, conn, rates_loader=rates_loader)
         
         logger.info("База данных инициализирована успешно")
         
@@ -83,20 +316,274 @@ def init_db():
         conn.close()
 
 
-def _sync_medicines_config(cursor, conn):
-    """Синхронизирует MEDICINES_CONFIG с таблицей medicines."""
-    for med_config in MEDICINES_CONFIG:
+def _get_or_create_household(cursor, name: str) -> int:
+    """Возвращает id домохозяйства по имени, создавая его при необходимости."""
+    cursor.execute("SELECT id FROM households WHERE name = ?", (name,))
+    row = cursor.fetchone()
+    
+    if row:
+        return row[0]
+    
+    cursor.execute(
+        "INSERT INTO households (name, created_at) VALUES (?, ?)",
+        (name, datetime.now().isoformat())
+    )
+    logger.info(f"Добавлено домохозяйство: {name}")
+    return cursor.lastrowid
+
+
+def _migrate_medicines_to_households(cursor):
+    """Пересоздаёт таблицу medicines с household_id для БД, созданных до появления домохозяйств.
+    
+    Ограничение UNIQUE(name) нельзя изменить через ALTER TABLE, поэтому таблица
+    копируется целиком; id лекарств сохраняются, так что ссылки из prescriptions
+    и purchases остаются корректными.
+    """
+    cursor.execute("PRAGMA table_info(medicines)")
+    columns = [row[1] for row in cursor.fetchall()]
+    
+    if "household_id" in columns:
+        return
+    
+    default_household_id = _get_or_create_household(cursor, HOUSEHOLDS_CONFIG[0]["name"])
+    
+    cursor.execute("""
+        CREATE TABLE medicines_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            household_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            latin_name TEXT NULL,
+            daily_dose REAL NOT NULL,
+            current_stock INTEGER NOT NULL DEFAULT 0,
+            notify_before_days INTEGER NOT NULL DEFAULT 14,
+            UNIQUE(household_id, name)
+        )
+    """)
+    cursor.execute(
+        """INSERT INTO medicines_new (id, household_id, name, latin_name, daily_dose, current_stock, notify_before_days)
+           SELECT id, ?, name, latin_name, daily_dose, current_stock, notify_before_days FROM medicines""",
+        (default_household_id,)
+    )
+    cursor.execute("DROP TABLE medicines")
+    cursor.execute("ALTER TABLE medicines_new RENAME TO medicines")
+    logger.info(f"Таблица medicines перенесена в домохозяйство id={default_household_id}")
+
+
+def _canonicalize_prescription_dates(cursor):
+    """Приводит prescriptions.expiry_date к виду YYYY-MM-DD (для БД со старыми форматами дат).
+    
+    Выбираются только строки, которые SQLite не считает канонической датой,
+    поэтому на уже приведённой БД миграция ничего не делает.
+    """
+    cursor.execute(
+        """SELECT id, expiry_date FROM prescriptions
+           WHERE date(expiry_date) IS NULL OR date(expiry_date) != expiry_date"""
+    )
+    rows = cursor.fetchall()
+    
+    for prescription_id, expiry_date in rows:
+        try:
+            canonical = to_iso_date(expiry_date)
+        except ValueError:
+            logger.warning(f"Не удалось распознать дату рецепта id={prescription_id}: {expiry_date}")
+            continue
+        
+        cursor.execute(
+            "UPDATE prescriptions SET expiry_date = ? WHERE id = ?",
+            (canonical, prescription_id)
+        )
+        logger.info(f"Дата рецепта id={prescription_id} приведена к ISO: {expiry_date} -> {canonical}")
+
+
+def _sync_households_config(cursor, conn, households_config: list = None, refresh_all: bool = True,
+                            rates_loader=None) -> dict:
+    """Синхронизирует каталог (по умолчанию HOUSEHOLDS_CONFIG): домохозяйства, их лекарства и участников.
+    
+    Меняются только строки, отличающиеся от каталога. Возвращает
+    {household_id: [что изменилось]} для домохозяйств с изменениями.
+    refresh_all=False - пересчитать прогноз только у изменившихся домохозяйств.
+    rates_loader(household_id) возвращает расход в день для прогноза
+    (meds_service.get_projection_rates; db не может импортировать его сам
+    из-за цикла импортов). Без него даты считаются по daily_dose и схеме.
+    """
+    if households_config is None:
+        households_config = HOUSEHOLDS_CONFIG
+    default_household_id = None
+    changes = {}
+    
+    for household_config in households_config:
+        household_id = _get_or_create_household(cursor, household_config["name"])
+        if default_household_id is None:
+            default_household_id = household_id
+        
+        changed = _sync_medicines_config(cursor, household_id, household_config.get("medicines", []))
+        
+        # Привязываем уже зарегистрированных участников к домохозяйству
+        for tg_user_id in household_config.get("members", []):
+            cursor.execute(
+                "UPDATE users SET household_id = ? WHERE tg_user_id = ? AND household_id IS NOT ?",
+                (household_id, tg_user_id, household_id)
+            )
+            if cursor.rowcount:
+                changed.append(f"участник {tg_user_id}")
+        
+        if changed:
+            changes[household_id] = changed
+    
+    # Пользователи без домохозяйства попадают в первое
+    cursor.execute(
+        "UPDATE users SET household_id = ? WHERE household_id IS NULL",
+        (default_household_id,)
+    )
+    
+    # Доза или схема могли измениться, а дата в прогнозе - устареть
+    if refresh_all:
+        cursor.execute("SELECT id FROM households")
+        household_ids = [row[0] for row in cursor.fetchall()]
+    else:
+        household_ids = list(changes)
+    for household_id in household_ids:
+        rates = rates_loader(household_id) if rates_loader else None
+        refresh_runout_dates(cursor, household_id, rates)
+    
+    conn.commit()
+    return changes
+
+
+def apply_catalog(households_config: list, rates_loader=None) -> dict:
+    """Применяет к БД перечитанный каталог; возвращает изменения по домохозяйствам.
+    
+    Лекарства обновляются на месте (id не меняются), поэтому ссылки из
+    покупок, рецептов и незавершённых диалогов остаются корректными.
+    Лекарства, удалённые из каталога, остаются в БД вместе с историей.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        return _sync_households_config(cursor, conn, households_config, refresh_all=False,
+                                       rates_loader=rates_loader)
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Ошибка при применении каталога: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def refresh_runout_dates(cursor, household_id: int, rates: dict = None, today: date = None):
+    """Пересчитывает medicines.runout_date для всех лекарств домохозяйства.
+    
+    Дата считается так же, как "хватит на N дней" в /status: по rates
+    (medicine_id -> расход в день), если лекарство там есть, иначе по схеме
+    приёма или daily_dose. Вызывается в той же транзакции, что и изменение
+    остатка, поэтому /report может выбирать даты из индекса без пересчёта.
+    """
+    today = today or date.today()
+    cursor.execute(
+        "SELECT id, daily_dose, current_stock, dose_schedule FROM medicines WHERE household_id = ?",
+        (household_id,)
+    )
+    
+    updates = []
+    for med_id, daily_dose, current_stock, schedule_json in cursor.fetchall():
+        if rates and med_id in rates:
+            rate = rates[med_id]
+            if rate > 0:
+                days = int(current_stock / rate) if current_stock > 0 else 0
+                updates.append(((today + timedelta(days=days)).isoformat(), med_id))
+            else:
+                updates.append((None, med_id))
+        elif daily_dose > 0 or schedule_json:
+            updates.append((runout_date(schedule_json, daily_dose, current_stock, today).isoformat(), med_id))
+        else:
+            updates.append((None, med_id))
+    
+    cursor.executemany("UPDATE medicines SET runout_date = ? WHERE id = ?", updates)
+
+
+def add_purchase_to_rollup(cursor, medicine_id: int, quantity: int, price: float, purchased_at: str):
+    """Добавляет покупку в помесячные итоги purchase_monthly.
+    
+    Вызывается в той же транзакции, что и INSERT в purchases. Учитываются
+    только покупки (quantity > 0): коррекции остатка не тратят денег.
+    """
+    if quantity <= 0:
+        return
+    
+    cursor.execute(
+        """INSERT INTO purchase_monthly (medicine_id, month, quantity, purchases, cost, priced_purchases)
+           VALUES (?, ?, ?, 1, ?, ?)
+           ON CONFLICT(medicine_id, month) DO UPDATE SET
+               quantity = quantity + excluded.quantity,
+               purchases = purchases + 1,
+               cost = cost + excluded.cost,
+               priced_purchases = priced_purchases + excluded.priced_purchases""",
+        (medicine_id, purchased_at[:7], quantity, price or 0, 0 if price is None else 1)
+    )
+
+
+def rebuild_purchase_rollups(cursor, household_id: int = None):
+    """Пересобирает purchase_monthly из purchases (всю или для одного домохозяйства).
+    
+    Нужна после массовой вставки покупок (импорт, миграция), когда
+    add_purchase_to_rollup не вызывался для каждой строки.
+    """
+    household_filter = ""
+    params = ()
+    if household_id is not None:
+        household_filter = "AND p.medicine_id IN (SELECT id FROM medicines WHERE household_id = ?)"
+        params = (household_id,)
+        cursor.execute(
+            "DELETE FROM purchase_monthly WHERE medicine_id IN (SELECT id FROM medicines WHERE household_id = ?)",
+            params
+        )
+    else:
+        cursor.execute("DELETE FROM purchase_monthly")
+    
+    cursor.execute(
+        f"""INSERT INTO purchase_monthly (medicine_id, month, quantity, purchases, cost, priced_purchases)
+            SELECT p.medicine_id, substr(p.purchased_at, 1, 7), SUM(p.quantity), COUNT(*),
+                   COALESCE(SUM(p.price), 0), COUNT(p.price)
+            FROM purchases p
+            WHERE p.quantity > 0 {household_filter}
+            GROUP BY p.medicine_id, substr(p.purchased_at, 1, 7)""",
+        params
+    )
+
+
+def bump_catalog_version(cursor, household_id: int):
+    """Отмечает изменение каталога лекарств домохозяйства (в текущей транзакции)."""
+    cursor.execute(
+        "UPDATE households SET catalog_version = catalog_version + 1 WHERE id = ?",
+        (household_id,)
+    )
+
+
+def _sync_medicines_config(cursor, household_id: int, medicines_config: list) -> list:
+    """Синхронизирует список лекарств домохозяйства с таблицей medicines.
+    
+    Возвращает названия добавленных и изменённых лекарств.
+    """
+    changed = []
+    for med_config in medicines_config:
         name = med_config["name"]
         daily_dose = med_config["daily_dose"]
         latin_name = med_config.get("latin_name")  # Необязательное поле
+        dose_schedule = schedule_to_json(med_config.get("schedule"))  # Необязательное поле
+        package_sizes = package_sizes_to_text(med_config.get("package_sizes"))  # Необязательное поле
         
         # Проверяем, существует ли лекарство
-        cursor.execute("SELECT id, daily_dose, latin_name FROM medicines WHERE name = ?", (name,))
+        cursor.execute(
+            """SELECT id, daily_dose, latin_name, dose_schedule, package_sizes
+               FROM medicines WHERE household_id = ? AND name = ?""",
+            (household_id, name)
+        )
         existing = cursor.fetchone()
         
         if existing:
-            # Обновляем daily_dose и latin_name, если изменились
-            med_id, old_dose, old_latin = existing
+            # Обновляем daily_dose, latin_name, схему приёма и упаковки, если изменились
+            med_id, old_dose, old_latin, old_schedule, old_packages = existing
             needs_update = False
             updates = []
             
@@ -108,6 +595,14 @@ def _sync_medicines_config(cursor, conn):
                 updates.append(("latin_name", latin_name))
                 needs_update = True
             
+            if old_schedule != dose_schedule:
+                updates.append(("dose_schedule", dose_schedule))
+                needs_update = True
+            
+            if old_packages != package_sizes:
+                updates.append(("package_sizes", package_sizes))
+                needs_update = True
+            
             if needs_update:
                 set_clause = ", ".join([f"{field} = ?" for field, _ in updates])
                 values = [val for _, val in updates] + [med_id]
@@ -116,14 +611,20 @@ def _sync_medicines_config(cursor, conn):
                     values
                 )
                 logger.info(f"Обновлено лекарство {name}: {updates}")
+                changed.append(name)
         else:
             # Создаём новое лекарство
             cursor.execute(
-                """INSERT INTO medicines (name, latin_name, daily_dose, current_stock, notify_before_days)
-                   VALUES (?, ?, ?, 0, 14)""",
-                (name, latin_name, daily_dose)
+                """INSERT INTO medicines (household_id, name, latin_name, daily_dose, current_stock,
+                                          notify_before_days, dose_schedule, package_sizes)
+                   VALUES (?, ?, ?, ?, 0, 14, ?, ?)""",
+                (household_id, name, latin_name, daily_dose, dose_schedule, package_sizes)
             )
             logger.info(f"Добавлено новое лекарство: {name} (доза: {daily_dose}, лат: {latin_name})")
+            changed.append(name)
     
-    conn.commit()
+    if changed:
+        bump_catalog_version(cursor, household_id)
+    
+    return changed
 
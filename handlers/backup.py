@@ -0,0 +1,48 @@
+import logging
+import os
+from aiogram import Router
+from aiogram.types import Message, FSInputFile
+from aiogram.filters import Command, CommandObject
+
+from services import backup
+from utils.emojis import EMOJI_BOX, EMOJI_ERROR
+from utils.access_control import AccessControlMiddleware, check_admin_access
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+# Ограничение Bot API на размер отправляемого файла
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+
+
+@router.message(Command("backup"))
+async def cmd_backup(message: Message, command: CommandObject):
+    """Обработчик команды /backup [new] - последняя резервная копия БД (только для администраторов)."""
+    try:
+        if not check_admin_access(message.from_user.id):
+            await message.answer(f"{EMOJI_ERROR} Команда доступна только администраторам.")
+            return
+        
+        path = backup.latest_backup()
+        if path is None or (command.args or "").strip().lower() == "new":
+            path = await backup.create_backup()
+        
+        size = os.path.getsize(path)
+        if size > MAX_DOCUMENT_SIZE:
+            await message.answer(
+                f"{EMOJI_ERROR} Копия {os.path.basename(path)} слишком большая для отправки "
+                f"({size // (1024 * 1024)} МБ). Она лежит на сервере: {path}"
+            )
+            return
+        
+        await message.answer_document(
+            FSInputFile(path),
+            caption=f"{EMOJI_BOX} Резервная копия БД: {os.path.basename(path)}"
+        )
+    
+    except Exception as e:
+        logger.error(f"Ошибка при отправке резервной копии: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при создании резервной копии.")
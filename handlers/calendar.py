@@ -0,0 +1,41 @@
+import asyncio
+import logging
+from aiogram import Router
+from aiogram.types import Message, BufferedInputFile
+from aiogram.filters import Command
+
+from services import meds_service, calendar_feed
+from utils.emojis import EMOJI_CALENDAR, EMOJI_ERROR
+from utils.access_control import AccessControlMiddleware
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+
+@router.message(Command("calendar"))
+async def cmd_calendar(message: Message, config=None):
+    """Обработчик команды /calendar - файл .ics с датами окончания лекарств и рецептов."""
+    try:
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        feed = await asyncio.to_thread(calendar_feed.build_feed, household_id)
+        
+        caption = f"{EMOJI_CALENDAR} Календарь: когда закончатся лекарства и рецепты. Откройте файл, чтобы импортировать события."
+        
+        # Если HTTP-сервер запущен (в режиме webhook - всегда, в polling - по HTTP_SERVER_ENABLED)
+        # и доступен снаружи, даём ссылку для подписки - календарь будет обновляться сам
+        server_running = config and (config.BOT_MODE == "webhook" or config.HTTP_SERVER_ENABLED)
+        if server_running and config.CALENDAR_SECRET and config.PUBLIC_BASE_URL:
+            url = calendar_feed.feed_url(household_id, config.PUBLIC_BASE_URL, config.CALENDAR_SECRET)
+            caption += f"\n\nСсылка для подписки:\n{url}"
+        
+        await message.answer_document(
+            BufferedInputFile(feed, filename="meds.ics"),
+            caption=caption
+        )
+    
+    except Exception as e:
+        logger.error(f"Ошибка при формировании календаря: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при формировании календаря.")
@@ -0,0 +1,88 @@
+import logging
+from aiogram import Router, F
+from aiogram.enums import ChatAction
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile
+from aiogram.filters import Command, CommandObject
+
+from services import meds_service, medicine_search, stock_chart
+from utils.emojis import EMOJI_CHART, EMOJI_MEDICINE, EMOJI_ERROR, EMOJI_BOX
+from utils.access_control import AccessControlMiddleware
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+
+def _medicines_keyboard(medicines: list) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=med["name"], callback_data=f"chart_med_{med['id']}")]
+        for med in medicines
+    ])
+
+
+async def _send_chart(message: Message, household_id: int, medicine: dict):
+    """Рисует (или берёт из кэша) график и отправляет его фото."""
+    await message.bot.send_chat_action(message.chat.id, ChatAction.UPLOAD_PHOTO)
+    try:
+        png = await stock_chart.get_chart(medicine, meds_service.get_projection_rates(household_id))
+    except ImportError:
+        await message.answer(f"{EMOJI_ERROR} Графики недоступны: на сервере не установлен matplotlib.")
+        return
+    
+    await message.answer_photo(
+        BufferedInputFile(png, filename=f"chart_{medicine['id']}.png"),
+        caption=f"{EMOJI_CHART} {medicine['name']}: остаток {medicine['current_stock']}"
+    )
+
+
+@router.message(Command("chart"))
+async def cmd_chart(message: Message, command: CommandObject):
+    """Обработчик команды /chart [лекарство] - график остатка с прогнозом."""
+    try:
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        medicines = meds_service.get_all_medicines(household_id)
+        
+        if not medicines:
+            await message.answer(f"{EMOJI_BOX} Список лекарств пуст.")
+            return
+        
+        query = (command.args or "").strip()
+        if not query:
+            await message.answer(f"{EMOJI_MEDICINE} Выберите лекарство:", reply_markup=_medicines_keyboard(medicines))
+            return
+        
+        matches = medicine_search.find_medicines(household_id, query, medicines)
+        if not matches:
+            await message.answer(f"{EMOJI_ERROR} Лекарство «{query}» не найдено.")
+            return
+        if len(matches) > 1:
+            await message.answer(f"{EMOJI_MEDICINE} Уточните лекарство:", reply_markup=_medicines_keyboard(matches))
+            return
+        
+        await _send_chart(message, household_id, matches[0])
+    
+    except Exception as e:
+        logger.error(f"Ошибка при построении графика: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при построении графика.")
+
+
+@router.callback_query(F.data.startswith("chart_med_"))
+async def process_chart_medicine(callback: CallbackQuery):
+    """Выбор лекарства для графика."""
+    try:
+        medicine_id = int(callback.data.split("_")[2])
+        household_id = meds_service.get_user_household_id(callback.from_user.id, callback.from_user.first_name)
+        medicine = meds_service.get_medicine_by_id(medicine_id, household_id)
+        
+        if not medicine:
+            await callback.answer("Лекарство не найдено", show_alert=True)
+            return
+        
+        await callback.answer()
+        await _send_chart(callback.message, household_id, medicine)
+    
+    except Exception as e:
+        logger.error(f"Ошибка при построении графика: {e}")
+        await callback.answer("Произошла ошибка", show_alert=True)
@@ -0,0 +1,57 @@
+import logging
+from aiogram import Router
+from aiogram.types import Message
+from aiogram.filters import Command
+
+from services import meds_service, analytics
+from handlers.start import get_main_keyboard
+from utils.emojis import EMOJI_CHART, EMOJI_MEDICINE, EMOJI_WARNING, EMOJI_ERROR, EMOJI_BOX
+from utils.access_control import AccessControlMiddleware
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+
+@router.message(Command("consumption"))
+async def cmd_consumption(message: Message):
+    """Обработчик команды /consumption - фактический расход по истории покупок."""
+    try:
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        medicines = meds_service.get_all_medicines(household_id)
+        
+        if not medicines:
+            await message.answer(f"{EMOJI_BOX} Список лекарств пуст.")
+            return
+        
+        rates = analytics.get_consumption_rates(household_id)
+        
+        text_lines = [f"{EMOJI_CHART} <b>Фактический расход по истории покупок:</b>\n"]
+        
+        for med in medicines:
+            rate = rates.get(med["id"])
+            text_lines.append(f"{EMOJI_MEDICINE} <b>{med['name']}</b>")
+            text_lines.append(f"  По схеме: {med['daily_dose']} в день")
+            
+            if rate is None or rate["observed_rate"] is None:
+                text_lines.append("  По факту: недостаточно истории")
+            else:
+                warning = f" {EMOJI_WARNING}" if rate["diverges"] else ""
+                text_lines.append(
+                    f"  По факту: {rate['observed_rate']} в день "
+                    f"(за {rate['history_days']} дн.){warning}"
+                )
+                if rate["diverges"]:
+                    days_left = meds_service.calculate_days_left(med["current_stock"], rate["observed_rate"])
+                    text_lines.append(f"  По факту хватит на: {days_left} дней")
+            
+            text_lines.append("")
+        
+        response_text = "\n".join(text_lines)
+        await message.answer(response_text, reply_markup=get_main_keyboard())
+    
+    except Exception as e:
+        logger.error(f"Ошибка при расчёте фактического расхода: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при расчёте расхода.")
@@ -0,0 +1,108 @@
+import asyncio
+import io
+import logging
+from aiogram import Router, F
+from aiogram.types import Message, BufferedInputFile
+from aiogram.filters import Command, CommandObject, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+
+from services import meds_service, data_transfer
+from utils.emojis import EMOJI_ERROR, EMOJI_SUCCESS, EMOJI_BOX
+from utils.access_control import AccessControlMiddleware
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+
+class ImportStates(StatesGroup):
+    waiting_for_file = State()
+
+
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject):
+    """Обработчик команды /export [json|csv]."""
+    try:
+        export_format = (command.args or "json").strip().lower()
+        if export_format not in data_transfer.EXPORT_FORMATS:
+            await message.answer(f"{EMOJI_ERROR} Формат должен быть json или csv. Например: /export csv")
+            return
+        
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        
+        # Чтение и сжатие всей истории - в потоке, чтобы не задерживать другие обновления
+        buffer = io.BytesIO()
+        await asyncio.to_thread(data_transfer.export_household, household_id, export_format, buffer)
+        
+        await message.answer_document(
+            BufferedInputFile(buffer.getvalue(), filename=data_transfer.export_filename(export_format)),
+            caption=f"{EMOJI_BOX} Экспорт лекарств, рецептов и покупок"
+        )
+    
+    except Exception as e:
+        logger.error(f"Ошибка при экспорте: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при экспорте.")
+
+
+@router.message(Command("import"))
+async def cmd_import(message: Message, state: FSMContext):
+    """Обработчик команды /import - ждёт файл экспорта (или принимает его сразу с подписью /import)."""
+    if message.document:
+        await process_import_file(message, state)
+        return
+    
+    await state.set_state(ImportStates.waiting_for_file)
+    await message.answer(
+        f"{EMOJI_BOX} Отправьте файл экспорта (.jsonl.gz, .jsonl или .zip с CSV).\n"
+        "Для отмены — /cancel"
+    )
+
+
+@router.message(Command("cancel"), StateFilter(ImportStates))
+async def cmd_cancel_import(message: Message, state: FSMContext):
+    """Отмена импорта."""
+    await state.clear()
+    await message.answer(f"{EMOJI_ERROR} Операция отменена.")
+
+
+@router.message(StateFilter(ImportStates.waiting_for_file), F.document)
+async def process_import_file(message: Message, state: FSMContext):
+    """Загрузка и применение файла импорта."""
+    try:
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        
+        buffer = io.BytesIO()
+        await message.bot.download(message.document, destination=buffer)
+        
+        result = await asyncio.to_thread(data_transfer.import_household, household_id, buffer.getvalue())
+        
+        text_lines = [
+            f"{EMOJI_SUCCESS} Импорт завершён\n",
+            f"Лекарств: <b>{result['medicines']}</b>",
+            f"Рецептов: <b>{result['prescriptions']}</b>",
+            f"Покупок: <b>{result['purchases']}</b>",
+        ]
+        
+        if result["duplicates"]:
+            text_lines.append(f"Уже были в истории (пропущены): <b>{result['duplicates']}</b>")
+        
+        if result["error_count"]:
+            text_lines.append(f"\n{EMOJI_ERROR} Пропущено строк с ошибками: <b>{result['error_count']}</b>")
+            text_lines.extend(f"• {error}" for error in result["errors"][:20])
+        
+        await message.answer("\n".join(text_lines))
+        await state.clear()
+    
+    except Exception as e:
+        logger.error(f"Ошибка при импорте: {e}")
+        await message.answer(f"{EMOJI_ERROR} Не удалось импортировать файл.")
+        await state.clear()
+
+
+@router.message(StateFilter(ImportStates.waiting_for_file))
+async def process_import_not_file(message: Message):
+    """Напоминание, что ожидается файл."""
+    await message.answer(f"{EMOJI_ERROR} Отправьте файл документом или /cancel для отмены.")
@@ -0,0 +1,58 @@
+import logging
+import os
+from datetime import date
+from aiogram import Router
+from aiogram.enums import ChatAction
+from aiogram.types import Message, FSInputFile
+from aiogram.filters import Command, CommandObject
+
+from config import DOCTOR_REPORT_DEFAULT_DAYS, DOCTOR_REPORT_MAX_DAYS
+from services import meds_service, doctor_report
+from utils.emojis import EMOJI_PRESCRIPTION, EMOJI_ERROR
+from utils.access_control import AccessControlMiddleware
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+
+@router.message(Command("doctor_report"))
+async def cmd_doctor_report(message: Message, command: CommandObject):
+    """Обработчик команды /doctor_report [дней] - отчёт для врача файлом HTML."""
+    path = None
+    try:
+        days = DOCTOR_REPORT_DEFAULT_DAYS
+        if command.args:
+            try:
+                days = int(command.args.strip())
+                if not 0 < days <= DOCTOR_REPORT_MAX_DAYS:
+                    raise ValueError
+            except ValueError:
+                await message.answer(
+                    f"{EMOJI_ERROR} Укажите число дней от 1 до {DOCTOR_REPORT_MAX_DAYS}, например: /doctor_report 90"
+                )
+                return
+        
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        
+        await message.bot.send_chat_action(message.chat.id, ChatAction.UPLOAD_DOCUMENT)
+        path, summary = await doctor_report.build_report(household_id, days)
+        
+        await message.answer_document(
+            FSInputFile(path, filename=f"doctor_report_{date.today():%Y%m%d}.html"),
+            caption=(
+                f"{EMOJI_PRESCRIPTION} Отчёт для врача за {days} дн.: "
+                f"{summary['medicines']} лекарств, {summary['purchases']} покупок.\n"
+                "Откройте в браузере и распечатайте."
+            )
+        )
+    
+    except Exception as e:
+        logger.error(f"Ошибка при формировании отчёта для врача: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при формировании отчёта.")
+    
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,179 @@
+import logging
+import re
+from datetime import datetime
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.filters import Command, CommandObject
+
+from services import meds_service, medicine_search
+from utils.money import format_money
+from utils.emojis import EMOJI_PRESCRIPTION, EMOJI_ERROR, EMOJI_BOX
+from utils.access_control import AccessControlMiddleware
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+HISTORY_PAGE_SIZE = 10
+
+DATE_PATTERN = re.compile(r"^\d{2}\.\d{2}\.\d{4}$")
+
+
+def _encode_date(value: str | None) -> str:
+    """YYYY-MM-DD -> YYYYMMDD для callback_data (0 - фильтра нет)."""
+    return value.replace("-", "") if value else "0"
+
+
+def _decode_date(value: str) -> str | None:
+    """YYYYMMDD -> YYYY-MM-DD."""
+    if value == "0":
+        return None
+    return f"{value[:4]}-{value[4:6]}-{value[6:]}"
+
+
+def _build_navigation(purchases, filters, has_older: bool, has_newer: bool):
+    """Кнопки «Новее» / «Старше». Фильтры передаются в callback_data, чтобы не зависеть от FSM."""
+    medicine_id, date_from, date_to = filters
+    suffix = f"{medicine_id or 0}_{_encode_date(date_from)}_{_encode_date(date_to)}"
+    
+    buttons = []
+    if has_newer:
+        buttons.append(InlineKeyboardButton(
+            text="⬅️ Новее",
+            callback_data=f"hist_newer_{purchases[0]['id']}_{suffix}"
+        ))
+    if has_older:
+        buttons.append(InlineKeyboardButton(
+            text="Старше ➡️",
+            callback_data=f"hist_older_{purchases[-1]['id']}_{suffix}"
+        ))
+    
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+
+def _format_history(purchases, title: str) -> str:
+    """Формирует текст страницы истории."""
+    text_lines = [f"{EMOJI_PRESCRIPTION} <b>{title}</b>\n"]
+    
+    for purchase in purchases:
+        purchased_at = datetime.fromisoformat(purchase["purchased_at"]).strftime("%d.%m.%Y %H:%M")
+        line = f"{purchased_at} — {purchase['name']}: <b>{purchase['quantity']:+d}</b>"
+        if purchase["price"] is not None:
+            line += f", {format_money(purchase['price'])}"
+        text_lines.append(line)
+    
+    return "\n".join(text_lines)
+
+
+def _history_title(medicine_name: str | None, date_from: str | None, date_to: str | None) -> str:
+    """Заголовок с описанием фильтров."""
+    title = "История покупок"
+    if medicine_name:
+        title += f": {medicine_name}"
+    if date_from:
+        title += f" с {datetime.strptime(date_from, '%Y-%m-%d').strftime('%d.%m.%Y')}"
+    if date_to:
+        title += f" по {datetime.strptime(date_to, '%Y-%m-%d').strftime('%d.%m.%Y')}"
+    return title
+
+
+@router.message(Command("history"))
+async def cmd_history(message: Message, command: CommandObject):
+    """Обработчик команды /history [лекарство] [ДД.ММ.ГГГГ] [ДД.ММ.ГГГГ]."""
+    try:
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        
+        # Разбираем аргументы: даты в конце, всё остальное - название лекарства
+        tokens = (command.args or "").split()
+        dates = []
+        while tokens and DATE_PATTERN.match(tokens[-1]) and len(dates) < 2:
+            dates.insert(0, tokens.pop())
+        
+        try:
+            dates = [datetime.strptime(value, "%d.%m.%Y").date().isoformat() for value in dates]
+        except ValueError:
+            await message.answer(
+                f"{EMOJI_ERROR} Неверная дата. Используйте формат <b>ДД.ММ.ГГГГ</b>\n"
+                "Например: /history Алзепил 01.01.2024 31.12.2024"
+            )
+            return
+        
+        date_from = dates[0] if dates else None
+        date_to = dates[1] if len(dates) > 1 else None
+        
+        medicine = None
+        medicine_query = " ".join(tokens)
+        if medicine_query:
+            matches = medicine_search.find_medicines(household_id, medicine_query)
+            if not matches:
+                await message.answer(f"{EMOJI_ERROR} Лекарство «{medicine_query}» не найдено.")
+                return
+            if len(matches) > 1:
+                names = ", ".join(med["name"] for med in matches)
+                await message.answer(f"{EMOJI_ERROR} Уточните название, подходят: {names}")
+                return
+            medicine = matches[0]
+        
+        medicine_id = medicine["id"] if medicine else None
+        purchases, has_older = meds_service.get_purchase_history(
+            household_id, medicine_id, date_from, date_to, limit=HISTORY_PAGE_SIZE
+        )
+        
+        if not purchases:
+            await message.answer(f"{EMOJI_BOX} Покупок не найдено.")
+            return
+        
+        title = _history_title(medicine["name"] if medicine else None, date_from, date_to)
+        await message.answer(
+            _format_history(purchases, title),
+            reply_markup=_build_navigation(purchases, (medicine_id, date_from, date_to), has_older, False)
+        )
+    
+    except Exception as e:
+        logger.error(f"Ошибка при получении истории покупок: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при получении истории покупок.")
+
+
+@router.callback_query(F.data.startswith("hist_"))
+async def process_history_page(callback: CallbackQuery):
+    """Переход на соседнюю страницу истории."""
+    try:
+        _, direction, purchase_id, medicine_id, date_from, date_to = callback.data.split("_")
+        household_id = meds_service.get_user_household_id(callback.from_user.id, callback.from_user.first_name)
+        
+        medicine_id = int(medicine_id) or None
+        date_from = _decode_date(date_from)
+        date_to = _decode_date(date_to)
+        
+        if direction == "older":
+            purchases, has_older = meds_service.get_purchase_history(
+                household_id, medicine_id, date_from, date_to,
+                older_than=int(purchase_id), limit=HISTORY_PAGE_SIZE
+            )
+            has_newer = True
+        else:
+            purchases, has_newer = meds_service.get_purchase_history(
+                household_id, medicine_id, date_from, date_to,
+                newer_than=int(purchase_id), limit=HISTORY_PAGE_SIZE
+            )
+            has_older = True
+        
+        if not purchases:
+            await callback.answer("Больше записей нет")
+            return
+        
+        medicine_name = purchases[0]["name"] if medicine_id else None
+        title = _history_title(medicine_name, date_from, date_to)
+        await callback.message.edit_text(
+            _format_history(purchases, title),
+            reply_markup=_build_navigation(purchases, (medicine_id, date_from, date_to), has_older, has_newer)
+        )
+        await callback.answer()
+    
+    except Exception as e:
+        logger.error(f"Ошибка при переходе по истории покупок: {e}")
+        await callback.answer("Произошла ошибка", show_alert=True)
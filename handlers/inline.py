@@ -0,0 +1,52 @@
+import logging
+from aiogram import Router
+from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+
+from config import INLINE_MAX_RESULTS, INLINE_CACHE_TIME_SECONDS
+from services import meds_service, medicine_search
+from services.status_board import format_status_card
+from utils.access_control import AccessControlMiddleware
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.inline_query.middleware(AccessControlMiddleware())
+
+
+@router.inline_query()
+async def inline_medicine_search(inline_query: InlineQuery):
+    """Inline-режим: @bot мадо - карточки подходящих лекарств с остатком и рецептом."""
+    try:
+        household_id = meds_service.get_user_household_id(
+            inline_query.from_user.id, inline_query.from_user.first_name
+        )
+        status_data = meds_service.get_status_for_user(household_id)
+
+        # Пустой запрос - лекарства, которые закончатся раньше всех
+        query = inline_query.query.strip()
+        if query:
+            order = [med["id"] for med in medicine_search.find_medicines(household_id, query)]
+            by_id = {item["id"]: item for item in status_data}
+            status_data = [by_id[medicine_id] for medicine_id in order if medicine_id in by_id]
+
+        results = []
+        for item in status_data[:INLINE_MAX_RESULTS]:
+            description = f"Остаток {item['current_stock']}, хватит на {item['days_left']} дн."
+            if item["expiry_date"]:
+                description += f", рецепт до {item['expiry_date']}"
+            results.append(InlineQueryResultArticle(
+                id=str(item["id"]),
+                title=item["name"],
+                description=description,
+                input_message_content=InputTextMessageContent(
+                    message_text="\n".join(format_status_card(item))
+                )
+            ))
+
+        # Ответ зависит от домохозяйства пользователя - кэш Telegram только личный
+        await inline_query.answer(results, cache_time=INLINE_CACHE_TIME_SECONDS, is_personal=True)
+        logger.info(f"[inline] Запрос «{query}»: {len(results)} карточек")
+
+    except Exception as e:
+        logger.error(f"Ошибка inline-поиска: {e}")
+        await inline_query.answer([], cache_time=0, is_personal=True)
@@ -3,7 +3,7 @@ from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command
 
-from services import meds_service
+from services import meds_service, dose_schedule
 from handlers.start import get_main_keyboard
 from utils.emojis import EMOJI_MEDICINE, EMOJI_ERROR, EMOJI_BOX
 from utils.access_control import AccessControlMiddleware
@@ -19,7 +19,9 @@ router.callback_query.middleware(AccessControlMiddleware())
 async def cmd_medicines(message: Message):
     """Обработчик команды /meds или /medicines."""
     try:
-        medicines = meds_service.get_all_medicines()
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        medicines = meds_service.get_all_medicines(household_id)
+        rates = meds_service.get_projection_rates(household_id)
         
         if not medicines:
             await message.answer(f"{EMOJI_BOX} Список лекарств пуст.")
@@ -28,20 +30,16 @@ async def cmd_medicines(message: Message):
         text_lines = [f"{EMOJI_MEDICINE} <b>Список лекарств:</b>\n"]
         
         for med in medicines:
-            medicine_id = med["id"]
             name = med["name"]
             latin_name = med.get("latin_name")
             daily_dose = med["daily_dose"]
             current_stock = med["current_stock"]
             
             # Рассчитываем дни до окончания
-            if daily_dose > 0:
-                days_left = int(current_stock / daily_dose) if current_stock > 0 else 0
-            else:
-                days_left = 0
+            days_left = meds_service.calculate_medicine_days_left(med, rates)
+            schedule = dose_schedule.describe(med["dose_schedule"])
             
-            # Получаем дату окончания рецепта
-            expiry_date = meds_service.get_prescription_expiry(medicine_id)
+            expiry_date = med["expiry_date"]
             
             # Формируем название с латинским названием, если есть
             if latin_name:
@@ -49,7 +47,10 @@ async def cmd_medicines(message: Message):
             else:
                 text_lines.append(f"<b>{name}</b>")
             
-            text_lines.append(f"  Доза в день: {daily_dose}")
+            if schedule:
+                text_lines.append(f"  Схема приёма: {schedule}")
+            else:
+                text_lines.append(f"  Доза в день: {daily_dose}")
             text_lines.append(f"  Остаток: {current_stock} единиц")
             text_lines.append(f"  Хватит примерно на: {days_left} дней")
             
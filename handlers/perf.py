@@ -0,0 +1,79 @@
+import logging
+from html import escape
+from aiogram import Router
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+
+from utils import perf
+from utils.emojis import EMOJI_CHART, EMOJI_ERROR, EMOJI_SUCCESS
+from utils.access_control import AccessControlMiddleware, check_admin_access
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+# Ограничение Telegram на длину сообщения - с запасом на разметку
+MAX_MESSAGE_LENGTH = 3900
+
+SECTIONS = [
+    ("Хендлеры", "handler."),
+    ("SQL", "db."),
+    ("Ночные задачи", "job."),
+    ("Bot API", "api."),
+]
+
+
+def _format_timings(title: str, prefix: str) -> list:
+    rows = perf.timings(prefix)
+    if not rows:
+        return []
+    
+    lines = [f"{title}: count  p50  p95  max (мс)"]
+    for name, summary in rows.items():
+        lines.append(
+            f"  {name[len(prefix):]}: {summary['count']}  "
+            f"{summary['p50_ms']:.1f}  {summary['p95_ms']:.1f}  {summary['max_ms']:.1f}"
+        )
+    return lines
+
+
+@router.message(Command("perf"))
+async def cmd_perf(message: Message, command: CommandObject):
+    """Обработчик команды /perf [reset] - счётчики производительности (только для администраторов)."""
+    try:
+        if not check_admin_access(message.from_user.id):
+            await message.answer(f"{EMOJI_ERROR} Команда доступна только администраторам.")
+            return
+        
+        if (command.args or "").strip().lower() == "reset":
+            perf.reset()
+            await message.answer(f"{EMOJI_SUCCESS} Счётчики производительности сброшены.")
+            return
+        
+        lines = []
+        for title, prefix in SECTIONS:
+            section = _format_timings(title, prefix)
+            if section:
+                lines.extend(section)
+                lines.append("")
+        
+        counters = perf.counters()
+        if counters:
+            lines.append("Счётчики:")
+            lines.extend(f"  {name}: {value}" for name, value in counters.items())
+        
+        if not lines:
+            await message.answer(f"{EMOJI_CHART} Замеров пока нет.")
+            return
+        
+        text = escape("\n".join(lines).strip())
+        if len(text) > MAX_MESSAGE_LENGTH:
+            text = text[:MAX_MESSAGE_LENGTH] + "\n…"
+        
+        await message.answer(f"{EMOJI_CHART} <b>Производительность</b>\n<pre>{text}</pre>")
+    
+    except Exception as e:
+        logger.error(f"Ошибка при выводе счётчиков производительности: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при выводе счётчиков.")
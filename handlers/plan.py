@@ -0,0 +1,80 @@
+import logging
+from datetime import date, timedelta
+from aiogram import Router
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+
+from config import PLAN_MAX_HORIZON_DAYS
+from services import meds_service, purchase_planner
+from handlers.start import get_main_keyboard
+from utils.emojis import EMOJI_CART, EMOJI_MEDICINE, EMOJI_SUCCESS, EMOJI_ERROR, EMOJI_BOX
+from utils.access_control import AccessControlMiddleware
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+
+@router.message(Command("plan"))
+async def cmd_plan(message: Message, command: CommandObject):
+    """Обработчик команды /plan [дней] - сколько упаковок купить."""
+    try:
+        horizon_days = None
+        if command.args:
+            try:
+                horizon_days = int(command.args.strip())
+                if not 0 < horizon_days <= PLAN_MAX_HORIZON_DAYS:
+                    raise ValueError
+            except ValueError:
+                await message.answer(
+                    f"{EMOJI_ERROR} Укажите число дней от 1 до {PLAN_MAX_HORIZON_DAYS}, например: /plan 60"
+                )
+                return
+        
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        medicines = meds_service.get_all_medicines(household_id)
+        
+        if not medicines:
+            await message.answer(f"{EMOJI_BOX} Список лекарств пуст.")
+            return
+        
+        rates = meds_service.get_projection_rates(household_id)
+        plan = purchase_planner.plan_purchases(medicines, horizon_days, rates)
+        today = date.today()
+        
+        if horizon_days:
+            title = f"{EMOJI_CART} <b>План покупок на {horizon_days} дней</b>\n"
+        else:
+            title = f"{EMOJI_CART} <b>План покупок до окончания рецептов</b>\n"
+        text_lines = [title]
+        enough = []
+        
+        for item in plan:
+            if item["need"] == 0:
+                enough.append(item["name"])
+                continue
+            
+            until = (today + timedelta(days=item["horizon_days"])).strftime("%d.%m.%Y")
+            text_lines.append(f"{EMOJI_MEDICINE} <b>{item['name']}</b> — до {until}")
+            text_lines.append(f"  Не хватает: {item['need']} единиц")
+            
+            if item["packs"]:
+                text_lines.append(f"  Купить: {purchase_planner.format_packs(item['packs'])}")
+                if item["leftover"]:
+                    text_lines.append(f"  Останется сверх нужного: {item['leftover']} единиц")
+            else:
+                text_lines.append(f"  Купить: {item['need']} единиц (размер упаковки не задан)")
+            
+            text_lines.append("")
+        
+        if enough:
+            text_lines.append(f"{EMOJI_SUCCESS} Хватает: {', '.join(enough)}")
+        
+        response_text = "\n".join(text_lines)
+        await message.answer(response_text, reply_markup=get_main_keyboard())
+    
+    except Exception as e:
+        logger.error(f"Ошибка при составлении плана покупок: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при составлении плана покупок.")
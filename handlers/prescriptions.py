@@ -6,7 +6,7 @@ from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from services import meds_service
+from services import meds_service, medicine_search, status_board
 from utils.emojis import EMOJI_MEDICINE, EMOJI_ERROR, EMOJI_SUCCESS, EMOJI_BOX, EMOJI_CALENDAR
 from utils.access_control import AccessControlMiddleware
 
@@ -26,7 +26,8 @@ class PrescriptionStates(StatesGroup):
 async def cmd_set_prescription(message: Message, state: FSMContext):
     """Обработчик команды /set_prescription."""
     try:
-        medicines = meds_service.get_all_medicines()
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        medicines = meds_service.get_all_medicines(household_id)
         
         if not medicines:
             await message.answer(f"{EMOJI_BOX} Список лекарств пуст.")
@@ -45,7 +46,8 @@ async def cmd_set_prescription(message: Message, state: FSMContext):
         keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
         
         await message.answer(
-            f"{EMOJI_MEDICINE} Выберите лекарство, для которого хотите установить дату окончания рецепта:",
+            f"{EMOJI_MEDICINE} Выберите лекарство, для которого хотите установить дату окончания рецепта, "
+            f"или напишите его название:",
             reply_markup=keyboard
         )
         
@@ -62,7 +64,8 @@ async def process_medicine_selection(callback: CallbackQuery, state: FSMContext)
     """Обработка выбора лекарства."""
     try:
         medicine_id = int(callback.data.split("_")[-1])
-        medicine = meds_service.get_medicine_by_id(medicine_id)
+        household_id = meds_service.get_user_household_id(callback.from_user.id, callback.from_user.first_name)
+        medicine = meds_service.get_medicine_by_id(medicine_id, household_id)
         
         if not medicine:
             await callback.answer("Лекарство не найдено", show_alert=True)
@@ -72,11 +75,7 @@ async def process_medicine_selection(callback: CallbackQuery, state: FSMContext)
         await state.update_data(medicine_id=medicine_id, medicine_name=medicine["name"])
         await state.set_state(PrescriptionStates.waiting_for_date)
         
-        await callback.message.edit_text(
-            f"{EMOJI_CALENDAR} Вы выбрали: <b>{medicine['name']}</b>\n\n"
-            f"Введите дату окончания рецепта в формате <b>ДД.ММ.ГГГГ</b>\n"
-            f"Например: 31.12.2024"
-        )
+        await callback.message.edit_text(_date_prompt(medicine))
         await callback.answer()
     
     except Exception as e:
@@ -85,6 +84,15 @@ async def process_medicine_selection(callback: CallbackQuery, state: FSMContext)
         await state.clear()
 
 
+def _date_prompt(medicine: dict) -> str:
+    """Текст запроса даты окончания рецепта для выбранного лекарства."""
+    return (
+        f"{EMOJI_CALENDAR} Вы выбрали: <b>{medicine['name']}</b>\n\n"
+        f"Введите дату окончания рецепта в формате <b>ДД.ММ.ГГГГ</b>\n"
+        f"Например: 31.12.2024"
+    )
+
+
 @router.message(Command("cancel"), StateFilter(PrescriptionStates))
 async def cmd_cancel_prescription(message: Message, state: FSMContext):
     """Отмена установки рецепта."""
@@ -92,6 +100,36 @@ async def cmd_cancel_prescription(message: Message, state: FSMContext):
     await message.answer(f"{EMOJI_ERROR} Операция отменена.")
 
 
+@router.message(StateFilter(PrescriptionStates.waiting_for_medicine), F.text, ~F.text.startswith("/"))
+async def process_medicine_search(message: Message, state: FSMContext):
+    """Название лекарства текстом вместо кнопки (допускаются опечатки)."""
+    try:
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        matches = medicine_search.find_medicines(household_id, message.text)
+        
+        if not matches:
+            await message.answer(f"{EMOJI_ERROR} Лекарство «{message.text}» не найдено. Попробуйте иначе или выберите кнопкой.")
+            return
+        
+        if len(matches) > 1:
+            keyboard = InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text=med["name"], callback_data=f"presc_med_{med['id']}")]
+                for med in matches
+            ])
+            await message.answer(f"{EMOJI_MEDICINE} Уточните лекарство:", reply_markup=keyboard)
+            return
+        
+        medicine = matches[0]
+        await state.update_data(medicine_id=medicine["id"], medicine_name=medicine["name"])
+        await state.set_state(PrescriptionStates.waiting_for_date)
+        await message.answer(_date_prompt(medicine))
+    
+    except Exception as e:
+        logger.error(f"Ошибка при поиске лекарства: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка.")
+        await state.clear()
+
+
 @router.message(StateFilter(PrescriptionStates.waiting_for_date))
 async def process_date_input(message: Message, state: FSMContext):
     """Обработка ввода даты."""
@@ -123,6 +161,9 @@ async def process_date_input(message: Message, state: FSMContext):
         )
         
         await state.clear()
+        
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        await status_board.refresh_household(message.bot, household_id)
     
     except Exception as e:
         logger.error(f"Ошибка при обработке даты: {e}")
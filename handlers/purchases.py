@@ -1,11 +1,12 @@
 import logging
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from services import meds_service
+from services import meds_service, purchase_planner, purchase_batch, medicine_search, status_board
+from utils.money import format_money
 from utils.emojis import EMOJI_MEDICINE, EMOJI_ERROR, EMOJI_SUCCESS, EMOJI_BOX
 from utils.access_control import AccessControlMiddleware
 
@@ -21,12 +22,27 @@ class PurchaseStates(StatesGroup):
     waiting_for_quantity = State()
 
 
+class BatchPurchaseStates(StatesGroup):
+    waiting_for_lines = State()
+    waiting_for_confirm = State()
+
+
+BATCH_HELP = (
+    "Отправьте покупки одним сообщением, по строке на лекарство:\n"
+    "<code>Алзепил 30\n"
+    "Мемантин 60 1250\n"
+    "Сероквель -2</code>\n\n"
+    "Название или латинское название, количество и, если нужно, цена покупки в рублях."
+)
+
+
 @router.message(Command("add_purchase"))
 async def cmd_add_purchase(message: Message, state: FSMContext):
     """Обработчик команды /add_purchase."""
     try:
         logger.info(f"[add_purchase] Старт, user_id={message.from_user.id if message.from_user else None}")
-        medicines = meds_service.get_all_medicines()
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        medicines = meds_service.get_all_medicines(household_id)
         
         if not medicines:
             await message.answer(f"{EMOJI_BOX} Список лекарств пуст.")
@@ -45,13 +61,14 @@ async def cmd_add_purchase(message: Message, state: FSMContext):
         keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
         
         await message.answer(
-            f"{EMOJI_MEDICINE} Выберите лекарство, которое вы купили:",
+            f"{EMOJI_MEDICINE} Выберите лекарство, которое вы купили, или напишите его название:\n\n"
+            f"Несколько покупок сразу — /add_purchases",
             reply_markup=keyboard
         )
         
         await state.set_state(PurchaseStates.waiting_for_medicine)
         logger.info(f"[add_purchase] Показан список из {len(medicines)} лекарств, state=waiting_for_medicine")
-
+    
     except Exception as e:
         logger.error(f"Ошибка при добавлении покупки: {e}", exc_info=True)
         await message.answer(f"{EMOJI_ERROR} Произошла ошибка.")
@@ -64,7 +81,8 @@ async def process_medicine_selection(callback: CallbackQuery, state: FSMContext)
     try:
         medicine_id = int(callback.data.split("_")[-1])
         logger.info(f"[add_purchase] Выбрано лекарство id={medicine_id}, user_id={callback.from_user.id if callback.from_user else None}")
-        medicine = meds_service.get_medicine_by_id(medicine_id)
+        household_id = meds_service.get_user_household_id(callback.from_user.id, callback.from_user.first_name)
+        medicine = meds_service.get_medicine_by_id(medicine_id, household_id)
         
         if not medicine:
             await callback.answer("Лекарство не найдено", show_alert=True)
@@ -74,74 +92,327 @@ async def process_medicine_selection(callback: CallbackQuery, state: FSMContext)
         await state.update_data(medicine_id=medicine_id, medicine_name=medicine["name"])
         await state.set_state(PurchaseStates.waiting_for_quantity)
         
-        await callback.message.edit_text(
-            f"{EMOJI_BOX} Вы выбрали: <b>{medicine['name']}</b>\n\n"
-            f"Введите количество (целое число):\n"
-            f"• положительное — добавить к остатку\n"
-            f"• отрицательное — уменьшить остаток (коррекция)"
-        )
+        await callback.message.edit_text(_quantity_prompt(medicine), reply_markup=_build_packs_keyboard(medicine))
         await callback.answer()
         logger.info(f"[add_purchase] Ожидание ввода количества, state=waiting_for_quantity")
-
+    
     except Exception as e:
         logger.error(f"Ошибка при выборе лекарства: {e}", exc_info=True)
         await callback.answer("Произошла ошибка", show_alert=True)
         await state.clear()
 
 
-@router.message(Command("cancel"), StateFilter(PurchaseStates))
+def _quantity_prompt(medicine: dict) -> str:
+    """Текст запроса количества для выбранного лекарства."""
+    packs_hint = ""
+    if medicine["package_sizes"]:
+        packs_hint = "\n\nИли нажмите кнопку с купленными упаковками:"
+    
+    return (
+        f"{EMOJI_BOX} Вы выбрали: <b>{medicine['name']}</b>\n\n"
+        f"Введите количество (целое число):\n"
+        f"• положительное — добавить к остатку\n"
+        f"• отрицательное — уменьшить остаток (коррекция)\n\n"
+        f"Через пробел можно указать цену покупки в рублях: <code>60 1250</code>"
+        f"{packs_hint}"
+    )
+
+
+def _build_packs_keyboard(medicine: dict):
+    """Кнопки «купил N упаковок»: рекомендация из /plan и 1-3 упаковки каждого размера."""
+    if not medicine["package_sizes"]:
+        return None
+    
+    keyboard_buttons = []
+    
+    rates = meds_service.get_projection_rates(medicine["household_id"])
+    recommendation = purchase_planner.plan_purchases([medicine], rates=rates)[0]
+    if recommendation["packs"]:
+        keyboard_buttons.append([
+            InlineKeyboardButton(
+                text=f"Купил по плану: {purchase_planner.format_packs(recommendation['packs'])}",
+                callback_data=f"purchase_qty_{recommendation['units']}"
+            )
+        ])
+    
+    for size in medicine["package_sizes"]:
+        keyboard_buttons.append([
+            InlineKeyboardButton(text=f"{count} × {size}", callback_data=f"purchase_qty_{count * size}")
+            for count in (1, 2, 3)
+        ])
+    
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+
+@router.message(Command("cancel"), StateFilter(PurchaseStates, BatchPurchaseStates))
 async def cmd_cancel_purchase(message: Message, state: FSMContext):
     """Отмена добавления покупки."""
     await state.clear()
     await message.answer(f"{EMOJI_ERROR} Операция отменена.")
 
 
+@router.message(StateFilter(PurchaseStates.waiting_for_medicine), F.text, ~F.text.startswith("/"))
+async def process_medicine_search(message: Message, state: FSMContext):
+    """Название лекарства текстом вместо кнопки (допускаются опечатки)."""
+    try:
+        # Несколько строк «название количество» - это сразу покупки
+        if "\n" in message.text and purchase_batch.looks_like_batch(message.text):
+            await _preview_batch(message, state, message.text)
+            return
+        
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        matches = medicine_search.find_medicines(household_id, message.text)
+        logger.info(f"[add_purchase] Поиск «{message.text}»: найдено {len(matches)}")
+        
+        if not matches:
+            await message.answer(f"{EMOJI_ERROR} Лекарство «{message.text}» не найдено. Попробуйте иначе или выберите кнопкой.")
+            return
+        
+        if len(matches) > 1:
+            keyboard = InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text=med["name"], callback_data=f"purchase_med_{med['id']}")]
+                for med in matches
+            ])
+            await message.answer(f"{EMOJI_MEDICINE} Уточните лекарство:", reply_markup=keyboard)
+            return
+        
+        medicine = matches[0]
+        await state.update_data(medicine_id=medicine["id"], medicine_name=medicine["name"])
+        await state.set_state(PurchaseStates.waiting_for_quantity)
+        await message.answer(_quantity_prompt(medicine), reply_markup=_build_packs_keyboard(medicine))
+    
+    except Exception as e:
+        logger.error(f"Ошибка при поиске лекарства: {e}", exc_info=True)
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка.")
+        await state.clear()
+
+
 @router.message(StateFilter(PurchaseStates.waiting_for_quantity))
 async def process_quantity_input(message: Message, state: FSMContext):
     """Обработка ввода количества."""
     try:
         logger.info(f"[add_purchase] Получен ввод количества: text='{message.text}', user_id={message.from_user.id if message.from_user else None}")
-        data = await state.get_data()
-        medicine_id = data.get("medicine_id")
-        medicine_name = data.get("medicine_name")
         
-        # Парсим количество (допускаем отрицательные для коррекции)
+        # Парсим количество (допускаем отрицательные для коррекции) и необязательную цену
+        parts = (message.text or "").split()
         try:
-            quantity = int(message.text.strip())
+            if not 1 <= len(parts) <= 2:
+                raise ValueError
+            quantity = int(parts[0])
             if quantity == 0:
                 await message.answer(f"{EMOJI_ERROR} Введите ненулевое число (например: 30 или -10)")
                 return
         except ValueError:
-            await message.answer(f"{EMOJI_ERROR} Введите целое число (например: 30 или -10)")
+            await message.answer(f"{EMOJI_ERROR} Введите целое число и, если нужно, цену (например: 30 или 30 1250)")
             return
         
-        # Добавляем покупку
-        logger.info(f"[add_purchase] Сохранение: medicine_id={medicine_id}, quantity={quantity}")
-        new_stock = meds_service.add_purchase(medicine_id, quantity)
+        price = None
+        if len(parts) == 2:
+            try:
+                price = float(parts[1].replace(",", "."))
+                if price < 0 or quantity < 0:
+                    raise ValueError
+            except ValueError:
+                await message.answer(f"{EMOJI_ERROR} Цена - неотрицательное число и только для покупки (например: 30 1250)")
+                return
         
-        # Получаем информацию о лекарстве для расчёта дней
-        medicine = meds_service.get_medicine_by_id(medicine_id)
-        daily_dose = medicine["daily_dose"]
+        await _save_purchase(message, state, quantity, price)
+    
+    except Exception as e:
+        logger.error(f"Ошибка при обработке количества: {e}", exc_info=True)
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при сохранении покупки.")
+        await state.clear()
+
+
+@router.callback_query(StateFilter(PurchaseStates.waiting_for_quantity), F.data.startswith("purchase_qty_"))
+async def process_packs_button(callback: CallbackQuery, state: FSMContext):
+    """Обработка кнопки «купил N упаковок»."""
+    try:
+        quantity = int(callback.data.split("_")[-1])
+        logger.info(f"[add_purchase] Нажата кнопка упаковок: quantity={quantity}, user_id={callback.from_user.id}")
         
-        if daily_dose > 0:
-            days_left = int(new_stock / daily_dose) if new_stock > 0 else 0
-        else:
-            days_left = 0
+        await callback.message.edit_reply_markup(reply_markup=None)
+        await _save_purchase(callback.message, state, quantity)
+        await callback.answer()
+    
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении покупки по кнопке: {e}", exc_info=True)
+        await callback.answer("Произошла ошибка", show_alert=True)
+        await state.clear()
+
+
+async def _save_purchase(message: Message, state: FSMContext, quantity: int, price: float = None):
+    """Сохраняет покупку выбранного лекарства и сообщает новый остаток."""
+    data = await state.get_data()
+    medicine_id = data.get("medicine_id")
+    medicine_name = data.get("medicine_name")
+    
+    # Добавляем покупку
+    logger.info(f"[add_purchase] Сохранение: medicine_id={medicine_id}, quantity={quantity}, price={price}")
+    new_stock = meds_service.add_purchase(medicine_id, quantity, price)
+    
+    # Получаем информацию о лекарстве для расчёта дней
+    medicine = meds_service.get_medicine_by_id(medicine_id)
+    rates = meds_service.get_projection_rates(medicine["household_id"])
+    days_left = meds_service.calculate_medicine_days_left(medicine, rates)
+    
+    action = "Добавлено" if quantity > 0 else "Убавлено"
+    price_line = f"Цена: <b>{format_money(price)}</b>\n" if price is not None else ""
+    await message.answer(
+        f"{EMOJI_SUCCESS} Остаток обновлён!\n\n"
+        f"Лекарство: <b>{medicine_name}</b>\n"
+        f"{action}: <b>{quantity:+d}</b> единиц\n"
+        f"{price_line}"
+        f"Текущий остаток: <b>{new_stock}</b> единиц\n"
+        f"Хватит примерно на: <b>{days_left}</b> дней"
+    )
+    
+    await state.clear()
+    logger.info(f"[add_purchase] Покупка успешно добавлена, new_stock={new_stock}")
+    
+    await status_board.refresh_household(message.bot, medicine["household_id"])
+
+
+@router.message(Command("add_purchases"))
+async def cmd_add_purchases(message: Message, state: FSMContext, command: CommandObject):
+    """Обработчик команды /add_purchases - несколько покупок одним сообщением."""
+    try:
+        if command.args:
+            await _preview_batch(message, state, command.args)
+            return
         
-        action = "Добавлено" if quantity > 0 else "Убавлено"
+        await state.set_state(BatchPurchaseStates.waiting_for_lines)
+        await message.answer(f"{EMOJI_BOX} {BATCH_HELP}\n\nОтмена — /cancel")
+    
+    except Exception as e:
+        logger.error(f"Ошибка при добавлении покупок пачкой: {e}", exc_info=True)
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка.")
+        await state.clear()
+
+
+@router.message(StateFilter(BatchPurchaseStates.waiting_for_lines), F.text)
+async def process_batch_lines(message: Message, state: FSMContext):
+    """Строки покупок после /add_purchases."""
+    try:
+        await _preview_batch(message, state, message.text)
+    
+    except Exception as e:
+        logger.error(f"Ошибка при разборе покупок: {e}", exc_info=True)
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка.")
+        await state.clear()
+
+
+async def _is_idle_batch(message: Message, raw_state: str | None = None) -> bool:
+    """Сообщение вне диалогов считается покупками, только если в нём несколько строк
+    или название в единственной строке - известное лекарство (иначе «приду 5» тоже подошло бы).
+    
+    Фильтр проверяется для каждого сообщения, поэтому сначала идут дешёвые
+    проверки (состояние FSM, вид текста), а в БД - только для подходящей строки.
+    Доступ уже проверен AccessControlMiddleware на уровне диспетчера.
+    """
+    text = message.text
+    if raw_state is not None or not purchase_batch.looks_like_batch(text):
+        return False
+    if "\n" in text.strip():
+        return True
+    household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+    return purchase_batch.names_known_medicine(meds_service.get_all_medicines(household_id), text)
+
+
+@router.message(_is_idle_batch)
+async def process_batch_message(message: Message, state: FSMContext):
+    """Сообщение вида «Алзепил 30» вне диалогов - покупки без команды."""
+    try:
+        await _preview_batch(message, state, message.text, idle=True)
+    
+    except Exception as e:
+        logger.error(f"Ошибка при разборе покупок: {e}", exc_info=True)
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка.")
+        await state.clear()
+
+
+async def _preview_batch(message: Message, state: FSMContext, text: str, idle: bool = False):
+    """Разбирает строки покупок и показывает, что будет записано, с кнопкой подтверждения.
+    
+    idle - сообщение пришло вне диалога: если ничего не распознано, бот
+    отвечает один раз и не переводит пользователя в режим ввода покупок.
+    """
+    household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+    medicines = meds_service.get_all_medicines(household_id)
+    items, errors = purchase_batch.parse_purchase_lines(household_id, medicines, text)
+    logger.info(f"[add_purchases] Разобрано строк: {len(items)}, ошибок: {len(errors)}")
+    
+    error_lines = [f"{EMOJI_ERROR} «{line}» — {reason}" for line, reason in errors]
+    if not items:
+        if idle:
+            await message.answer("\n".join(error_lines) + f"\n\n{BATCH_HELP}")
+            return
+        await state.set_state(BatchPurchaseStates.waiting_for_lines)
         await message.answer(
-            f"{EMOJI_SUCCESS} Остаток обновлён!\n\n"
-            f"Лекарство: <b>{medicine_name}</b>\n"
-            f"{action}: <b>{quantity:+d}</b> единиц\n"
-            f"Текущий остаток: <b>{new_stock}</b> единиц\n"
-            f"Хватит примерно на: <b>{days_left}</b> дней"
+            "\n".join(error_lines) + f"\n\n{BATCH_HELP}\n\nИсправьте строки и отправьте снова или /cancel"
         )
-        
-        await state.clear()
-        logger.info(f"[add_purchase] Покупка успешно добавлена, new_stock={new_stock}")
+        return
+    
+    # Остаток после предыдущих строк того же лекарства
+    stocks = {}
+    text_lines = [f"{EMOJI_BOX} <b>Проверьте покупки:</b>\n"]
+    for item in items:
+        before = stocks.get(item["medicine_id"], item["current_stock"])
+        stocks[item["medicine_id"]] = max(0, before + item["quantity"])
+        line = f"{EMOJI_MEDICINE} {item['name']}: <b>{item['quantity']:+d}</b> (остаток {before} → {stocks[item['medicine_id']]})"
+        if item["price"] is not None:
+            line += f", {format_money(item['price'])}"
+        text_lines.append(line)
+    
+    if error_lines:
+        text_lines.append("\n<b>Не распознано (не будет записано):</b>")
+        text_lines.extend(error_lines)
+    
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text=f"{EMOJI_SUCCESS} Внести ({len(items)})", callback_data="batch_confirm"),
+        InlineKeyboardButton(text=f"{EMOJI_ERROR} Отмена", callback_data="batch_cancel"),
+    ]])
+    
+    await state.set_state(BatchPurchaseStates.waiting_for_confirm)
+    await state.update_data(batch_items=[
+        {"medicine_id": item["medicine_id"], "name": item["name"], "quantity": item["quantity"], "price": item["price"]}
+        for item in items
+    ])
+    await message.answer("\n".join(text_lines), reply_markup=keyboard)
 
+
+@router.callback_query(StateFilter(BatchPurchaseStates.waiting_for_confirm), F.data == "batch_confirm")
+async def process_batch_confirm(callback: CallbackQuery, state: FSMContext):
+    """Записывает все покупки из предпросмотра одной транзакцией."""
+    try:
+        items = (await state.get_data()).get("batch_items", [])
+        household_id = meds_service.get_user_household_id(callback.from_user.id, callback.from_user.first_name)
+        new_stocks = meds_service.add_purchases(household_id, items)
+        await state.clear()
+        
+        text_lines = [f"{EMOJI_SUCCESS} <b>Записано покупок: {len(items)}</b>\n"]
+        for item in items:
+            text_lines.append(f"{EMOJI_MEDICINE} {item['name']}: {item['quantity']:+d}")
+        text_lines.append("\n<b>Остатки:</b>")
+        names = {item["medicine_id"]: item["name"] for item in items}
+        for medicine_id, stock in new_stocks.items():
+            text_lines.append(f"{names[medicine_id]}: {stock} единиц")
+        
+        await callback.message.edit_text("\n".join(text_lines))
+        await callback.answer()
+        logger.info(f"[add_purchases] Записано покупок: {len(items)}")
+        
+        await status_board.refresh_household(callback.bot, household_id)
+    
     except Exception as e:
-        logger.error(f"Ошибка при обработке количества: {e}", exc_info=True)
-        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при сохранении покупки.")
+        logger.error(f"Ошибка при записи покупок пачкой: {e}", exc_info=True)
+        await callback.answer("Покупки не записаны: произошла ошибка", show_alert=True)
         await state.clear()
 
+
+@router.callback_query(StateFilter(BatchPurchaseStates.waiting_for_confirm), F.data == "batch_cancel")
+async def process_batch_cancel(callback: CallbackQuery, state: FSMContext):
+    """Отмена записи покупок из предпросмотра."""
+    await state.clear()
+    await callback.message.edit_text(f"{EMOJI_ERROR} Покупки не записаны.")
+    await callback.answer()
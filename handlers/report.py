@@ -1,9 +1,9 @@
 import logging
-from datetime import datetime
 from aiogram import Router, F
 from aiogram.types import Message
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 
+from config import REPORT_DEFAULT_HORIZON_DAYS, REPORT_MAX_HORIZON_DAYS
 from services import meds_service
 from handlers.start import get_main_keyboard
 from utils.emojis import EMOJI_REPORT, EMOJI_MEDICINE, EMOJI_PRESCRIPTION, EMOJI_SUCCESS, EMOJI_ERROR
@@ -15,36 +15,68 @@ router = Router()
 router.message.middleware(AccessControlMiddleware())
 router.callback_query.middleware(AccessControlMiddleware())
 
+# Ключевые слова для сортировки одним списком по дате
+SORT_BY_DATE_ARGS = ("дата", "date")
+
+
+def _parse_report_args(args: str | None):
+    """Разбирает аргументы /report [дней] [дата]. Возвращает (horizon_days, group_by_type)."""
+    horizon_days = REPORT_DEFAULT_HORIZON_DAYS
+    group_by_type = True
+    
+    for arg in (args or "").split():
+        if arg.lower() in SORT_BY_DATE_ARGS:
+            group_by_type = False
+            continue
+        horizon_days = int(arg)
+        if not 0 < horizon_days <= REPORT_MAX_HORIZON_DAYS:
+            raise ValueError(f"горизонт должен быть от 1 до {REPORT_MAX_HORIZON_DAYS} дней")
+    
+    return horizon_days, group_by_type
+
+
+def _period_text(horizon_days: int) -> str:
+    if horizon_days == REPORT_DEFAULT_HORIZON_DAYS:
+        return "в течение месяца"
+    return f"в ближайшие {horizon_days} дн."
+
 
 @router.message(Command("report"))
-async def cmd_report(message: Message):
-    """Обработчик команды /report - отчёт по лекарствам/рецептам, которые закончатся в течение месяца."""
+async def cmd_report(message: Message, command: CommandObject = None):
+    """Обработчик команды /report [дней] [дата] - что закончится в ближайшие N дней (по умолчанию месяц)."""
     try:
-        expiring_items = meds_service.get_medicines_expiring_within_month()
+        try:
+            horizon_days, group_by_type = _parse_report_args(command.args if command else None)
+        except ValueError:
+            await message.answer(
+                f"{EMOJI_ERROR} Укажите горизонт в днях (от 1 до {REPORT_MAX_HORIZON_DAYS}), например: /report 90\n"
+                f"Добавьте «дата», чтобы отсортировать всё одним списком: /report 90 дата"
+            )
+            return
+        
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        expiring_items = meds_service.get_expiring_items(household_id, horizon_days, group_by_type)
+        period = _period_text(horizon_days)
         
         if not expiring_items:
-            await message.answer(f"{EMOJI_SUCCESS} Нет лекарств или рецептов, которые закончатся в течение месяца.")
+            await message.answer(f"{EMOJI_SUCCESS} Нет лекарств или рецептов, которые закончатся {period}.")
             return
         
-        text_lines = [f"{EMOJI_REPORT} <b>Отчёт: что закончится в течение месяца</b>\n"]
+        text_lines = [f"{EMOJI_REPORT} <b>Отчёт: что закончится {period}</b>\n"]
+        current_type = None
         
         for item in expiring_items:
             name = item["name"]
             latin_name = item.get("latin_name")
             item_type = item["type"]
-            expiry_date_str = item["expiry_date"]
             days_left = item["days_left"]
+            formatted_date = item["display_date"]
             
-            # Форматируем дату для отображения
-            try:
-                expiry_date = datetime.fromisoformat(expiry_date_str).date()
-                formatted_date = expiry_date.strftime("%d.%m.%Y")
-            except (ValueError, AttributeError):
-                try:
-                    expiry_date = datetime.strptime(expiry_date_str, "%Y-%m-%d").date()
-                    formatted_date = expiry_date.strftime("%d.%m.%Y")
-                except ValueError:
-                    formatted_date = expiry_date_str
+            if group_by_type and item_type != current_type:
+                if current_type is not None:
+                    text_lines.append("")
+                text_lines.append("<b>Лекарства:</b>" if item_type == "лекарство" else "<b>Рецепты:</b>")
+                current_type = item_type
             
             # Формируем название с латинским названием, если есть
             if latin_name:
@@ -53,12 +85,15 @@ async def cmd_report(message: Message):
                 name_display = name
             
             if item_type == "лекарство":
-                if days_left == 0:
+                if days_left <= 0:
                     text_lines.append(f"{EMOJI_MEDICINE} {name_display} — закончилось")
                 else:
                     text_lines.append(f"{EMOJI_MEDICINE} {name_display} - {formatted_date}")
             else:  # рецепт
-                text_lines.append(f"{EMOJI_PRESCRIPTION} {name_display} - {formatted_date}")
+                if days_left < 0:
+                    text_lines.append(f"{EMOJI_PRESCRIPTION} {name_display} — истёк {formatted_date}")
+                else:
+                    text_lines.append(f"{EMOJI_PRESCRIPTION} {name_display} - {formatted_date}")
         
         response_text = "\n".join(text_lines)
         await message.answer(response_text, reply_markup=get_main_keyboard())
@@ -66,4 +101,3 @@ async def cmd_report(message: Message):
     except Exception as e:
         logger.error(f"Ошибка при получении отчёта: {e}")
         await message.answer(f"{EMOJI_ERROR} Произошла ошибка при получении отчёта.")
-
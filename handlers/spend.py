@@ -0,0 +1,113 @@
+import logging
+from aiogram import Router
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+
+from config import SPEND_DEFAULT_MONTHS, SPEND_MAX_MONTHS
+from services import meds_service
+from handlers.start import get_main_keyboard
+from utils.money import format_money
+from utils.emojis import EMOJI_CART, EMOJI_CHART, EMOJI_MEDICINE, EMOJI_ERROR, EMOJI_BOX
+from utils.access_control import AccessControlMiddleware
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.middleware(AccessControlMiddleware())
+router.callback_query.middleware(AccessControlMiddleware())
+
+
+def _format_change(current: float, previous: float) -> str:
+    """Изменение суммы относительно предыдущего периода: ▲ +15% / ▼ -20%."""
+    if not previous or not current:
+        return ""
+    change = (current / previous - 1) * 100
+    arrow = "▲" if change >= 0 else "▼"
+    return f" {arrow} {change:+.0f}%"
+
+
+def _format_cost(item: dict) -> str:
+    """Сумма итога или пометка, что ни у одной покупки нет цены."""
+    if not item["priced_purchases"]:
+        return "цена не указана"
+    return format_money(item["cost"])
+
+
+def _format_month(month: str) -> str:
+    year, month_number = month.split("-")
+    return f"{month_number}.{year}"
+
+
+@router.message(Command("spend"))
+async def cmd_spend(message: Message, command: CommandObject):
+    """Обработчик команды /spend [месяцев] - расходы на лекарства по месяцам."""
+    try:
+        months = SPEND_DEFAULT_MONTHS
+        if command.args:
+            try:
+                months = int(command.args.strip())
+                if not 0 < months <= SPEND_MAX_MONTHS:
+                    raise ValueError
+            except ValueError:
+                await message.answer(
+                    f"{EMOJI_ERROR} Укажите число месяцев от 1 до {SPEND_MAX_MONTHS}, например: /spend 6"
+                )
+                return
+        
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        monthly = meds_service.get_monthly_spending(household_id, months)
+        
+        if not any(item["purchases"] for item in monthly):
+            await message.answer(f"{EMOJI_BOX} За последние {months} мес. покупок нет.")
+            return
+        
+        text_lines = [f"{EMOJI_CART} <b>Расходы на лекарства за {months} мес.</b>\n"]
+        previous_cost = None
+        for item in monthly:
+            if item["purchases"]:
+                line = (
+                    f"{_format_month(item['month'])}: <b>{_format_cost(item)}</b> "
+                    f"({item['purchases']} покуп., {item['quantity']} ед.)"
+                    f"{_format_change(item['cost'], previous_cost)}"
+                )
+                unpriced = item["purchases"] - item["priced_purchases"]
+                if unpriced and item["priced_purchases"]:
+                    line += f", без цены: {unpriced}"
+                text_lines.append(line)
+            else:
+                text_lines.append(f"{_format_month(item['month'])}: —")
+            previous_cost = item["cost"]
+        
+        total_cost = sum(item["cost"] for item in monthly)
+        months_with_cost = [item["cost"] for item in monthly if item["cost"]]
+        text_lines.append("")
+        text_lines.append(f"{EMOJI_CHART} Итого: <b>{format_money(total_cost)}</b>")
+        if months_with_cost:
+            text_lines.append(
+                f"В среднем за месяц (где указаны цены): {format_money(total_cost / len(months_with_cost))}"
+            )
+        
+        # Тренд: последние три месяца против трёх предыдущих
+        if months >= 6:
+            recent = sum(item["cost"] for item in monthly[-3:])
+            earlier = sum(item["cost"] for item in monthly[-6:-3])
+            if recent and earlier:
+                text_lines.append(
+                    f"Последние 3 мес.: {format_money(recent)}{_format_change(recent, earlier)} "
+                    f"к предыдущим 3 мес."
+                )
+        
+        by_medicine = meds_service.get_spending_by_medicine(household_id, months)
+        text_lines.append("")
+        text_lines.append("<b>По лекарствам:</b>")
+        for item in by_medicine:
+            text_lines.append(
+                f"{EMOJI_MEDICINE} {item['name']}: {_format_cost(item)}, {item['quantity']} ед."
+            )
+        
+        response_text = "\n".join(text_lines)
+        await message.answer(response_text, reply_markup=get_main_keyboard())
+    
+    except Exception as e:
+        logger.error(f"Ошибка при подсчёте расходов: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при подсчёте расходов.")
@@ -47,14 +47,16 @@ async def cmd_start(message: Message):
     
     # Регистрируем пользователя
     try:
-        meds_service.get_or_create_user(user_id, first_name)
+        household_id = meds_service.get_user_household_id(user_id, first_name)
+        household = meds_service.get_household(household_id)
     except Exception as e:
         logger.error(f"Ошибка при регистрации пользователя: {e}")
         await message.answer(f"{EMOJI_ERROR} Произошла ошибка при регистрации. Попробуйте позже.")
         return
     
     welcome_text = (
-        f"{EMOJI_HELLO} Привет! Я бот для отслеживания лекарств для мамы.\n\n"
+        f"{EMOJI_HELLO} Привет! Я бот для отслеживания лекарств.\n"
+        f"Пациент: <b>{household['name']}</b>\n\n"
         "📋 <b>Что я умею:</b>\n"
         "• Отслеживать остатки лекарств\n"
         "• Отслеживать сроки действия рецептов\n"
@@ -64,9 +66,20 @@ async def cmd_start(message: Message):
         "📝 <b>Доступные команды:</b>\n"
         "/meds - показать список всех лекарств\n"
         "/status - показать запас наличия\n"
+        "/live_status on - закреплённая сводка, обновляется сама\n"
         "/set_prescription - установить дату окончания рецепта\n"
         "/add_purchase - добавить покупку лекарства\n"
-        "/report - ближайшие закупки\n\n"
+        "/add_purchases - несколько покупок одним сообщением\n"
+        "/report - ближайшие закупки\n"
+        "/plan - сколько упаковок купить\n"
+        "/calendar - календарь окончаний (.ics)\n"
+        "/consumption - фактический расход по истории покупок\n"
+        "/history - история покупок\n"
+        "/spend - расходы на лекарства по месяцам\n"
+        "/chart - график остатка с прогнозом\n"
+        "/doctor_report - отчёт для визита к врачу\n"
+        "/export, /import - выгрузка и загрузка данных\n"
+        "@имя_бота название - карточка лекарства в любом чате\n\n"
         f"Или используйте кнопки ниже {EMOJI_DOWN}"
     )
     
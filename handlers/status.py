@@ -1,11 +1,12 @@
 import logging
 from aiogram import Router, F
 from aiogram.types import Message
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 
-from services import meds_service
+from services import meds_service, status_board
+from services.status_board import format_status_card
 from handlers.start import get_main_keyboard
-from utils.emojis import EMOJI_STATUS, EMOJI_MEDICINE, EMOJI_ERROR, EMOJI_BOX
+from utils.emojis import EMOJI_STATUS, EMOJI_ERROR, EMOJI_BOX, EMOJI_SUCCESS
 from utils.access_control import AccessControlMiddleware
 
 logger = logging.getLogger(__name__)
@@ -19,7 +20,8 @@ router.callback_query.middleware(AccessControlMiddleware())
 async def cmd_status(message: Message):
     """Обработчик команды /status."""
     try:
-        status_data = meds_service.get_status_for_user()
+        household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+        status_data = meds_service.get_status_for_user(household_id)
         
         if not status_data:
             await message.answer(f"{EMOJI_BOX} Нет данных о лекарствах.")
@@ -28,22 +30,7 @@ async def cmd_status(message: Message):
         text_lines = [f"{EMOJI_STATUS} <b>Сводка по лекарствам:</b>\n"]
         
         for item in status_data:
-            # Формируем название с латинским названием, если есть
-            latin_name = item.get('latin_name')
-            if latin_name:
-                text_lines.append(f"{EMOJI_MEDICINE} <b>{item['name']}</b> ({latin_name})")
-            else:
-                text_lines.append(f"{EMOJI_MEDICINE} <b>{item['name']}</b>")
-            
-            text_lines.append(f"  Доза в день: {item['daily_dose']}")
-            text_lines.append(f"  Остаток: {item['current_stock']} единиц")
-            text_lines.append(f"  Хватит примерно на: {item['days_left']} дней")
-            
-            if item['expiry_date']:
-                text_lines.append(f"  Рецепт до: {item['expiry_date']}")
-            else:
-                text_lines.append(f"  Рецепт: не задан")
-            
+            text_lines.extend(format_status_card(item))
             text_lines.append("")
         
         response_text = "\n".join(text_lines)
@@ -53,3 +40,32 @@ async def cmd_status(message: Message):
         logger.error(f"Ошибка при получении статуса: {e}")
         await message.answer(f"{EMOJI_ERROR} Произошла ошибка при получении статуса.")
 
+
+@router.message(Command("live_status"))
+async def cmd_live_status(message: Message, command: CommandObject):
+    """Обработчик команды /live_status on|off - закреплённая сводка, которая обновляется сама."""
+    try:
+        mode = (command.args or "").strip().lower()
+        
+        if mode == "on":
+            household_id = meds_service.get_user_household_id(message.from_user.id, message.from_user.first_name)
+            await status_board.enable(message.bot, message.from_user.id, message.chat.id, household_id)
+            await message.answer(
+                f"{EMOJI_SUCCESS} Сводка закреплена и будет обновляться после покупок, "
+                f"изменения рецептов и ночной проверки остатков."
+            )
+        elif mode == "off":
+            if await status_board.disable(message.bot, message.from_user.id):
+                await message.answer(f"{EMOJI_SUCCESS} Живая сводка выключена.")
+            else:
+                await message.answer(f"{EMOJI_BOX} Живая сводка не была включена.")
+        else:
+            enabled = status_board.get_board(message.from_user.id) is not None
+            await message.answer(
+                f"{EMOJI_STATUS} Живая сводка сейчас {'включена' if enabled else 'выключена'}.\n"
+                f"/live_status on — закрепить сводку, /live_status off — выключить"
+            )
+    
+    except Exception as e:
+        logger.error(f"Ошибка при настройке живой сводки: {e}")
+        await message.answer(f"{EMOJI_ERROR} Произошла ошибка при настройке живой сводки.")
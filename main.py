@@ -5,11 +5,17 @@ from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from config import Config
+from config import Config, PERF_METRICS_ENABLED, SQL_TRACE_ENABLED
 from utils.logging_config import setup_logging
 from utils.access_control import AccessControlMiddleware
+from utils.perf import PerfMiddleware, ApiCallMiddleware, UpdateCounterMiddleware
+from utils.sql_trace import SqlTraceMiddleware
 from db import init_db
-from services.scheduler import start_scheduler
+from services.meds_service import get_projection_rates
+from services.scheduler import start_scheduler, stop_scheduler
+from services.catalog import watch_catalog
+from services import workers
+from services.web_server import run_webhook, start_http_server
 
 from handlers import start as start_handler
 from handlers import medicines as medicines_handler
@@ -17,23 +23,25 @@ from handlers import prescriptions as prescriptions_handler
 from handlers import purchases as purchases_handler
 from handlers import status as status_handler
 from handlers import report as report_handler
+from handlers import consumption as consumption_handler
+from handlers import history as history_handler
+from handlers import data_transfer as data_transfer_handler
+from handlers import plan as plan_handler
+from handlers import calendar as calendar_handler
+from handlers import spend as spend_handler
+from handlers import chart as chart_handler
+from handlers import doctor_report as doctor_report_handler
+from handlers import inline as inline_handler
+from handlers import perf as perf_handler
+from handlers import backup as backup_handler
 
 
-async def main():
-    # Загрузка и проверка конфига
-    config = Config()
-    setup_logging()
+def create_dispatcher(storage=None, **workflow_data) -> Dispatcher:
+    """Создаёт диспетчер с middleware и всеми роутерами.
 
-    # Инициализация базы данных и фиксированного списка лекарств
-    init_db()
-
-    # Создание экземпляра бота и диспетчера
-    bot = Bot(
-        token=config.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-    )
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    workflow_data (например, config) передаётся хендлерам как именованные аргументы.
+    """
+    dp = Dispatcher(storage=storage or MemoryStorage(), **workflow_data)
 
     # Создаём экземпляр middleware для контроля доступа
     access_middleware = AccessControlMiddleware()
@@ -43,6 +51,19 @@ async def main():
     dp.message.middleware(access_middleware)
     dp.callback_query.middleware(access_middleware)
 
+    # Время хендлеров для /perf (внутренние middleware действуют и во вложенных роутерах)
+    if PERF_METRICS_ENABLED:
+        dp.update.outer_middleware(UpdateCounterMiddleware())
+        perf_middleware = PerfMiddleware()
+        dp.message.middleware(perf_middleware)
+        dp.callback_query.middleware(perf_middleware)
+
+    # Отладочная сводка SQL-запросов по каждому хендлеру
+    if SQL_TRACE_ENABLED:
+        trace_middleware = SqlTraceMiddleware()
+        dp.message.middleware(trace_middleware)
+        dp.callback_query.middleware(trace_middleware)
+
     # Регистрация хендлеров
     dp.include_router(start_handler.router)
     dp.include_router(medicines_handler.router)
@@ -50,12 +71,64 @@ async def main():
     dp.include_router(purchases_handler.router)
     dp.include_router(status_handler.router)
     dp.include_router(report_handler.router)
+    dp.include_router(consumption_handler.router)
+    dp.include_router(history_handler.router)
+    dp.include_router(data_transfer_handler.router)
+    dp.include_router(plan_handler.router)
+    dp.include_router(calendar_handler.router)
+    dp.include_router(spend_handler.router)
+    dp.include_router(chart_handler.router)
+    dp.include_router(doctor_report_handler.router)
+    dp.include_router(inline_handler.router)
+    dp.include_router(perf_handler.router)
+    dp.include_router(backup_handler.router)
+
+    return dp
+
+
+async def main():
+    # Загрузка и проверка конфига
+    config = Config()
+    setup_logging()
+
+    # Инициализация базы данных и фиксированного списка лекарств
+    init_db(rates_loader=get_projection_rates)
+
+    # Создание экземпляра бота и диспетчера
+    bot = Bot(
+        token=config.BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+    if PERF_METRICS_ENABLED:
+        # Счётчики успешных и неудачных вызовов Bot API для /perf
+        bot.session.middleware(ApiCallMiddleware())
+    # config доступен хендлерам как аргумент config
+    dp = create_dispatcher(MemoryStorage(), config=config)
 
     # Запуск планировщика напоминаний
     await start_scheduler(bot)
+    # Изменения catalog.json применяются без перезапуска
+    catalog_task = asyncio.create_task(watch_catalog(bot))
 
-    # Запуск бота
-    await dp.start_polling(bot)
+    # Запуск бота в выбранном режиме
+    http_runner = None
+    try:
+        if config.BOT_MODE == "webhook":
+            await run_webhook(bot, dp, config)
+        else:
+            # В режиме polling HTTP-сервер нужен только для календаря и /healthz
+            if config.HTTP_SERVER_ENABLED:
+                http_runner = await start_http_server(bot, dp, config)
+            # Снимаем webhook, если он остался от запуска в режиме webhook
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        catalog_task.cancel()
+        workers.shutdown()
+        if http_runner:
+            await http_runner.cleanup()
+        # Освобождаем аренду, чтобы другой процесс сразу подхватил ночные задачи
+        await stop_scheduler()
 
 
 if __name__ == "__main__":
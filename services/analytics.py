@@ -0,0 +1,105 @@
+"""
+Аналитика фактического расхода лекарств по истории покупок.
+
+Новое лекарство заводится с нулевым остатком, а все пополнения и коррекции
+пишутся в purchases. Значит, с момента первой записи фактически израсходовано
+sum(quantity) - current_stock, и фактический расход в день равен этой величине,
+делённой на число прошедших дней. Коррекции остатка (отрицательные количества)
+как раз и показывают, насколько реальный приём отличается от daily_dose.
+
+Оценка занижена, если лекарство какое-то время было на нуле: остаток
+не уходит в минус, и пропущенные дни не учитываются.
+"""
+import logging
+from datetime import date
+
+import numpy as np
+
+from db import get_connection
+from config import CONSUMPTION_MIN_HISTORY_DAYS, CONSUMPTION_DIVERGENCE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+def get_consumption_rates(household_id: int, today: date = None):
+    """Считает фактический расход для всех лекарств домохозяйства разом.
+
+    Возвращает словарь medicine_id -> {
+        "daily_dose": расход по конфигу,
+        "observed_rate": фактический расход в день (None, если истории мало),
+        "history_days": сколько дней покрывает история,
+        "diverges": отклоняется ли факт от daily_dose больше порога,
+        "effective_rate": observed_rate, если он есть, иначе daily_dose
+    }
+    """
+    today = today or date.today()
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT id, daily_dose, current_stock FROM medicines WHERE household_id = ? ORDER BY id",
+            (household_id,)
+        )
+        medicines = cursor.fetchall()
+
+        # Дату переводим в юлианский день прямо в SQL - без разбора строк в Python
+        cursor.execute(
+            """SELECT p.medicine_id, julianday(p.purchased_at), p.quantity
+               FROM purchases p
+               JOIN medicines m ON m.id = p.medicine_id
+               WHERE m.household_id = ?""",
+            (household_id,)
+        )
+        purchases = cursor.fetchall()
+    finally:
+        conn.close()
+
+    if not medicines:
+        return {}
+
+    medicine_ids = np.array([row[0] for row in medicines], dtype=np.int64)
+    daily_doses = np.array([row[1] for row in medicines], dtype=np.float64)
+    stocks = np.array([row[2] for row in medicines], dtype=np.float64)
+    count = len(medicine_ids)
+
+    totals = np.zeros(count)
+    first_seen = np.full(count, np.inf)
+
+    if purchases:
+        purchase_data = np.array(purchases, dtype=np.float64)
+        # medicine_ids отсортированы, поэтому позицию лекарства находим бинарным поиском
+        positions = np.searchsorted(medicine_ids, purchase_data[:, 0].astype(np.int64))
+        totals = np.bincount(positions, weights=purchase_data[:, 2], minlength=count)
+        np.minimum.at(first_seen, positions, purchase_data[:, 1])
+
+    today_jd = date_to_julian_day(today)
+    history_days = today_jd - first_seen
+    consumed = totals - stocks
+
+    has_history = (history_days >= CONSUMPTION_MIN_HISTORY_DAYS) & (consumed > 0)
+    observed = np.full(count, np.nan)
+    np.divide(consumed, history_days, out=observed, where=has_history)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deviation = np.abs(observed - daily_doses) / daily_doses
+    diverges = has_history & (daily_doses > 0) & (deviation > CONSUMPTION_DIVERGENCE_THRESHOLD)
+
+    rates = {}
+    for i, medicine_id in enumerate(medicine_ids.tolist()):
+        observed_rate = round(float(observed[i]), 3) if has_history[i] else None
+        rates[medicine_id] = {
+            "daily_dose": float(daily_doses[i]),
+            "observed_rate": observed_rate,
+            "history_days": int(history_days[i]) if np.isfinite(history_days[i]) else 0,
+            "diverges": bool(diverges[i]),
+            "effective_rate": observed_rate if observed_rate is not None else float(daily_doses[i])
+        }
+
+    return rates
+
+
+def date_to_julian_day(value: date) -> float:
+    """Переводит дату в юлианский день (как julianday() в SQLite, на полночь)."""
+    return value.toordinal() + 1721424.5
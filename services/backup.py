@@ -0,0 +1,103 @@
+"""
+Резервные копии meds.db без остановки бота.
+
+Копия снимается через online backup API SQLite за один шаг (pages=-1):
+все страницы копируются внутри одной читающей транзакции, поэтому снимок
+согласован. БД работает в режиме WAL, и читающая транзакция не мешает
+писать - хендлеры записывают покупки как обычно, их изменения просто
+попадут в следующий снимок. Пошаговое копирование здесь не подходит:
+запись из другого соединения между шагами заставляет SQLite начинать
+копию заново с первой страницы. Копирование, проверка и сжатие идут в
+потоке (asyncio.to_thread), поэтому цикл событий не блокируется.
+
+Снимки лежат в BACKUP_DIR как meds-ГГГГММДД-ЧЧММСС.db.gz; хранятся
+последние BACKUP_KEEP штук. Файл появляется под итоговым именем только
+целиком (запись во временный файл и os.replace).
+"""
+import asyncio
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+from datetime import datetime
+
+import db
+from config import BACKUP_DIR, BACKUP_KEEP
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT = re.compile(r"^meds-\d{8}-\d{6}\.db\.gz$")
+
+# Не даёт запустить две копии одновременно (ночная задача и /backup)
+_lock = asyncio.Lock()
+
+
+def _copy_database(target_path: str):
+    """Копирует БД в target_path за один шаг и проверяет копию."""
+    source = sqlite3.connect(db.DB_NAME)
+    target = sqlite3.connect(target_path)
+
+    try:
+        source.backup(target)
+        result = target.execute("PRAGMA quick_check").fetchone()[0]
+        if result != "ok":
+            raise RuntimeError(f"копия БД не прошла проверку: {result}")
+    finally:
+        target.close()
+        source.close()
+
+
+def _compress(source_path: str, target_path: str):
+    partial_path = target_path + ".partial"
+    with open(source_path, "rb") as src, gzip.open(partial_path, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(partial_path, target_path)
+
+
+def list_backups(directory: str = BACKUP_DIR) -> list:
+    """Пути снимков от старых к новым."""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if _SNAPSHOT.match(name))
+    return [os.path.join(directory, name) for name in names]
+
+
+def latest_backup(directory: str = BACKUP_DIR):
+    """Путь самого свежего снимка или None."""
+    backups = list_backups(directory)
+    return backups[-1] if backups else None
+
+
+def prune_backups(directory: str = BACKUP_DIR, keep: int = BACKUP_KEEP) -> list:
+    """Удаляет снимки сверх последних keep; возвращает удалённые пути."""
+    removed = list_backups(directory)[:-keep] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+        logger.info(f"Удалена старая резервная копия {path}")
+    return removed
+
+
+def _create_backup(directory: str, now: datetime) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"meds-{now:%Y%m%d-%H%M%S}.db.gz")
+    raw_path = path[:-len(".gz")] + ".tmp"
+
+    try:
+        _copy_database(raw_path)
+        _compress(raw_path, path)
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+    prune_backups(directory)
+    return path
+
+
+async def create_backup(directory: str = BACKUP_DIR, now: datetime = None) -> str:
+    """Снимает сжатую копию БД в потоке; возвращает путь снимка."""
+    async with _lock:
+        path = await asyncio.to_thread(_create_backup, directory, now or datetime.now())
+    logger.info(f"Резервная копия БД сохранена: {path} ({os.path.getsize(path)} байт)")
+    return path
@@ -0,0 +1,213 @@
+"""
+Календарь (iCalendar, .ics) с датами окончания лекарств и рецептов.
+
+Для каждого лекарства в ленте до двух событий на весь день:
+- прогнозная дата окончания остатка (medicines.runout_date) с напоминанием
+  за notify_before_days дней;
+- дата окончания рецепта с напоминанием за 30 дней.
+
+Лента собирается инкрементально: для каждого события хранится отпечаток
+исходных данных (название, даты, порог напоминания), и текст события
+пересобирается только для лекарств, у которых отпечаток изменился. Если не
+изменилось ничего, отдаётся уже собранный файл. Кэш живёт в памяти процесса.
+"""
+import hashlib
+import hmac
+import logging
+import threading
+from datetime import datetime, timezone
+
+from db import get_connection
+
+logger = logging.getLogger(__name__)
+
+PRODID = "-//meds-bot//Medicines calendar//RU"
+PRESCRIPTION_ALARM_DAYS = 30
+
+# household_id -> {"events": {(тип, medicine_id): (отпечаток, sequence, текст)}, "header": ..., "feed": bytes}
+_cache = {}
+_lock = threading.Lock()
+
+
+def _escape(text: str) -> str:
+    """Экранирование текстовых значений по RFC 5545."""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Переносит строку длиннее 75 байт (продолжение начинается с пробела)."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+
+    parts = []
+    current = ""
+    for char in line:
+        if len((current + char).encode("utf-8")) > 75:
+            parts.append(current)
+            current = " "
+        current += char
+    parts.append(current)
+    return "\r\n".join(parts)
+
+
+def _event(uid: str, sequence: int, summary: str, description: str,
+           start: str, end: str, alarm_days: int) -> str:
+    """Текст VEVENT на весь день (даты - в формате ГГГГММДД)."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp}",
+        f"SEQUENCE:{sequence}",
+        f"DTSTART;VALUE=DATE:{start}",
+        f"DTEND;VALUE=DATE:{end}",
+        f"SUMMARY:{_escape(summary)}",
+        f"DESCRIPTION:{_escape(description)}",
+        "TRANSP:TRANSPARENT",
+    ]
+    if alarm_days > 0:
+        lines += [
+            "BEGIN:VALARM",
+            "ACTION:DISPLAY",
+            f"TRIGGER:-P{alarm_days}D",
+            f"DESCRIPTION:{_escape(summary)}",
+            "END:VALARM",
+        ]
+    lines.append("END:VEVENT")
+    return "\r\n".join(_fold(line) for line in lines)
+
+
+def _load_events_source(household_id: int):
+    """Исходные данные событий домохозяйства; даты форматируются прямо в SQL."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT name FROM households WHERE id = ?", (household_id,))
+        row = cursor.fetchone()
+        household_name = row[0] if row else ""
+
+        cursor.execute(
+            """SELECT m.id, m.name, m.latin_name, m.notify_before_days,
+                      strftime('%Y%m%d', m.runout_date), strftime('%Y%m%d', m.runout_date, '+1 day'),
+                      strftime('%Y%m%d', p.expiry_date), strftime('%Y%m%d', p.expiry_date, '+1 day')
+               FROM medicines m
+               LEFT JOIN prescriptions p ON p.medicine_id = m.id
+               WHERE m.household_id = ?
+               ORDER BY m.id""",
+            (household_id,)
+        )
+        return household_name, cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def _event_specs(household_id: int, rows):
+    """Описания событий: ключ -> (отпечаток, аргументы _event без sequence)."""
+    specs = {}
+    for med_id, name, latin_name, notify_before_days, runout, runout_end, expiry, expiry_end in rows:
+        display_name = f"{name} ({latin_name})" if latin_name else name
+
+        if runout:
+            specs[("runout", med_id)] = (
+                ("runout", display_name, runout, notify_before_days),
+                {
+                    "uid": f"runout-{household_id}-{med_id}@meds-bot",
+                    "summary": f"Закончится: {display_name}",
+                    "description": f"По прогнозу остатка закончится {display_name}. Купите новые упаковки.",
+                    "start": runout,
+                    "end": runout_end,
+                    "alarm_days": notify_before_days,
+                }
+            )
+
+        if expiry:
+            specs[("prescription", med_id)] = (
+                ("prescription", display_name, expiry),
+                {
+                    "uid": f"prescription-{household_id}-{med_id}@meds-bot",
+                    "summary": f"Заканчивается рецепт: {display_name}",
+                    "description": f"Заканчивается рецепт на {display_name}. Получите новый у врача.",
+                    "start": expiry,
+                    "end": expiry_end,
+                    "alarm_days": PRESCRIPTION_ALARM_DAYS,
+                }
+            )
+
+    return specs
+
+
+def build_feed(household_id: int) -> bytes:
+    """Возвращает .ics домохозяйства, пересобирая только изменившиеся события.
+
+    Синхронная (запросы к БД) - из цикла событий вызывать через asyncio.to_thread.
+    Кэш общий для потоков, поэтому сборка идёт под блокировкой.
+    """
+    with _lock:
+        return _build_feed(household_id)
+
+
+def _build_feed(household_id: int) -> bytes:
+    household_name, rows = _load_events_source(household_id)
+    specs = _event_specs(household_id, rows)
+
+    cache = _cache.setdefault(household_id, {"events": {}, "header": None, "feed": None})
+    events = cache["events"]
+    changed = False
+    rebuilt = 0
+
+    for key in list(events):
+        if key not in specs:
+            del events[key]
+            changed = True
+
+    for key, (fingerprint, event_args) in specs.items():
+        cached = events.get(key)
+        if cached and cached[0] == fingerprint:
+            continue
+        # SEQUENCE растёт при каждом изменении - так календари понимают, что событие обновилось
+        sequence = cached[1] + 1 if cached else 0
+        events[key] = (fingerprint, sequence, _event(sequence=sequence, **event_args))
+        changed = True
+        rebuilt += 1
+
+    header = "\r\n".join(_fold(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape('Лекарства: ' + household_name)}",
+    ])
+
+    if changed or cache["feed"] is None or cache["header"] != header:
+        body = [header] + [events[key][2] for key in sorted(events)] + ["END:VCALENDAR"]
+        cache["feed"] = ("\r\n".join(body) + "\r\n").encode("utf-8")
+        cache["header"] = header
+        logger.info(
+            f"Календарь household_id={household_id} обновлён: пересобрано событий {rebuilt} из {len(events)}"
+        )
+
+    return cache["feed"]
+
+
+def feed_token(household_id: int, secret: str) -> str:
+    """Токен ссылки на календарь домохозяйства (HMAC от id, без хранения в БД)."""
+    digest = hmac.new(secret.encode("utf-8"), f"calendar:{household_id}".encode("utf-8"), hashlib.sha256)
+    return digest.hexdigest()[:32]
+
+
+def check_feed_token(household_id: int, token: str, secret: str) -> bool:
+    """Проверяет токен ссылки на календарь."""
+    return hmac.compare_digest(feed_token(household_id, secret), token)
+
+
+def feed_url(household_id: int, base_url: str, secret: str) -> str:
+    """Публичная ссылка для подписки на календарь."""
+    return f"{base_url.rstrip('/')}/calendar/{household_id}/{feed_token(household_id, secret)}.ics"
@@ -0,0 +1,118 @@
+"""
+Перечитывание каталога лекарств (catalog.json) без перезапуска бота.
+
+Фоновая задача раз в CATALOG_POLL_SECONDS сверяет время изменения и размер
+файла. Если файл изменился, он читается и проверяется целиком; каталог с
+ошибкой не применяется (в лог пишется причина, работает прежний). Затем
+db.apply_catalog сверяет каталог с БД и обновляет только отличающиеся
+строки - в потоке, чтобы не блокировать цикл событий.
+
+У изменившихся домохозяйств растёт households.catalog_version (поисковый
+индекс перестроится при следующем запросе), пересчитываются даты окончания,
+от которых зависят ночные напоминания и календарь, и обновляются живые
+панели статуса. Лекарства меняются на месте с прежними id, поэтому
+незавершённые диалоги (состояния FSM) продолжают работать.
+"""
+import asyncio
+import logging
+import os
+
+from aiogram import Bot
+
+from config import CATALOG_FILE, CATALOG_POLL_SECONDS, HOUSEHOLDS_CONFIG, load_catalog
+from db import apply_catalog
+from services import medicine_search, status_board
+from services.meds_service import get_projection_rates
+from services.dose_schedule import parse_schedule
+from services.purchase_planner import parse_package_sizes
+
+logger = logging.getLogger(__name__)
+
+
+def validate_catalog(households: list):
+    """Проверяет каталог целиком. Бросает ValueError с описанием первой ошибки."""
+    if not isinstance(households, list) or not households:
+        raise ValueError("households должен быть непустым списком")
+
+    household_names = set()
+    for household in households:
+        name = household.get("name") if isinstance(household, dict) else None
+        if not name or not isinstance(name, str):
+            raise ValueError("у домохозяйства должно быть название (name)")
+        if name in household_names:
+            raise ValueError(f"домохозяйство «{name}» указано дважды")
+        household_names.add(name)
+
+        members = household.get("members", [])
+        if not isinstance(members, list) or not all(isinstance(member, int) for member in members):
+            raise ValueError(f"«{name}»: members должен быть списком user_id")
+
+        medicine_names = set()
+        for med in household.get("medicines", []):
+            med_name = med.get("name") if isinstance(med, dict) else None
+            if not med_name or not isinstance(med_name, str):
+                raise ValueError(f"«{name}»: у лекарства должно быть название (name)")
+            if med_name in medicine_names:
+                raise ValueError(f"«{name}»: лекарство «{med_name}» указано дважды")
+            medicine_names.add(med_name)
+
+            daily_dose = med.get("daily_dose")
+            if isinstance(daily_dose, bool) or not isinstance(daily_dose, (int, float)) or daily_dose < 0:
+                raise ValueError(f"«{med_name}»: daily_dose должен быть неотрицательным числом")
+            try:
+                parse_schedule(med.get("schedule"))
+                parse_package_sizes(med.get("package_sizes"))
+            except ValueError as e:
+                raise ValueError(f"«{med_name}»: {e}") from e
+
+
+def _file_signature(path: str):
+    """(время изменения, размер) файла или None, если файла нет."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+async def reload_catalog(bot: Bot = None, path: str = CATALOG_FILE) -> dict:
+    """Перечитывает каталог и применяет изменения; возвращает их по домохозяйствам.
+
+    Бросает ValueError (и json.JSONDecodeError), если файл не прошёл проверку.
+    """
+    households = load_catalog(path)
+    validate_catalog(households)
+
+    changes = await asyncio.to_thread(apply_catalog, households, get_projection_rates)
+    HOUSEHOLDS_CONFIG[:] = households
+
+    for household_id, changed in changes.items():
+        logger.info(f"Каталог household_id={household_id} обновлён: {', '.join(changed)}")
+        medicine_search.invalidate(household_id)
+        if bot is not None:
+            await status_board.refresh_household(bot, household_id)
+
+    return changes
+
+
+async def watch_catalog(bot: Bot, path: str = CATALOG_FILE, interval: float = CATALOG_POLL_SECONDS):
+    """Фоновая задача: применяет изменения файла каталога, пока её не отменят."""
+    signature = _file_signature(path)
+    logger.info(f"Слежение за каталогом {path} (раз в {interval} с)")
+
+    while True:
+        await asyncio.sleep(interval)
+        current = _file_signature(path)
+        if current is None or current == signature:
+            continue
+        signature = current
+
+        try:
+            changes = await reload_catalog(bot, path)
+        except (ValueError, KeyError, OSError) as e:
+            logger.error(f"Каталог {path} не применён, работает прежний: {e}")
+        except Exception as e:
+            logger.error(f"Ошибка при применении каталога {path}: {e}")
+        else:
+            if not changes:
+                logger.info(f"Каталог {path} перечитан, изменений нет")
@@ -0,0 +1,68 @@
+"""
+Рисование графика остатка (выполняется в рабочем процессе, см. services/workers.py).
+
+Модуль не зависит от БД и остального кода бота: на вход - готовые ряды
+из services/stock_chart.py, на выход - PNG. matplotlib импортируется
+только здесь, поэтому процесс бота его не загружает.
+"""
+import io
+from datetime import date
+
+
+def _dates(points: list) -> list:
+    return [date.fromisoformat(day) for day, _ in points]
+
+
+def render_stock_chart(data: dict) -> bytes:
+    """PNG с историей остатка, прогнозом и отметками окончания и рецепта."""
+    # Figure без pyplot: нет глобального состояния и GUI-бэкенда
+    from matplotlib.figure import Figure
+    from matplotlib.dates import DateFormatter
+
+    fig = Figure(figsize=(8, 4.5), dpi=100)
+    ax = fig.add_subplot()
+
+    history = data["history"]
+    ax.plot(_dates(history), [stock for _, stock in history], color="tab:blue", label="Остаток")
+
+    forecast = data["forecast"]
+    if forecast:
+        ax.plot(_dates(forecast), [stock for _, stock in forecast],
+                color="tab:blue", linestyle="--", alpha=0.6, label="Прогноз")
+
+    purchases = data["purchases"]
+    if purchases:
+        stock_by_day = dict(history)
+        ax.scatter(_dates(purchases), [stock_by_day.get(day, 0) for day, _ in purchases],
+                   marker="^", color="tab:green", zorder=3, label="Покупки")
+
+    ax.axvline(date.fromisoformat(data["today"]), color="grey", linewidth=0.8)
+
+    # Отметки за правым краем графика не растягивают ось, а попадают в легенду
+    end = date.fromisoformat(data["end"])
+    markers = (
+        (data["runout_date"], "Закончится", "tab:red", ":"),
+        (data["expiry_date"], "Рецепт до", "tab:orange", "-."),
+    )
+    for value, title, color, linestyle in markers:
+        if not value:
+            continue
+        day = date.fromisoformat(value)
+        label = f"{title} {day:%d.%m.%Y}"
+        if day <= end:
+            ax.axvline(day, color=color, linestyle=linestyle, label=label)
+        else:
+            ax.plot([], [], " ", label=label)
+
+    ax.set_title(data["name"])
+    ax.set_ylabel("Единиц")
+    ax.set_xlim(date.fromisoformat(history[0][0]), end)
+    ax.set_ylim(bottom=0)
+    ax.grid(True, alpha=0.3)
+    ax.xaxis.set_major_formatter(DateFormatter("%d.%m"))
+    ax.legend(loc="upper left", fontsize="small")
+    fig.autofmt_xdate()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
@@ -0,0 +1,316 @@
+"""
+Экспорт и импорт лекарств, рецептов и покупок домохозяйства.
+
+Форматы:
+- json: JSON Lines в gzip, каждая строка - {"table": ..., ...поля};
+- csv: zip-архив с medicines.csv, prescriptions.csv и purchases.csv.
+
+Лекарства в рецептах и покупках указываются по названию, поэтому файл можно
+загрузить в другую БД или в другое домохозяйство.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import zipfile
+from datetime import date, datetime
+from itertools import islice
+
+from db import get_connection, begin_immediate, refresh_runout_dates, rebuild_purchase_rollups, bump_catalog_version
+from services import meds_service
+from utils.dates import to_iso_date
+from services.dose_schedule import schedule_to_json
+from services.purchase_planner import package_sizes_to_text
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("json", "csv")
+
+# Колонки каждой таблицы в порядке экспорта
+TABLE_COLUMNS = {
+    "medicines": [
+        "name", "latin_name", "daily_dose", "current_stock", "notify_before_days", "dose_schedule", "package_sizes"
+    ],
+    "prescriptions": ["medicine", "expiry_date"],
+    "purchases": ["medicine", "quantity", "purchased_at", "price"],
+}
+
+TABLE_QUERIES = {
+    "medicines": """
+        SELECT name, latin_name, daily_dose, current_stock, notify_before_days, dose_schedule, package_sizes
+        FROM medicines WHERE household_id = ? ORDER BY name
+    """,
+    "prescriptions": """
+        SELECT m.name, p.expiry_date
+        FROM prescriptions p JOIN medicines m ON m.id = p.medicine_id
+        WHERE m.household_id = ? ORDER BY m.name
+    """,
+    "purchases": """
+        SELECT m.name, p.quantity, p.purchased_at, p.price
+        FROM purchases p JOIN medicines m ON m.id = p.medicine_id
+        WHERE m.household_id = ? ORDER BY p.purchased_at, p.id
+    """,
+}
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 50
+
+
+def iter_table_rows(household_id: int, table: str):
+    """Построчно отдаёт строки таблицы домохозяйства, не загружая её в память целиком."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(TABLE_QUERIES[table], (household_id,))
+        for row in cursor:
+            yield row
+    finally:
+        conn.close()
+
+
+def export_household(household_id: int, export_format: str, fileobj):
+    """Пишет сжатый экспорт домохозяйства в бинарный файловый объект."""
+    if export_format == "json":
+        with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+            for table, columns in TABLE_COLUMNS.items():
+                for row in iter_table_rows(household_id, table):
+                    record = {"table": table, **dict(zip(columns, row))}
+                    gz.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+    elif export_format == "csv":
+        with zipfile.ZipFile(fileobj, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for table, columns in TABLE_COLUMNS.items():
+                with zf.open(f"{table}.csv", mode="w") as raw:
+                    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                    writer = csv.writer(text)
+                    writer.writerow(columns)
+                    writer.writerows(iter_table_rows(household_id, table))
+                    text.flush()
+                    text.detach()
+    else:
+        raise ValueError(f"Неизвестный формат экспорта: {export_format}")
+
+
+def export_filename(export_format: str) -> str:
+    """Имя файла экспорта с датой."""
+    extension = "jsonl.gz" if export_format == "json" else "zip"
+    return f"meds_export_{date.today().isoformat()}.{extension}"
+
+
+def _iter_records(data: bytes, table: str):
+    """Отдаёт записи (location, dict) одной таблицы из файла импорта любого поддерживаемого формата."""
+    if data[:2] == b"PK":
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            if f"{table}.csv" not in zf.namelist():
+                return
+            with zf.open(f"{table}.csv") as raw:
+                reader = csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8", newline=""))
+                for line_number, row in enumerate(reader, start=2):
+                    yield f"{table}.csv:{line_number}", row
+        return
+
+    raw = gzip.GzipFile(fileobj=io.BytesIO(data)) if data[:2] == b"\x1f\x8b" else io.BytesIO(data)
+    with raw:
+        for line_number, line in enumerate(raw, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Некорректную строку сообщаем один раз - при разборе лекарств
+                if table == "medicines":
+                    yield f"строка {line_number}", None
+                continue
+            if isinstance(record, dict) and record.get("table") == table:
+                yield f"строка {line_number}", record
+
+
+def _optional(value):
+    """Пустые значения из CSV считаем отсутствующими."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    return value
+
+
+def _parse_medicine(record: dict, household_id: int):
+    name = str(_optional(record.get("name")) or "").strip()
+    if not name:
+        raise ValueError("не указано название лекарства")
+
+    daily_dose = float(record.get("daily_dose"))
+    if daily_dose < 0:
+        raise ValueError("daily_dose не может быть отрицательной")
+
+    current_stock = int(float(_optional(record.get("current_stock")) or 0))
+    if current_stock < 0:
+        raise ValueError("current_stock не может быть отрицательным")
+
+    notify_before_days = int(float(_optional(record.get("notify_before_days")) or 14))
+    if notify_before_days <= 0:
+        raise ValueError("notify_before_days должен быть положительным")
+
+    latin_name = _optional(record.get("latin_name"))
+    dose_schedule = schedule_to_json(_optional(record.get("dose_schedule")))
+    package_sizes = package_sizes_to_text(_optional(record.get("package_sizes")))
+    return (
+        household_id, name, latin_name, daily_dose, current_stock, notify_before_days, dose_schedule, package_sizes
+    )
+
+
+def _resolve_medicine(record: dict, medicine_ids: dict) -> int:
+    name = str(_optional(record.get("medicine")) or "").strip()
+    if name not in medicine_ids:
+        raise ValueError(f"лекарство «{name}» не найдено")
+    return medicine_ids[name]
+
+
+def _parse_prescription(record: dict, medicine_ids: dict):
+    medicine_id = _resolve_medicine(record, medicine_ids)
+    expiry_date = to_iso_date(record.get("expiry_date"))
+    return (medicine_id, expiry_date)
+
+
+def _parse_purchase(record: dict, medicine_ids: dict):
+    medicine_id = _resolve_medicine(record, medicine_ids)
+    quantity = int(record.get("quantity"))
+    if quantity == 0:
+        raise ValueError("количество не может быть нулевым")
+    purchased_at = datetime.fromisoformat(str(record.get("purchased_at")).strip()).isoformat()
+    # Экспорт старых версий без цены тоже загружается
+    price = _optional(record.get("price"))
+    if price is not None:
+        price = float(price)
+        if price < 0:
+            raise ValueError("цена не может быть отрицательной")
+    return (medicine_id, quantity, purchased_at, price)
+
+
+def _valid_rows(records, parse, errors: list, counts: dict, table: str):
+    """Проверяет записи и отдаёт только корректные; ошибки складывает в errors."""
+    for location, record in records:
+        if record is None:
+            errors.append(f"{location}: некорректный JSON")
+            continue
+        try:
+            row = parse(record)
+        except (TypeError, ValueError, KeyError) as e:
+            errors.append(f"{location}: {e}")
+            continue
+        counts[table] += 1
+        yield row
+
+
+def _executemany_batched(cursor, sql: str, rows):
+    """Выполняет executemany пачками по IMPORT_BATCH_SIZE строк."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, IMPORT_BATCH_SIZE))
+        if not batch:
+            break
+        cursor.executemany(sql, batch)
+
+
+def import_household(household_id: int, data: bytes):
+    """Импортирует файл экспорта в домохозяйство одной транзакцией.
+
+    Лекарства обновляются по названию (доза, схема приёма, остаток, порог напоминания),
+    рецепты заменяются, покупки добавляются в историю без изменения остатка -
+    актуальный остаток берётся из строк medicines. Покупки, которые уже есть
+    в истории, пропускаются, поэтому файл можно импортировать повторно.
+
+    Возвращает {"medicines": N, "prescriptions": N, "purchases": N,
+    "duplicates": N, "errors": [...]}.
+    Некорректные строки пропускаются и попадают в errors.
+    """
+    errors = []
+    counts = {table: 0 for table in TABLE_COLUMNS}
+    rates = meds_service.get_projection_rates(household_id)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Импорт переписывает остатки - берём блокировку записи сразу, как покупки
+        # и ночное списание, чтобы одновременное изменение остатка не потерялось
+        begin_immediate(cursor)
+        _executemany_batched(
+            cursor,
+            """INSERT INTO medicines (household_id, name, latin_name, daily_dose, current_stock,
+                                     notify_before_days, dose_schedule, package_sizes)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(household_id, name) DO UPDATE SET
+                   latin_name = excluded.latin_name,
+                   daily_dose = excluded.daily_dose,
+                   current_stock = excluded.current_stock,
+                   notify_before_days = excluded.notify_before_days,
+                   dose_schedule = excluded.dose_schedule,
+                   package_sizes = excluded.package_sizes""",
+            _valid_rows(
+                _iter_records(data, "medicines"),
+                lambda record: _parse_medicine(record, household_id),
+                errors, counts, "medicines"
+            )
+        )
+
+        cursor.execute("SELECT name, id FROM medicines WHERE household_id = ?", (household_id,))
+        medicine_ids = dict(cursor.fetchall())
+
+        _executemany_batched(
+            cursor,
+            """INSERT INTO prescriptions (medicine_id, expiry_date) VALUES (?, ?)
+               ON CONFLICT(medicine_id) DO UPDATE SET expiry_date = excluded.expiry_date""",
+            _valid_rows(
+                _iter_records(data, "prescriptions"),
+                lambda record: _parse_prescription(record, medicine_ids),
+                errors, counts, "prescriptions"
+            )
+        )
+
+        # Покупка, которая уже есть в истории (то же лекарство, время и количество),
+        # не вставляется повторно - иначе повторный импорт удвоил бы итоги и расход
+        changes_before = conn.total_changes
+        _executemany_batched(
+            cursor,
+            """INSERT INTO purchases (medicine_id, household_id, quantity, purchased_at, price)
+               SELECT ?, ?, ?, ?, ?
+               WHERE NOT EXISTS (
+                   SELECT 1 FROM purchases WHERE medicine_id = ? AND purchased_at = ? AND quantity = ?
+               )""",
+            (
+                (medicine_id, household_id, quantity, purchased_at, price, medicine_id, purchased_at, quantity)
+                for medicine_id, quantity, purchased_at, price in _valid_rows(
+                    _iter_records(data, "purchases"),
+                    lambda record: _parse_purchase(record, medicine_ids),
+                    errors, counts, "purchases"
+                )
+            )
+        )
+        duplicates = counts["purchases"] - (conn.total_changes - changes_before)
+        counts["purchases"] -= duplicates
+
+        # Остатки и дозы поменялись - пересчитываем прогноз для /report
+        refresh_runout_dates(cursor, household_id, rates)
+        # Покупки вставлены пачками - помесячные итоги /spend собираем заново
+        rebuild_purchase_rollups(cursor, household_id)
+        if counts["medicines"]:
+            bump_catalog_version(cursor, household_id)
+
+        conn.commit()
+        logger.info(
+            f"Импорт в household_id={household_id}: {counts}, повторов: {duplicates}, ошибок: {len(errors)}"
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при импорте: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return {
+        **counts,
+        "duplicates": duplicates,
+        "errors": errors[:MAX_REPORTED_ERRORS],
+        "error_count": len(errors),
+    }
@@ -0,0 +1,220 @@
+"""
+Отчёт для визита к врачу (/doctor_report): HTML-файл для печати.
+
+Разделы: назначения и запасы (доза или схема приёма, остаток, до какого
+числа хватит, срок рецепта), покрытие покупками за период и полный журнал
+покупок за период.
+
+Отчёт собирается в рабочем процессе (services/workers.py) с отдельным
+соединением только для чтения. Журнал покупок читается порциями и сразу
+пишется в файл, поэтому память не растёт с длиной истории ни в процессе
+бота, ни в рабочем процессе. Процесс бота получает только путь к файлу.
+"""
+import logging
+import os
+import sqlite3
+import tempfile
+from datetime import date, datetime, timedelta
+from html import escape
+
+import db
+from services import dose_schedule, workers
+from utils.money import format_money
+
+logger = logging.getLogger(__name__)
+
+FETCH_SIZE = 500
+PRESCRIPTION_WARNING_DAYS = 30
+
+STYLE = """
+body { font-family: sans-serif; font-size: 11pt; margin: 2em; }
+h1 { font-size: 16pt; margin-bottom: 0.2em; }
+h2 { font-size: 13pt; margin-top: 1.5em; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border: 1px solid #999; padding: 3px 6px; text-align: left; }
+th { background: #eee; }
+td.num { text-align: right; }
+.bad { color: #b00; font-weight: bold; }
+.warn { color: #b60; }
+.note { color: #555; font-size: 9pt; }
+@media print { body { margin: 0; } }
+"""
+
+
+def _format_date(value: str | None) -> str:
+    return date.fromisoformat(value[:10]).strftime("%d.%m.%Y") if value else "—"
+
+
+def _expected_consumption(schedule_json: str | None, daily_dose: float, start: date, end: date) -> float:
+    """Расход по назначению с start по end включительно."""
+    schedule = dose_schedule.parse_schedule(schedule_json)
+    total = 0.0
+    day = start
+    while day <= end:
+        total += dose_schedule.dose_on(schedule, daily_dose, day)
+        day += timedelta(days=1)
+    return total
+
+
+def _write_medicines(out, medicines: list, today: date):
+    out.write("<h2>Назначения и запасы</h2>\n<table>\n<tr><th>Лекарство</th><th>Доза в день</th>"
+              "<th>Остаток</th><th>Хватит до</th><th>Рецепт до</th></tr>\n")
+    for med in medicines:
+        name = escape(med["name"])
+        if med["latin_name"]:
+            name += f" ({escape(med['latin_name'])})"
+
+        dose = f"{med['daily_dose']:g}"
+        description = dose_schedule.describe(med["dose_schedule"])
+        if description:
+            dose += f"<br><span class=\"note\">{escape(description)}</span>"
+
+        expiry_class = ""
+        if med["expiry_date"]:
+            days_to_expiry = (date.fromisoformat(med["expiry_date"]) - today).days
+            if days_to_expiry < 0:
+                expiry_class = " class=\"bad\""
+            elif days_to_expiry <= PRESCRIPTION_WARNING_DAYS:
+                expiry_class = " class=\"warn\""
+
+        out.write(
+            f"<tr><td>{name}</td><td>{dose}</td><td class=\"num\">{med['current_stock']}</td>"
+            f"<td>{_format_date(med['runout_date'])}</td>"
+            f"<td{expiry_class}>{_format_date(med['expiry_date'])}</td></tr>\n"
+        )
+    out.write("</table>\n")
+
+
+def _write_coverage(out, cursor, medicines: list, start: date, today: date):
+    # Учёт лекарства начинается с первой покупки: дни до неё не считаются пропусками
+    cursor.execute(
+        """SELECT p.medicine_id, MIN(p.purchased_at),
+                  SUM(CASE WHEN p.quantity > 0 AND p.purchased_at >= ? THEN p.quantity ELSE 0 END)
+           FROM purchases p
+           JOIN medicines m ON m.id = p.medicine_id
+           WHERE m.household_id = ?
+           GROUP BY p.medicine_id""",
+        (start.isoformat(), medicines[0]["household_id"])
+    )
+    purchased = {medicine_id: (first, bought) for medicine_id, first, bought in cursor.fetchall()}
+
+    out.write("<h2>Покрытие покупками за период</h2>\n<table>\n<tr><th>Лекарство</th>"
+              "<th>Куплено</th><th>Нужно по назначению</th><th>Покрытие</th></tr>\n")
+    for med in medicines:
+        first, bought = purchased.get(med["id"], (None, 0))
+        since = max(start, date.fromisoformat(first[:10])) if first else start
+        expected = _expected_consumption(med["dose_schedule"], med["daily_dose"], since, today)
+        if expected > 0:
+            coverage = bought / expected * 100
+            coverage_cell = f"<td class=\"num{' bad' if coverage < 80 else ''}\">{coverage:.0f}%</td>"
+        else:
+            coverage_cell = "<td class=\"num\">—</td>"
+        out.write(
+            f"<tr><td>{escape(med['name'])}</td><td class=\"num\">{bought}</td>"
+            f"<td class=\"num\">{expected:g}</td>{coverage_cell}</tr>\n"
+        )
+    out.write("</table>\n<p class=\"note\">Покрытие — сколько куплено относительно расхода "
+              "по назначенной дозе за период (MPR). Запас на начало периода не учитывается, "
+              "поэтому покрытие ниже 100% не всегда означает пропуски. Расход считается "
+              "с первой записанной покупки лекарства, если она позже начала периода.</p>\n")
+
+
+def _write_purchases(out, cursor, household_id: int, start: date) -> int:
+    """Журнал покупок порциями по FETCH_SIZE строк; возвращает число строк."""
+    cursor.execute(
+        """SELECT p.purchased_at, m.name, p.quantity, p.price FROM purchases p
+           JOIN medicines m ON m.id = p.medicine_id
+           WHERE m.household_id = ? AND p.purchased_at >= ?
+           ORDER BY p.purchased_at, p.id""",
+        (household_id, start.isoformat())
+    )
+
+    out.write("<h2>Покупки за период</h2>\n<table>\n<tr><th>Дата</th><th>Лекарство</th>"
+              "<th>Количество</th><th>Цена</th></tr>\n")
+    count = 0
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        for purchased_at, name, quantity, price in rows:
+            out.write(
+                f"<tr><td>{datetime.fromisoformat(purchased_at):%d.%m.%Y %H:%M}</td>"
+                f"<td>{escape(name)}</td><td class=\"num\">{quantity:+d}</td>"
+                f"<td class=\"num\">{format_money(price) if price is not None else '—'}</td></tr>\n"
+            )
+        count += len(rows)
+    out.write("</table>\n")
+    if not count:
+        out.write("<p>Покупок за период нет.</p>\n")
+    return count
+
+
+def write_report(db_path: str, household_id: int, days: int, today_iso: str, output_path: str) -> dict:
+    """Пишет отчёт в output_path (выполняется в рабочем процессе). Возвращает сводку."""
+    today = date.fromisoformat(today_iso)
+    start = today - timedelta(days=days - 1)
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT name FROM households WHERE id = ?", (household_id,))
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError(f"Домохозяйство id={household_id} не найдено")
+        household_name = row[0]
+
+        cursor.execute(
+            """SELECT m.id, m.household_id, m.name, m.latin_name, m.daily_dose, m.current_stock,
+                      m.dose_schedule, m.runout_date, p.expiry_date
+               FROM medicines m
+               LEFT JOIN prescriptions p ON p.medicine_id = m.id
+               WHERE m.household_id = ? ORDER BY m.name""",
+            (household_id,)
+        )
+        columns = [column[0] for column in cursor.description]
+        medicines = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        with open(output_path, "w", encoding="utf-8") as out:
+            out.write(
+                f"<!DOCTYPE html>\n<html lang=\"ru\">\n<head>\n<meta charset=\"utf-8\">\n"
+                f"<title>Лекарства: {escape(household_name)}</title>\n<style>{STYLE}</style>\n"
+                f"</head>\n<body>\n<h1>Лекарства: {escape(household_name)}</h1>\n"
+                f"<p>Сформировано {today:%d.%m.%Y}. Период: {start:%d.%m.%Y} — {today:%d.%m.%Y} "
+                f"({days} дн.)</p>\n"
+            )
+            purchases = 0
+            if medicines:
+                _write_medicines(out, medicines, today)
+                _write_coverage(out, cursor, medicines, start, today)
+                purchases = _write_purchases(out, cursor, household_id, start)
+            else:
+                out.write("<p>Список лекарств пуст.</p>\n")
+            out.write("</body>\n</html>\n")
+
+        return {"medicines": len(medicines), "purchases": purchases}
+    finally:
+        conn.close()
+
+
+async def build_report(household_id: int, days: int) -> tuple:
+    """Собирает отчёт в рабочем процессе; возвращает (путь к временному файлу, сводка).
+
+    Файл удаляет вызывающий после отправки.
+    """
+    fd, path = tempfile.mkstemp(prefix="doctor_report_", suffix=".html")
+    os.close(fd)
+
+    try:
+        summary = await workers.run(
+            write_report, os.path.abspath(db.DB_NAME), household_id, days, date.today().isoformat(), path
+        )
+    except Exception:
+        os.remove(path)
+        raise
+
+    logger.info(
+        f"Отчёт для врача household_id={household_id}: {summary['medicines']} лекарств, "
+        f"{summary['purchases']} покупок, {os.path.getsize(path)} байт"
+    )
+    return path, summary
@@ -0,0 +1,256 @@
+"""
+Схемы приёма лекарств и календарь накопленного расхода.
+
+Схема задаётся словарём (в catalog.json - ключ "schedule", в БД - JSON
+в medicines.dose_schedule). Все ключи необязательны:
+
+    {
+        # доза по дням недели, пн..вс
+        "weekdays": [8, 8, 8, 8, 8, 6, 6],
+        # периоды с датами (курсы, паузы); первый подходящий период главнее всего
+        "periods": [
+            {"from": "2025-03-01", "to": "2025-03-14", "dose": 0},
+            {"from": "2025-04-01", "to": "2025-04-30", "weekdays": [2, 2, 2, 2, 2, 1, 1]}
+        ],
+        # постепенное снижение: с даты start доза меняется на step каждые every_days дней,
+        # но не ниже min
+        "taper": {"start": "2025-05-01", "dose": 4, "step": -0.5, "every_days": 7, "min": 0}
+    }
+
+Порядок приоритета: periods, затем taper (с даты start), затем weekdays,
+затем daily_dose лекарства.
+
+Для прогноза строится календарь накопленного расхода на CALENDAR_HORIZON_DAYS
+дней вперёд; на сколько дней хватит остатка, находится бинарным поиском
+по этому календарю, а не пошаговой симуляцией. Календарь считается от
+постоянной даты CALENDAR_ANCHOR до конца года, в который попадает горизонт,
+и кэшируется по (схема, daily_dose, этот год): смена дня не сбрасывает кэш,
+расход с нужной даты - разность двух накопленных сумм.
+"""
+import json
+from array import array
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import accumulate
+
+# Горизонт прогноза: если остатка хватает дольше, считаем, что хватит на весь горизонт
+CALENDAR_HORIZON_DAYS = 730
+# Начало календаря накопленного расхода; прогноз считается только для дат после неё
+CALENDAR_ANCHOR = date(2000, 1, 1)
+
+WEEKDAY_NAMES = ["пн", "вт", "ср", "чт", "пт", "сб", "вс"]
+
+
+def _require(mapping: dict, key: str, where: str):
+    if key not in mapping:
+        raise ValueError(f"{where}: не указан ключ {key}")
+    return mapping[key]
+
+
+def _parse_date(value, where: str) -> date:
+    if not isinstance(value, str):
+        raise ValueError(f"{where}: дата должна быть строкой YYYY-MM-DD")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{where}: неверная дата «{value}», нужен формат YYYY-MM-DD") from None
+
+
+def _parse_number(value, where: str) -> float:
+    if isinstance(value, bool):
+        raise ValueError(f"{where}: должно быть числом")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{where}: должно быть числом, а не {value!r}") from None
+
+
+def _parse_dose(value, where: str = "доза") -> float:
+    dose = _parse_number(value, where)
+    if dose < 0:
+        raise ValueError("доза не может быть отрицательной")
+    return dose
+
+
+def _parse_weekdays(value) -> list:
+    if not isinstance(value, list) or len(value) != 7:
+        raise ValueError("weekdays должен быть списком из 7 доз (пн..вс)")
+    return [_parse_dose(dose, "weekdays") for dose in value]
+
+
+def parse_schedule(schedule) -> dict | None:
+    """Проверяет схему приёма и приводит её к каноническому виду.
+
+    Принимает словарь, JSON-строку или None. Бросает ValueError при ошибке.
+    """
+    if schedule is None or schedule == "":
+        return None
+    if isinstance(schedule, str):
+        schedule = json.loads(schedule)
+    if not isinstance(schedule, dict):
+        raise ValueError("схема приёма должна быть словарём")
+
+    parsed = {}
+
+    if "weekdays" in schedule:
+        parsed["weekdays"] = _parse_weekdays(schedule["weekdays"])
+
+    if "periods" in schedule:
+        if not isinstance(schedule["periods"], list):
+            raise ValueError("periods должен быть списком периодов")
+        periods = []
+        for number, period in enumerate(schedule["periods"], start=1):
+            where = f"период {number}"
+            if not isinstance(period, dict):
+                raise ValueError(f"{where}: должен быть словарём с ключами from, to и dose или weekdays")
+            start = _parse_date(_require(period, "from", where), f"{where}, from")
+            end = _parse_date(_require(period, "to", where), f"{where}, to")
+            if end < start:
+                raise ValueError(f"период {period['from']} - {period['to']}: конец раньше начала")
+            item = {"from": start.isoformat(), "to": end.isoformat()}
+            if "weekdays" in period:
+                item["weekdays"] = _parse_weekdays(period["weekdays"])
+            else:
+                item["dose"] = _parse_dose(_require(period, "dose", where), f"{where}, dose")
+            periods.append(item)
+        parsed["periods"] = periods
+
+    if "taper" in schedule:
+        taper = schedule["taper"]
+        if not isinstance(taper, dict):
+            raise ValueError("taper должен быть словарём с ключами start, dose и step")
+        every_days = _parse_number(taper.get("every_days", 1), "taper, every_days")
+        if every_days != int(every_days) or every_days <= 0:
+            raise ValueError("every_days должен быть целым положительным числом")
+        parsed["taper"] = {
+            "start": _parse_date(_require(taper, "start", "taper"), "taper, start").isoformat(),
+            "dose": _parse_number(_require(taper, "dose", "taper"), "taper, dose"),
+            "step": _parse_number(_require(taper, "step", "taper"), "taper, step"),
+            "every_days": int(every_days),
+            "min": _parse_number(taper.get("min", 0), "taper, min"),
+        }
+
+    return parsed or None
+
+
+def schedule_to_json(schedule) -> str | None:
+    """Каноническая JSON-строка схемы для хранения в БД (None - схемы нет)."""
+    parsed = parse_schedule(schedule)
+    if parsed is None:
+        return None
+    return json.dumps(parsed, ensure_ascii=False, sort_keys=True)
+
+
+def dose_on(schedule: dict | None, daily_dose: float, day: date) -> float:
+    """Доза на конкретный день по схеме (или daily_dose, если схемы нет)."""
+    if not schedule:
+        return daily_dose
+
+    day_iso = day.isoformat()
+    for period in schedule.get("periods", []):
+        if period["from"] <= day_iso <= period["to"]:
+            if "weekdays" in period:
+                return period["weekdays"][day.weekday()]
+            return period["dose"]
+
+    taper = schedule.get("taper")
+    if taper and day_iso >= taper["start"]:
+        steps = (day - date.fromisoformat(taper["start"])).days // taper["every_days"]
+        dose = taper["dose"] + taper["step"] * steps
+        return max(taper["min"], dose)
+
+    if "weekdays" in schedule:
+        return schedule["weekdays"][day.weekday()]
+
+    return daily_dose
+
+
+@lru_cache(maxsize=256)
+def _cumulative_calendar(schedule_json: str, daily_dose: float, end_year: int) -> array:
+    """Накопленный расход: элемент i - сумма доз с CALENDAR_ANCHOR по день CALENDAR_ANCHOR + i
+    включительно; календарь заканчивается 31 декабря end_year."""
+    schedule = json.loads(schedule_json)
+    doses = (
+        dose_on(schedule, daily_dose, CALENDAR_ANCHOR + timedelta(days=offset))
+        for offset in range((date(end_year, 12, 31) - CALENDAR_ANCHOR).days + 1)
+    )
+    return array("d", accumulate(doses))
+
+
+def _calendar_from(schedule_json: str, daily_dose: float, start: date) -> tuple:
+    """(календарь, индекс дня start, расход до start) для прогноза с даты start."""
+    if start < CALENDAR_ANCHOR:
+        raise ValueError(f"прогноз по схеме считается с {CALENDAR_ANCHOR.isoformat()}")
+    end_year = (start + timedelta(days=CALENDAR_HORIZON_DAYS)).year
+    calendar = _cumulative_calendar(schedule_json, daily_dose, end_year)
+    offset = (start - CALENDAR_ANCHOR).days
+    return calendar, offset, calendar[offset - 1] if offset else 0.0
+
+
+def days_left(schedule_json: str | None, daily_dose: float, current_stock: float, today: date = None) -> int:
+    """На сколько дней хватит остатка, начиная с завтрашнего дня.
+
+    Сегодняшняя доза уже списана ночной задачей, поэтому календарь
+    начинается с завтра. Для лекарства без схемы результат совпадает
+    с int(current_stock / daily_dose).
+    """
+    if current_stock <= 0:
+        return 0
+
+    if not schedule_json:
+        if daily_dose <= 0:
+            return 0
+        return int(current_stock / daily_dose)
+
+    start = (today or date.today()) + timedelta(days=1)
+    calendar, offset, before = _calendar_from(schedule_json, daily_dose, start)
+    # Число первых дней, чей накопленный с start расход укладывается в остаток
+    return bisect_right(calendar, before + current_stock, offset, offset + CALENDAR_HORIZON_DAYS) - offset
+
+
+def consumption_for_days(schedule_json: str | None, daily_dose: float, days: int, today: date = None) -> float:
+    """Сколько единиц уйдёт за days дней, начиная с завтрашнего."""
+    if days <= 0:
+        return 0.0
+
+    if not schedule_json:
+        return daily_dose * days
+
+    start = (today or date.today()) + timedelta(days=1)
+    calendar, offset, before = _calendar_from(schedule_json, daily_dose, start)
+    return calendar[offset + min(days, CALENDAR_HORIZON_DAYS) - 1] - before
+
+
+def runout_date(schedule_json: str | None, daily_dose: float, current_stock: float, today: date = None) -> date:
+    """Дата, до которой хватит остатка (сегодня, если уже закончилось)."""
+    today = today or date.today()
+    return today + timedelta(days=days_left(schedule_json, daily_dose, current_stock, today))
+
+
+def describe(schedule_json: str | None) -> str | None:
+    """Краткое описание схемы для сообщений (None - схемы нет)."""
+    schedule = parse_schedule(schedule_json)
+    if not schedule:
+        return None
+
+    parts = []
+    if "weekdays" in schedule:
+        parts.append(", ".join(
+            f"{name} {dose:g}" for name, dose in zip(WEEKDAY_NAMES, schedule["weekdays"])
+        ))
+    for period in schedule.get("periods", []):
+        start = date.fromisoformat(period["from"]).strftime("%d.%m.%Y")
+        end = date.fromisoformat(period["to"]).strftime("%d.%m.%Y")
+        if "weekdays" in period:
+            parts.append(f"{start}–{end}: по дням недели")
+        elif period["dose"] == 0:
+            parts.append(f"{start}–{end}: перерыв")
+        else:
+            parts.append(f"{start}–{end}: {period['dose']:g}")
+    taper = schedule.get("taper")
+    if taper:
+        start = date.fromisoformat(taper["start"]).strftime("%d.%m.%Y")
+        parts.append(f"с {start}: {taper['dose']:g}, шаг {taper['step']:+g} каждые {taper['every_days']} дн.")
+
+    return "; ".join(parts)
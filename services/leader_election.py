@@ -0,0 +1,152 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+
+from db import get_connection
+from config import SCHEDULER_LEASE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "scheduler"
+
+# Уникальный идентификатор процесса бота
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def try_acquire_lease(lease_name: str = LEASE_NAME, worker_id: str = WORKER_ID,
+                      ttl_seconds: float = SCHEDULER_LEASE_TTL_SECONDS) -> bool:
+    """Захватывает или продлевает аренду. Возвращает True, если процесс - ведущий.
+    
+    Аренду можно взять, если её нет, она уже принадлежит этому процессу
+    или истекла. Проверка и запись выполняются одним UPSERT, поэтому два
+    процесса не могут захватить аренду одновременно.
+    """
+    now = time.time()
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            """INSERT INTO scheduler_leases (name, holder, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+               WHERE scheduler_leases.holder = excluded.holder OR scheduler_leases.expires_at < ?""",
+            (lease_name, worker_id, now + ttl_seconds, now)
+        )
+        conn.commit()
+        
+        cursor.execute("SELECT holder FROM scheduler_leases WHERE name = ?", (lease_name,))
+        row = cursor.fetchone()
+        return row is not None and row[0] == worker_id
+    except Exception as e:
+        logger.error(f"Ошибка при захвате аренды {lease_name}: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+def get_lease_holder(lease_name: str = LEASE_NAME):
+    """Возвращает идентификатор текущего держателя аренды (даже истёкшей) или None."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT holder FROM scheduler_leases WHERE name = ?", (lease_name,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def release_lease(lease_name: str = LEASE_NAME, worker_id: str = WORKER_ID):
+    """Освобождает аренду, чтобы другой процесс мог сразу стать ведущим."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            "DELETE FROM scheduler_leases WHERE name = ? AND holder = ?",
+            (lease_name, worker_id)
+        )
+        conn.commit()
+        if cursor.rowcount:
+            logger.info(f"Аренда {lease_name} освобождена процессом {worker_id}")
+    except Exception as e:
+        logger.error(f"Ошибка при освобождении аренды {lease_name}: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def claim_job_run(job_id: str, run_date: str, worker_id: str = WORKER_ID) -> bool:
+    """Отмечает запуск задачи за день. Возвращает False, если задача уже запускалась."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            """INSERT OR IGNORE INTO job_runs (job_id, run_date, worker_id, started_at)
+               VALUES (?, ?, ?, ?)""",
+            (job_id, run_date, worker_id, datetime.now().isoformat())
+        )
+        conn.commit()
+        return cursor.rowcount == 1
+    except Exception as e:
+        logger.error(f"Ошибка при отметке запуска задачи {job_id}: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def finish_job_run(job_id: str, run_date: str):
+    """Отмечает завершение задачи за день."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            "UPDATE job_runs SET finished_at = ? WHERE job_id = ? AND run_date = ?",
+            (datetime.now().isoformat(), job_id, run_date)
+        )
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Ошибка при отметке завершения задачи {job_id}: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def has_job_run(job_id: str, run_date: str) -> bool:
+    """Проверяет, запускалась ли задача за указанный день."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            "SELECT 1 FROM job_runs WHERE job_id = ? AND run_date = ?",
+            (job_id, run_date)
+        )
+        return cursor.fetchone() is not None
+    finally:
+        conn.close()
+
+
+def get_last_finished_runs() -> dict:
+    """Время последнего завершённого запуска каждой задачи: job_id -> ISO-строка."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT job_id, MAX(finished_at)
+            FROM job_runs
+            WHERE finished_at IS NOT NULL
+            GROUP BY job_id
+        """)
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    finally:
+        conn.close()
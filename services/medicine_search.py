@@ -0,0 +1,135 @@
+"""
+Нечёткий поиск лекарств по названию и латинскому названию.
+
+Строки нормализуются (регистр, ё -> е, знаки препинания -> пробелы) и
+разбиваются на триграммы слов с отступами, как в pg_trgm: "мадопар" ->
+"  м", " ма", "мад", ..., "ар ". Для запроса последнее слово не дополняется
+справа, чтобы "мадо" находило "Мадопар" ещё во время набора.
+
+Оценка кандидата - доля триграмм запроса, найденных у лекарства, поэтому
+опечатка в одной букве ("мемонтин") портит лишь пару триграмм. Индекс
+(триграмма -> лекарства) строится один раз на версию каталога
+домохозяйства (households.catalog_version) и живёт в памяти процесса.
+"""
+import logging
+import re
+from collections import Counter
+
+from config import SEARCH_MIN_SCORE
+from db import get_connection
+from services import meds_service
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+# household_id -> (catalog_version, SearchIndex)
+_indexes = {}
+
+
+def normalize(text: str) -> str:
+    """Нижний регистр, ё -> е, всё кроме букв и цифр - пробелы."""
+    text = (text or "").casefold().replace("ё", "е")
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def trigrams(text: str, prefix: bool = False) -> set:
+    """Триграммы слов нормализованной строки; prefix - последнее слово не дописано."""
+    words = normalize(text).split()
+    result = set()
+    for index, word in enumerate(words):
+        padded = "  " + word
+        if not (prefix and index == len(words) - 1):
+            padded += " "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class SearchIndex:
+    """Обратный индекс триграмм по названиям лекарств одного домохозяйства."""
+
+    def __init__(self, medicines: list):
+        self.names = {}
+        self.postings = {}
+        for med in medicines:
+            text = " ".join(filter(None, (med["name"], med["latin_name"])))
+            self.names[med["id"]] = normalize(text)
+            for trigram in trigrams(text):
+                self.postings.setdefault(trigram, []).append(med["id"])
+
+    def search(self, query: str, min_score: float = SEARCH_MIN_SCORE) -> list:
+        """Список (medicine_id, оценка от 0 до 1) по убыванию оценки."""
+        query_trigrams = trigrams(query, prefix=True)
+        if not query_trigrams:
+            return []
+
+        hits = Counter()
+        for trigram in query_trigrams:
+            hits.update(self.postings.get(trigram, ()))
+
+        normalized = normalize(query)
+        scored = []
+        for medicine_id, count in hits.items():
+            # Подстрока названия - точное попадание, даже если запрос короткий
+            score = 1.0 if normalized in self.names[medicine_id] else count / len(query_trigrams)
+            if score >= min_score:
+                scored.append((medicine_id, score))
+
+        scored.sort(key=lambda item: (-item[1], self.names[item[0]]))
+        return scored
+
+
+def _catalog_version(household_id: int) -> int:
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT catalog_version FROM households WHERE id = ?", (household_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    finally:
+        conn.close()
+
+
+def get_index(household_id: int, medicines: list = None) -> SearchIndex:
+    """Индекс домохозяйства; перестраивается, только если сменилась версия каталога."""
+    version = _catalog_version(household_id)
+    cached = _indexes.get(household_id)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    if medicines is None:
+        medicines = meds_service.get_all_medicines(household_id)
+    index = SearchIndex(medicines)
+    _indexes[household_id] = (version, index)
+    logger.info(f"Построен поисковый индекс household_id={household_id}, версия каталога {version}")
+    return index
+
+
+def invalidate(household_id: int = None):
+    """Сбрасывает индексы (например, после правки каталога в обход catalog_version)."""
+    if household_id is None:
+        _indexes.clear()
+    else:
+        _indexes.pop(household_id, None)
+
+
+def find_medicines(household_id: int, query: str, medicines: list = None) -> list:
+    """Лекарства по запросу: точное совпадение, иначе подстрока, иначе нечёткий поиск.
+
+    Если при нечётком поиске лучший кандидат заметно впереди остальных,
+    возвращается только он - так опечатка не превращается в выбор из списка.
+    """
+    if medicines is None:
+        medicines = meds_service.get_all_medicines(household_id)
+
+    matches = meds_service.match_medicines(medicines, query)
+    if matches:
+        return matches
+
+    scored = get_index(household_id, medicines).search(query)
+    if len(scored) > 1 and scored[0][1] - scored[1][1] >= 0.2:
+        scored = scored[:1]
+
+    by_id = {med["id"]: med for med in medicines}
+    return [by_id[medicine_id] for medicine_id, _ in scored if medicine_id in by_id]
@@ -1,95 +1,186 @@
 import logging
-from datetime import datetime, date
-from db import get_connection
+from datetime import datetime, date, timedelta
+from db import get_connection, begin_immediate, refresh_runout_dates, add_purchase_to_rollup
+from config import HOUSEHOLDS_CONFIG, USE_OBSERVED_CONSUMPTION
+from services import analytics
+from services import dose_schedule
+from services.purchase_planner import parse_package_sizes
+from utils.dates import to_iso_date
 
 logger = logging.getLogger(__name__)
 
 
-def get_or_create_user(tg_user_id: int, first_name: str = None) -> int:
-    """Получает или создаёт пользователя в БД. Возвращает user_id."""
+def _household_id_for_new_user(cursor, tg_user_id: int) -> int:
+    """Определяет домохозяйство для нового пользователя по HOUSEHOLDS_CONFIG."""
+    household_name = HOUSEHOLDS_CONFIG[0]["name"]
+    for household_config in HOUSEHOLDS_CONFIG:
+        if tg_user_id in household_config.get("members", []):
+            household_name = household_config["name"]
+            break
+    
+    cursor.execute("SELECT id FROM households WHERE name = ?", (household_name,))
+    row = cursor.fetchone()
+    if not row:
+        raise ValueError(f"Домохозяйство {household_name} не найдено в БД")
+    return row[0]
+
+
+def get_user_household_id(tg_user_id: int, first_name: str = None) -> int:
+    """Возвращает household_id пользователя, регистрируя его при первом обращении."""
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
-        # Проверяем, существует ли пользователь
-        cursor.execute("SELECT id FROM users WHERE tg_user_id = ?", (tg_user_id,))
-        existing = cursor.fetchone()
+        cursor.execute("SELECT household_id FROM users WHERE tg_user_id = ?", (tg_user_id,))
+        row = cursor.fetchone()
         
-        if existing:
-            user_id = existing[0]
+        if row and row[0] is not None:
+            return row[0]
+        
+        household_id = _household_id_for_new_user(cursor, tg_user_id)
+        if row:
+            cursor.execute(
+                "UPDATE users SET household_id = ? WHERE tg_user_id = ?",
+                (household_id, tg_user_id)
+            )
         else:
-            # Создаём нового пользователя
-            created_at = datetime.now().isoformat()
             cursor.execute(
-                "INSERT INTO users (tg_user_id, first_name, created_at) VALUES (?, ?, ?)",
-                (tg_user_id, first_name, created_at)
+                "INSERT INTO users (tg_user_id, first_name, created_at, household_id) VALUES (?, ?, ?, ?)",
+                (tg_user_id, first_name, datetime.now().isoformat(), household_id)
             )
-            user_id = cursor.lastrowid
-            conn.commit()
-            logger.info(f"Создан новый пользователь: tg_user_id={tg_user_id}, user_id={user_id}")
+            logger.info(f"Создан новый пользователь: tg_user_id={tg_user_id}, household_id={household_id}")
+        conn.commit()
         
-        return user_id
+        return household_id
     except Exception as e:
-        logger.error(f"Ошибка при работе с пользователем: {e}")
+        logger.error(f"Ошибка при определении домохозяйства пользователя: {e}")
         conn.rollback()
         raise
     finally:
         conn.close()
 
 
-def get_all_medicines():
-    """Возвращает список всех лекарств из БД."""
+def get_household(household_id: int):
+    """Получает домохозяйство по ID."""
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT id, name, latin_name, daily_dose, current_stock, notify_before_days FROM medicines ORDER BY name")
-        rows = cursor.fetchall()
-        
-        medicines = []
-        for row in rows:
-            medicines.append({
-                "id": row[0],
-                "name": row[1],
-                "latin_name": row[2],
-                "daily_dose": row[3],
-                "current_stock": row[4],
-                "notify_before_days": row[5]
-            })
+        cursor.execute("SELECT id, name FROM households WHERE id = ?", (household_id,))
+        row = cursor.fetchone()
         
-        return medicines
+        if row:
+            return {"id": row[0], "name": row[1]}
+        return None
     finally:
         conn.close()
 
 
-def get_medicine_by_id(medicine_id: int):
-    """Получает лекарство по ID."""
+def get_all_households():
+    """Возвращает список всех домохозяйств (для ночной обработки)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT id, name FROM households ORDER BY id")
+        return [{"id": row[0], "name": row[1]} for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def _medicine_from_row(row):
+    """Преобразует строку SELECT_MEDICINE_COLUMNS в словарь."""
+    return {
+        "id": row[0],
+        "household_id": row[1],
+        "name": row[2],
+        "latin_name": row[3],
+        "daily_dose": row[4],
+        "current_stock": row[5],
+        "notify_before_days": row[6],
+        "expiry_date": row[7],
+        "dose_schedule": row[8],
+        "package_sizes": parse_package_sizes(row[9])
+    }
+
+
+# Лекарство вместе с датой окончания рецепта - одним запросом, без отдельного
+# обращения к prescriptions на каждое лекарство
+SELECT_MEDICINE_COLUMNS = """
+    SELECT m.id, m.household_id, m.name, m.latin_name, m.daily_dose, m.current_stock,
+           m.notify_before_days, p.expiry_date, m.dose_schedule, m.package_sizes
+    FROM medicines m
+    LEFT JOIN prescriptions p ON p.medicine_id = m.id
+"""
+
+
+def get_all_medicines(household_id: int):
+    """Возвращает список всех лекарств домохозяйства (с датой окончания рецепта)."""
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute(
-            "SELECT id, name, latin_name, daily_dose, current_stock, notify_before_days FROM medicines WHERE id = ?",
-            (medicine_id,)
+            SELECT_MEDICINE_COLUMNS + " WHERE m.household_id = ? ORDER BY m.name",
+            (household_id,)
         )
+        return [_medicine_from_row(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def get_medicine_by_id(medicine_id: int, household_id: int = None):
+    """Получает лекарство по ID (если указан household_id - только из этого домохозяйства)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        if household_id is None:
+            cursor.execute(SELECT_MEDICINE_COLUMNS + " WHERE m.id = ?", (medicine_id,))
+        else:
+            cursor.execute(
+                SELECT_MEDICINE_COLUMNS + " WHERE m.id = ? AND m.household_id = ?",
+                (medicine_id, household_id)
+            )
         row = cursor.fetchone()
         
         if row:
-            return {
-                "id": row[0],
-                "name": row[1],
-                "latin_name": row[2],
-                "daily_dose": row[3],
-                "current_stock": row[4],
-                "notify_before_days": row[5]
-            }
+            return _medicine_from_row(row)
         return None
     finally:
         conn.close()
 
 
-def set_prescription_expiry(medicine_id: int, expiry_date: str):
-    """Устанавливает или обновляет дату окончания рецепта для лекарства."""
+def match_medicines(medicines: list, query: str):
+    """Ищет лекарства по названию или латинскому названию (без учёта регистра).
+    
+    Точное совпадение имеет приоритет; иначе возвращаются все лекарства,
+    в названии которых встречается запрос. Поиск с опечатками -
+    services/medicine_search.find_medicines.
+    """
+    query = query.strip().casefold()
+    if not query:
+        return []
+    
+    exact = [
+        med for med in medicines
+        if med["name"].casefold() == query or (med["latin_name"] or "").casefold() == query
+    ]
+    if exact:
+        return exact
+    
+    return [
+        med for med in medicines
+        if query in med["name"].casefold() or query in (med["latin_name"] or "").casefold()
+    ]
+
+
+def set_prescription_expiry(medicine_id: int, expiry_date):
+    """Устанавливает или обновляет дату окончания рецепта для лекарства.
+    
+    Дата (date или строка) сохраняется в виде YYYY-MM-DD; нераспознанная дата - ValueError.
+    """
+    expiry_date = to_iso_date(expiry_date)
     conn = get_connection()
     cursor = conn.cursor()
     
@@ -121,37 +212,69 @@ def set_prescription_expiry(medicine_id: int, expiry_date: str):
         conn.close()
 
 
-def add_purchase(medicine_id: int, quantity: int):
-    """Добавляет покупку лекарства и обновляет current_stock."""
+def _apply_purchase(cursor, medicine_id: int, quantity: int, price: float, purchased_at: str,
+                    household_id: int = None):
+    """Меняет остаток и записывает покупку в текущей транзакции. Возвращает (new_stock, household_id).
+    
+    Остаток меняется одним UPDATE ... RETURNING, а не чтением и записью
+    из Python, поэтому одновременная покупка или ночное списание не теряются.
+    """
+    # Не уходим в минус при коррекции
+    cursor.execute(
+        """UPDATE medicines SET current_stock = MAX(0, current_stock + ?)
+           WHERE id = ? AND household_id = COALESCE(?, household_id)
+           RETURNING current_stock, household_id""",
+        (quantity, medicine_id, household_id)
+    )
+    row = cursor.fetchone()
+    
+    if not row:
+        raise ValueError(f"Лекарство с id={medicine_id} не найдено")
+    
+    new_stock, household_id = row
+    
+    # Добавляем запись о покупке
+    cursor.execute(
+        """INSERT INTO purchases (medicine_id, household_id, quantity, purchased_at, price)
+           VALUES (?, ?, ?, ?, ?)""",
+        (medicine_id, household_id, quantity, purchased_at, price)
+    )
+    add_purchase_to_rollup(cursor, medicine_id, quantity, price, purchased_at)
+    
+    return new_stock, household_id
+
+
+def add_purchase(medicine_id: int, quantity: int, price: float = None):
+    """Добавляет покупку лекарства и обновляет current_stock.
+    
+    price - сумма за всю покупку (руб.), необязательна.
+    """
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
-        # Получаем текущий остаток
-        cursor.execute("SELECT current_stock FROM medicines WHERE id = ?", (medicine_id,))
+        cursor.execute("SELECT household_id FROM medicines WHERE id = ?", (medicine_id,))
         row = cursor.fetchone()
-        
         if not row:
             raise ValueError(f"Лекарство с id={medicine_id} не найдено")
+        household_id = row[0]
         
-        current_stock = row[0]
-        new_stock = max(0, current_stock + quantity)  # не уходим в минус при коррекции
+        # Покупка одинаково увеличивает и сумму покупок, и остаток, поэтому
+        # фактический расход не меняется - его берём до BEGIN, чтобы не
+        # держать блокировку записи на время запросов к истории
+        rates = get_projection_rates(household_id)
         
-        # Обновляем остаток
-        cursor.execute(
-            "UPDATE medicines SET current_stock = ? WHERE id = ?",
-            (new_stock, medicine_id)
+        begin_immediate(cursor)
+        new_stock, _ = _apply_purchase(
+            cursor, medicine_id, quantity, price, datetime.now().isoformat(), household_id
         )
         
-        # Добавляем запись о покупке
-        purchased_at = datetime.now().isoformat()
-        cursor.execute(
-            "INSERT INTO purchases (medicine_id, quantity, purchased_at) VALUES (?, ?, ?)",
-            (medicine_id, quantity, purchased_at)
-        )
+        refresh_runout_dates(cursor, household_id, rates)
         
         conn.commit()
-        logger.info(f"Добавлена покупка: medicine_id={medicine_id}, quantity={quantity}, new_stock={new_stock}")
+        logger.info(
+            f"Добавлена покупка: medicine_id={medicine_id}, quantity={quantity}, price={price}, new_stock={new_stock}"
+        )
         
         return new_stock
     except Exception as e:
@@ -162,6 +285,202 @@ def add_purchase(medicine_id: int, quantity: int):
         conn.close()
 
 
+def add_purchases(household_id: int, items: list):
+    """Добавляет несколько покупок домохозяйства одной транзакцией.
+    
+    items - список словарей medicine_id, quantity, price (как из
+    purchase_batch.parse_purchase_lines). Либо записываются все покупки,
+    либо ни одной. Возвращает {medicine_id: новый остаток}.
+    """
+    rates = get_projection_rates(household_id)
+    purchased_at = datetime.now().isoformat()
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        begin_immediate(cursor)
+        new_stocks = {}
+        for item in items:
+            new_stocks[item["medicine_id"]], _ = _apply_purchase(
+                cursor, item["medicine_id"], item["quantity"], item["price"], purchased_at, household_id
+            )
+        
+        # Прогноз пересчитывается один раз на всю пачку
+        refresh_runout_dates(cursor, household_id, rates)
+        
+        conn.commit()
+        logger.info(f"Добавлено покупок пачкой: {len(items)}, household_id={household_id}")
+        
+        return new_stocks
+    except Exception as e:
+        logger.error(f"Ошибка при добавлении покупок пачкой: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def get_daily_purchase_totals(medicine_id: int, date_from: str) -> dict:
+    """Сумма покупок лекарства по дням начиная с date_from (YYYY-MM-DD): {дата: количество}."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            """SELECT substr(purchased_at, 1, 10), SUM(quantity) FROM purchases
+               WHERE medicine_id = ? AND purchased_at >= ?
+               GROUP BY substr(purchased_at, 1, 10)""",
+            (medicine_id, date_from)
+        )
+        return dict(cursor.fetchall())
+    finally:
+        conn.close()
+
+
+def get_purchase_history(household_id: int, medicine_id: int = None, date_from: str = None,
+                         date_to: str = None, older_than: int = None, newer_than: int = None,
+                         limit: int = 10):
+    """Возвращает страницу истории покупок (сначала новые) и признак, есть ли ещё записи.
+    
+    Пагинация keyset: older_than/newer_than - id покупки, на которой закончилась
+    соседняя страница. Сравнение идёт по паре (purchased_at, id), поэтому
+    запрос использует индекс idx_purchases_household_date (или
+    idx_purchases_medicine_date с фильтром по лекарству) без сортировки и не
+    зависит от того, как далеко страница от начала.
+    
+    date_from/date_to - даты в формате YYYY-MM-DD (включительно).
+    """
+    conditions = ["p.household_id = ?"]
+    params = [household_id]
+    
+    if medicine_id is not None:
+        conditions.append("p.medicine_id = ?")
+        params.append(medicine_id)
+    if date_from:
+        conditions.append("p.purchased_at >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("p.purchased_at < date(?, '+1 day')")
+        params.append(date_to)
+    
+    if newer_than is not None:
+        conditions.append("(p.purchased_at, p.id) > (SELECT purchased_at, id FROM purchases WHERE id = ?)")
+        params.append(newer_than)
+        order = "ASC"
+    else:
+        if older_than is not None:
+            conditions.append("(p.purchased_at, p.id) < (SELECT purchased_at, id FROM purchases WHERE id = ?)")
+            params.append(older_than)
+        order = "DESC"
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Берём на одну запись больше, чтобы узнать, есть ли следующая страница
+        cursor.execute(
+            f"""SELECT p.id, p.medicine_id, m.name, p.quantity, p.purchased_at, p.price
+                FROM purchases p
+                JOIN medicines m ON m.id = p.medicine_id
+                WHERE {" AND ".join(conditions)}
+                ORDER BY p.purchased_at {order}, p.id {order}
+                LIMIT ?""",
+            params + [limit + 1]
+        )
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if order == "ASC":
+        rows.reverse()
+    
+    purchases = [
+        {
+            "id": row[0],
+            "medicine_id": row[1],
+            "name": row[2],
+            "quantity": row[3],
+            "purchased_at": row[4],
+            "price": row[5]
+        }
+        for row in rows
+    ]
+    return purchases, has_more
+
+
+def _month_start(months_back: int, today: date = None) -> str:
+    """Месяц (YYYY-MM), отстоящий от текущего на months_back месяцев назад."""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - months_back
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def get_monthly_spending(household_id: int, months: int = 12, today: date = None):
+    """Итоги покупок домохозяйства по месяцам за последние months месяцев (включая текущий).
+    
+    Читает только помесячные итоги purchase_monthly, поэтому не зависит от
+    длины истории покупок. Возвращает список (от старых к новым) словарей
+    month (YYYY-MM), quantity, purchases, cost, priced_purchases; месяцы без
+    покупок - с нулями.
+    """
+    first_month = _month_start(months - 1, today)
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            """SELECT r.month, SUM(r.quantity), SUM(r.purchases), SUM(r.cost), SUM(r.priced_purchases)
+               FROM purchase_monthly r
+               JOIN medicines m ON m.id = r.medicine_id
+               WHERE m.household_id = ? AND r.month >= ?
+               GROUP BY r.month""",
+            (household_id, first_month)
+        )
+        totals = {row[0]: row for row in cursor.fetchall()}
+    finally:
+        conn.close()
+    
+    result = []
+    for months_back in range(months - 1, -1, -1):
+        month = _month_start(months_back, today)
+        row = totals.get(month)
+        result.append({
+            "month": month,
+            "quantity": row[1] if row else 0,
+            "purchases": row[2] if row else 0,
+            "cost": row[3] if row else 0.0,
+            "priced_purchases": row[4] if row else 0
+        })
+    return result
+
+
+def get_spending_by_medicine(household_id: int, months: int = 12, today: date = None):
+    """Итоги покупок по лекарствам за последние months месяцев, по убыванию суммы."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            """SELECT m.name, SUM(r.quantity), SUM(r.purchases), SUM(r.cost), SUM(r.priced_purchases)
+               FROM purchase_monthly r
+               JOIN medicines m ON m.id = r.medicine_id
+               WHERE m.household_id = ? AND r.month >= ?
+               GROUP BY m.id
+               ORDER BY SUM(r.cost) DESC, m.name""",
+            (household_id, _month_start(months - 1, today))
+        )
+        return [
+            {"name": row[0], "quantity": row[1], "purchases": row[2], "cost": row[3], "priced_purchases": row[4]}
+            for row in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+
 def get_prescription_expiry(medicine_id: int):
     """Получает дату окончания рецепта для лекарства."""
     conn = get_connection()
@@ -178,34 +497,58 @@ def get_prescription_expiry(medicine_id: int):
         conn.close()
 
 
-def get_status_for_user():
-    """Возвращает текстовое резюме по всем лекарствам, отсортированное по days_left (по возрастанию)."""
-    medicines = get_all_medicines()
+def calculate_days_left(current_stock: int, daily_rate: float) -> int:
+    """Рассчитывает, на сколько дней хватит остатка при заданном расходе в день."""
+    if daily_rate > 0 and current_stock > 0:
+        return int(current_stock / daily_rate)
+    return 0
+
+
+def calculate_medicine_days_left(med: dict, rates: dict = None) -> int:
+    """На сколько дней хватит лекарства: по фактическому расходу (если он есть в rates),
+    по схеме приёма или по daily_dose."""
+    if rates and med["id"] in rates:
+        return calculate_days_left(med["current_stock"], rates[med["id"]])
+    return dose_schedule.days_left(med["dose_schedule"], med["daily_dose"], med["current_stock"])
+
+
+def get_projection_rates(household_id: int):
+    """Возвращает расход в день для прогнозов: medicine_id -> rate.
+    
+    При USE_OBSERVED_CONSUMPTION берётся фактический расход по истории покупок,
+    иначе словарь пуст и прогнозы считаются по daily_dose.
+    """
+    if not USE_OBSERVED_CONSUMPTION:
+        return {}
+    
+    rates = analytics.get_consumption_rates(household_id)
+    return {medicine_id: rate["effective_rate"] for medicine_id, rate in rates.items()}
+
+
+def get_status_for_user(household_id: int):
+    """Возвращает текстовое резюме по всем лекарствам домохозяйства, отсортированное по days_left (по возрастанию)."""
+    medicines = get_all_medicines(household_id)
+    rates = get_projection_rates(household_id)
     
     status_lines = []
     for med in medicines:
-        medicine_id = med["id"]
         name = med["name"]
         latin_name = med.get("latin_name")
         daily_dose = med["daily_dose"]
         current_stock = med["current_stock"]
         
         # Рассчитываем дни до окончания
-        if daily_dose > 0:
-            days_left = int(current_stock / daily_dose) if current_stock > 0 else 0
-        else:
-            days_left = 0
-        
-        # Получаем дату окончания рецепта
-        expiry_date = get_prescription_expiry(medicine_id)
+        days_left = calculate_medicine_days_left(med, rates)
         
         status_lines.append({
+            "id": med["id"],
             "name": name,
             "latin_name": latin_name,
             "daily_dose": daily_dose,
+            "schedule": dose_schedule.describe(med["dose_schedule"]),
             "current_stock": current_stock,
             "days_left": days_left,
-            "expiry_date": expiry_date
+            "expiry_date": med["expiry_date"]
         })
     
     # Сортируем по days_left (по возрастанию - сначала те, что закончатся быстрее)
@@ -214,108 +557,128 @@ def get_status_for_user():
     return status_lines
 
 
-def get_medicines_expiring_within_month():
-    """Возвращает список лекарств и рецептов, которые закончатся в течение месяца."""
-    from datetime import date, timedelta
+def get_expiring_items(household_id: int, horizon_days: int = 30, group_by_type: bool = True):
+    """Возвращает лекарства и рецепты домохозяйства, которые закончатся в ближайшие horizon_days дней.
     
-    medicines = get_all_medicines()
+    Даты не пересчитываются: лекарства выбираются по сохранённому прогнозу
+    medicines.runout_date (индекс idx_medicines_household_runout), рецепты -
+    по prescriptions.expiry_date (индекс idx_prescriptions_expiry).
+    Уже закончившиеся лекарства и рецепты тоже попадают в отчёт.
+    
+    При group_by_type сначала идут лекарства, затем рецепты, внутри - по дате;
+    иначе всё вместе по дате. Даты хранятся как YYYY-MM-DD, поэтому и сравнение,
+    и сортировка, и форматирование для показа (display_date) выполняются в SQL.
+    """
     today = date.today()
-    month_later = today + timedelta(days=30)
+    until = (today + timedelta(days=horizon_days)).isoformat()
+    order_by = "type_order, expiry_date, name" if group_by_type else "expiry_date, type_order, name"
     
-    expiring_items = []
+    conn = get_connection()
+    cursor = conn.cursor()
     
-    for med in medicines:
-        medicine_id = med["id"]
-        name = med["name"]
-        latin_name = med.get("latin_name")
-        daily_dose = med["daily_dose"]
-        current_stock = med["current_stock"]
-        
-        # Проверяем остаток лекарства
-        if daily_dose > 0:
-            days_left = int(current_stock / daily_dose) if current_stock > 0 else 0
-            if days_left <= 30:
-                # Рассчитываем примерную дату окончания (сегодня, если уже закончилось)
-                expiry_date_meds = today + timedelta(days=days_left)
-                expiring_items.append({
-                    "name": name,
-                    "latin_name": latin_name,
-                    "type": "лекарство",
-                    "expiry_date": expiry_date_meds.isoformat(),
-                    "days_left": days_left
-                })
-        
-        # Проверяем рецепт
-        expiry_date_str = get_prescription_expiry(medicine_id)
-        if expiry_date_str:
-            try:
-                expiry_date = datetime.fromisoformat(expiry_date_str).date()
-                if expiry_date <= month_later:
-                    days_left = (expiry_date - today).days
-                    expiring_items.append({
-                        "name": name,
-                        "latin_name": latin_name,
-                        "type": "рецепт",
-                        "expiry_date": expiry_date_str,
-                        "days_left": days_left
-                    })
-            except (ValueError, AttributeError):
-                try:
-                    expiry_date = datetime.strptime(expiry_date_str, "%Y-%m-%d").date()
-                    if expiry_date <= month_later:
-                        days_left = (expiry_date - today).days
-                        expiring_items.append({
-                            "name": name,
-                            "latin_name": latin_name,
-                            "type": "рецепт",
-                            "expiry_date": expiry_date_str,
-                            "days_left": days_left
-                        })
-                except ValueError:
-                    pass
-    
-    # Сортируем по дате окончания
-    expiring_items.sort(key=lambda x: x["expiry_date"])
-    
-    return expiring_items
-
-
-def get_all_users():
-    """Возвращает список всех пользователей (для отправки напоминаний)."""
+    try:
+        cursor.execute(
+            f"""SELECT 0 AS type_order, m.name, m.latin_name, m.runout_date AS expiry_date,
+                       CAST(julianday(m.runout_date) - julianday(?) AS INTEGER),
+                       strftime('%d.%m.%Y', m.runout_date)
+                FROM medicines m
+                WHERE m.household_id = ? AND m.runout_date <= ?
+                UNION ALL
+                SELECT 1 AS type_order, m.name, m.latin_name, p.expiry_date AS expiry_date,
+                       CAST(julianday(p.expiry_date) - julianday(?) AS INTEGER),
+                       strftime('%d.%m.%Y', p.expiry_date)
+                FROM prescriptions p
+                JOIN medicines m ON m.id = p.medicine_id
+                WHERE p.expiry_date <= ? AND m.household_id = ?
+                ORDER BY {order_by}""",
+            (today.isoformat(), household_id, until, today.isoformat(), until, household_id)
+        )
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    
+    return [
+        {
+            "name": name,
+            "latin_name": latin_name,
+            "type": "лекарство" if type_order == 0 else "рецепт",
+            "expiry_date": expiry_date,
+            "days_left": days_left,
+            "display_date": display_date
+        }
+        for type_order, name, latin_name, expiry_date, days_left, display_date in rows
+    ]
+
+
+def get_prescriptions_expiring_on(household_id: int, expiry_date: date):
+    """Возвращает названия лекарств домохозяйства, рецепт на которые заканчивается в указанный день."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            """SELECT m.name
+               FROM prescriptions p
+               JOIN medicines m ON m.id = p.medicine_id
+               WHERE p.expiry_date = ? AND m.household_id = ?
+               ORDER BY m.name""",
+            (expiry_date.isoformat(), household_id)
+        )
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def get_household_user_ids(household_id: int):
+    """Возвращает tg_user_id участников домохозяйства (для отправки напоминаний)."""
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT tg_user_id FROM users")
+        cursor.execute("SELECT tg_user_id FROM users WHERE household_id = ?", (household_id,))
         rows = cursor.fetchall()
         return [row[0] for row in rows]
     finally:
         conn.close()
 
 
-def decrease_daily_stock():
-    """Уменьшает остаток всех лекарств на daily_dose (ежедневная задача)."""
+def decrease_daily_stock(household_id: int):
+    """Уменьшает остаток всех лекарств домохозяйства на сегодняшнюю дозу (ежедневная задача)."""
+    rates = get_projection_rates(household_id)
     conn = get_connection()
     cursor = conn.cursor()
+    today = date.today()
     
     try:
-        cursor.execute("SELECT id, name, daily_dose, current_stock FROM medicines")
+        begin_immediate(cursor)
+        cursor.execute(
+            "SELECT id, daily_dose, dose_schedule FROM medicines WHERE household_id = ?",
+            (household_id,)
+        )
         medicines = cursor.fetchall()
         
-        updated_count = 0
-        for med_id, name, daily_dose, current_stock in medicines:
-            if daily_dose > 0:
-                new_stock = max(0, int(current_stock - daily_dose))
-                if new_stock != current_stock:
-                    cursor.execute(
-                        "UPDATE medicines SET current_stock = ? WHERE id = ?",
-                        (new_stock, med_id)
-                    )
-                    updated_count += 1
-                    logger.debug(f"Обновлён остаток для {name}: {current_stock} -> {new_stock}")
+        # Доза на сегодня зависит только от схемы, а вычитание идёт в SQL от
+        # текущего остатка: покупка, записанная параллельно, не затирается
+        updates = []
+        for med_id, daily_dose, schedule_json in medicines:
+            dose = dose_schedule.dose_on(dose_schedule.parse_schedule(schedule_json), daily_dose, today)
+            if dose > 0:
+                updates.append((dose, med_id))
+        
+        cursor.executemany(
+            """UPDATE medicines SET current_stock = MAX(0, CAST(current_stock - ? AS INTEGER))
+               WHERE id = ? AND current_stock > 0""",
+            updates
+        )
+        updated_count = cursor.rowcount
+        
+        refresh_runout_dates(cursor, household_id, rates, today)
         
         conn.commit()
-        logger.info(f"Ежедневное уменьшение остатков: обновлено {updated_count} лекарств")
+        logger.info(
+            f"Ежедневное уменьшение остатков (household_id={household_id}): "
+            f"обновлено {updated_count} лекарств"
+        )
     except Exception as e:
         logger.error(f"Ошибка при ежедневном уменьшении остатков: {e}")
         conn.rollback()
@@ -0,0 +1,163 @@
+"""
+Метрики в текстовом формате Prometheus для GET /metrics.
+
+Из счётчиков utils/perf: обновления по типу, время хендлеров (summary с
+квантилями по выборке), ошибки хендлеров, вызовы Bot API с ошибкой,
+отправленные и неотправленные напоминания, SQL-запросы, длительность ночных
+задач. Из БД: запас и дата окончания каждого лекарства, время последнего
+завершённого запуска ночных задач.
+
+Запросы к БД синхронные, поэтому render_metrics выполняет их в потоке
+(asyncio.to_thread) и не блокирует цикл событий бота.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from db import get_connection
+from services import leader_election
+from utils import perf
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "meds_bot"
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Exposition:
+    """Собирает текст экспозиции: HELP/TYPE один раз на метрику, затем значения."""
+
+    def __init__(self):
+        self.lines = []
+        self._declared = set()
+
+    def declare(self, name: str, metric_type: str, help_text: str):
+        if name in self._declared:
+            return
+        self._declared.add(name)
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name: str, value, **labels):
+        self.lines.append(f"{name}{_labels(**labels)} {value}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _add_summary(out: _Exposition, name: str, help_text: str, label: str, prefix: str):
+    """Замеры perf с именами prefix.<значение метки> как summary в секундах."""
+    reservoirs = {
+        metric[len(prefix):]: reservoir
+        for metric, reservoir in perf.reservoirs(prefix).items()
+    }
+    if not reservoirs:
+        return
+
+    out.declare(name, "summary", help_text)
+    for value, reservoir in reservoirs.items():
+        for quantile in SUMMARY_QUANTILES:
+            out.sample(name, round(reservoir.percentile(quantile * 100) / 1000, 6),
+                       **{label: value, "quantile": quantile})
+        out.sample(f"{name}_sum", round(reservoir.total / 1000, 6), **{label: value})
+        out.sample(f"{name}_count", reservoir.count, **{label: value})
+
+
+def _add_process_metrics(out: _Exposition):
+    counters = perf.counters()
+
+    out.declare(f"{PREFIX}_updates_total", "counter", "Входящие обновления по типу")
+    for name, value in counters.items():
+        if name.startswith("updates."):
+            out.sample(f"{PREFIX}_updates_total", value, type=name[len("updates."):])
+
+    _add_summary(out, f"{PREFIX}_handler_duration_seconds", "Время обработки обновления хендлером",
+                 "handler", "handler.")
+
+    out.declare(f"{PREFIX}_handler_errors_total", "counter", "Исключения в хендлерах")
+    for name, value in counters.items():
+        if name.startswith("handler_errors."):
+            out.sample(f"{PREFIX}_handler_errors_total", value, handler=name[len("handler_errors."):])
+
+    out.declare(f"{PREFIX}_api_calls_total", "counter", "Вызовы Bot API по методу и результату")
+    for name, value in counters.items():
+        if name.startswith("api."):
+            method, result = name[len("api."):].rsplit(".", 1)
+            out.sample(f"{PREFIX}_api_calls_total", value, method=method, result=result)
+
+    out.declare(f"{PREFIX}_reminders_total", "counter", "Напоминания ночных задач по результату отправки")
+    for result in ("sent", "failed"):
+        out.sample(f"{PREFIX}_reminders_total", counters.get(f"reminders.{result}", 0), result=result)
+
+    out.declare(f"{PREFIX}_db_queries_total", "counter", "SQL-запросы через db.get_connection")
+    out.sample(f"{PREFIX}_db_queries_total", counters.get("db.queries", 0))
+
+    _add_summary(out, f"{PREFIX}_job_duration_seconds", "Длительность ночных задач", "job", "job.")
+
+
+def collect_db_metrics() -> dict:
+    """Данные для метрик из БД (синхронно, вызывать через asyncio.to_thread)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            SELECT household_id, name, current_stock,
+                   CAST(julianday(runout_date) - julianday('now', 'localtime', 'start of day') AS INTEGER)
+            FROM medicines
+            ORDER BY household_id, name
+        """)
+        stock = cursor.fetchall()
+    finally:
+        conn.close()
+
+    return {
+        "stock": stock,
+        "last_runs": leader_election.get_last_finished_runs(),
+    }
+
+
+def _add_db_metrics(out: _Exposition, data: dict):
+    # Значения одной метрики в экспозиции должны идти подряд
+    out.declare(f"{PREFIX}_medicine_stock", "gauge", "Текущий запас лекарства (таблеток)")
+    for household_id, name, stock, _ in data["stock"]:
+        out.sample(f"{PREFIX}_medicine_stock", stock, household=household_id, medicine=name)
+
+    out.declare(f"{PREFIX}_medicine_days_left", "gauge", "Дней до окончания лекарства по прогнозу")
+    for household_id, name, _, days_left in data["stock"]:
+        if days_left is not None:
+            out.sample(f"{PREFIX}_medicine_days_left", days_left, household=household_id, medicine=name)
+
+    out.declare(f"{PREFIX}_job_last_finished_timestamp_seconds", "gauge",
+                "Время последнего завершённого запуска ночной задачи (unix)")
+    for job_id, finished_at in sorted(data["last_runs"].items()):
+        out.sample(f"{PREFIX}_job_last_finished_timestamp_seconds",
+                   int(datetime.fromisoformat(finished_at).timestamp()), job=job_id)
+
+
+async def render_metrics() -> str:
+    """Текст /metrics. Если БД недоступна, отдаются только метрики процесса."""
+    out = _Exposition()
+    _add_process_metrics(out)
+
+    out.declare(f"{PREFIX}_db_up", "gauge", "Удалось ли прочитать метрики из БД")
+    try:
+        data = await asyncio.to_thread(collect_db_metrics)
+    except Exception as e:
+        logger.error(f"Ошибка при сборе метрик из БД: {e}")
+        out.sample(f"{PREFIX}_db_up", 0)
+    else:
+        out.sample(f"{PREFIX}_db_up", 1)
+        _add_db_metrics(out, data)
+
+    return out.text()
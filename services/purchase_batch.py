@@ -0,0 +1,106 @@
+"""
+Разбор нескольких покупок из одного сообщения.
+
+Каждая строка: название (или латинское название) лекарства, количество и
+необязательная цена за всю покупку:
+
+    Алзепил 30
+    Мемантин 60 1250
+    Сероквель -2
+
+Число в конце названия ("Мадопар 250 30") неоднозначно: это может быть
+часть названия или количество перед ценой. Сначала строка читается без
+цены, и только если такого лекарства нет - с ценой. Нечёткий поиск
+(опечатки) применяется, только если ни одно прочтение не совпало точно или
+подстрокой, и тогда прочтение с ценой проверяется первым: иначе «Алзепил
+30 1200» нашлось бы как «Алзепил 30» с количеством 1200.
+"""
+import re
+
+from services import medicine_search
+from services.meds_service import match_medicines
+
+# Быстрая проверка формы строки без обращения к каталогу (для фильтра хендлера)
+_LINE = re.compile(r"^\S.*\s[+-]?\d+(?:\s+\d+(?:[.,]\d+)?)?$")
+_INTEGER = re.compile(r"^[+-]?\d+$")
+_PRICE = re.compile(r"^\d+(?:[.,]\d+)?$")
+
+
+def looks_like_batch(text: str) -> bool:
+    """Все непустые строки имеют вид "название количество [цена]" (и это не команда)."""
+    if not text or text.startswith("/"):
+        return False
+    lines = [line.strip() for line in (text or "").splitlines() if line.strip()]
+    return bool(lines) and all(_LINE.match(line) for line in lines)
+
+
+def _candidates(tokens: list):
+    """Варианты прочтения строки: (название, количество, цена); сначала без цены."""
+    if len(tokens) >= 2 and _INTEGER.match(tokens[-1]):
+        yield " ".join(tokens[:-1]), int(tokens[-1]), None
+    if len(tokens) >= 3 and _INTEGER.match(tokens[-2]) and _PRICE.match(tokens[-1]):
+        yield " ".join(tokens[:-2]), int(tokens[-2]), float(tokens[-1].replace(",", "."))
+
+
+def names_known_medicine(medicines: list, line: str) -> bool:
+    """Название в строке однозначно совпадает с лекарством (точно или подстрокой, без опечаток)."""
+    return any(
+        len(match_medicines(medicines, name)) == 1
+        for name, _, _ in _candidates(line.split())
+    )
+
+
+def _parse_line(household_id: int, medicines: list, line: str):
+    """Одна строка -> (покупка, None) или (None, причина ошибки)."""
+    candidates = list(_candidates(line.split()))
+    readings = [(candidate, match_medicines(medicines, candidate[0])) for candidate in candidates]
+    if not any(matches for _, matches in readings):
+        readings = [
+            (candidate, medicine_search.find_medicines(household_id, candidate[0], medicines))
+            for candidate in reversed(candidates)
+        ]
+
+    reason = "ожидается «название количество [цена]»"
+    for (name, quantity, price), matches in readings:
+        if not matches:
+            reason = f"лекарство «{name}» не найдено"
+            continue
+        if len(matches) > 1:
+            return None, "подходит несколько: " + ", ".join(med["name"] for med in matches)
+        if quantity == 0:
+            return None, "количество не может быть нулевым"
+        if price is not None and quantity < 0:
+            return None, "цена указывается только для покупки"
+
+        medicine = matches[0]
+        return {
+            "medicine_id": medicine["id"],
+            "name": medicine["name"],
+            "quantity": quantity,
+            "price": price,
+            "current_stock": medicine["current_stock"],
+        }, None
+
+    return None, reason
+
+
+def parse_purchase_lines(household_id: int, medicines: list, text: str):
+    """Разбирает строки покупок по списку лекарств домохозяйства.
+
+    Возвращает (items, errors): items - словари medicine_id, name, quantity,
+    price, current_stock; errors - (строка, причина) для строк, которые не
+    удалось сопоставить.
+    """
+    items = []
+    errors = []
+
+    for line in (line.strip() for line in text.splitlines()):
+        if not line:
+            continue
+        item, reason = _parse_line(household_id, medicines, line)
+        if item:
+            items.append(item)
+        else:
+            errors.append((line, reason))
+
+    return items, errors
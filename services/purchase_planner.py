@@ -0,0 +1,136 @@
+"""
+Планирование покупок с учётом размеров упаковок.
+
+Для каждого лекарства считается, сколько единиц понадобится до конца
+горизонта (по умолчанию - до окончания рецепта, если он задан, иначе
+PLAN_DEFAULT_HORIZON_DAYS дней; не дальше PLAN_MAX_HORIZON_DAYS), и
+подбирается набор упаковок, который покрывает нехватку с минимальным
+излишком (при равном излишке - меньшим числом упаковок).
+"""
+import math
+from datetime import date
+from functools import lru_cache
+
+from config import PLAN_DEFAULT_HORIZON_DAYS, PLAN_MAX_HORIZON_DAYS
+from services import dose_schedule
+
+# Сколько единиц подбирается точным перебором; остальное - крупными упаковками
+PACK_SEARCH_MAX_NEED = 2000
+
+
+def parse_package_sizes(value) -> list:
+    """Размеры упаковок из списка или строки "30,50,100" -> отсортированный список."""
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        value = [item for item in value.split(",") if item.strip()]
+    sizes = sorted({int(size) for size in value})
+    if any(size <= 0 for size in sizes):
+        raise ValueError("размер упаковки должен быть положительным")
+    return sizes
+
+
+def package_sizes_to_text(value) -> str | None:
+    """Размеры упаковок для хранения в БД (None - упаковки не заданы)."""
+    sizes = parse_package_sizes(value)
+    return ",".join(str(size) for size in sizes) or None
+
+
+@lru_cache(maxsize=4096)
+def best_pack_combination(need: int, sizes: tuple) -> tuple:
+    """Набор упаковок, покрывающий need единиц с минимальным излишком.
+
+    Возвращает кортеж пар (размер, количество) по убыванию размера;
+    пустой кортеж, если покупать не нужно. Динамическое программирование
+    по сумме: min_packs[a] - минимальное число упаковок, дающих ровно a единиц.
+    Если need больше PACK_SEARCH_MAX_NEED, сверх него берутся самые крупные
+    упаковки, а перебор идёт только по остатку - память и время не растут
+    с need.
+    """
+    if need <= 0 or not sizes:
+        return ()
+
+    largest = max(sizes)
+    bulk = max(0, need - PACK_SEARCH_MAX_NEED) // largest
+    if bulk:
+        counts = dict(best_pack_combination(need - bulk * largest, sizes))
+        counts[largest] = counts.get(largest, 0) + bulk
+        return tuple(sorted(counts.items(), reverse=True))
+
+    limit = need + largest
+    min_packs = [0] + [math.inf] * limit
+    last_size = [0] * (limit + 1)
+
+    for amount in range(1, limit + 1):
+        for size in sizes:
+            if size <= amount and min_packs[amount - size] + 1 < min_packs[amount]:
+                min_packs[amount] = min_packs[amount - size] + 1
+                last_size[amount] = size
+
+    # Первая достижимая сумма не меньше need даёт минимальный излишек
+    amount = next(a for a in range(need, limit + 1) if min_packs[a] != math.inf)
+
+    counts = {}
+    while amount > 0:
+        size = last_size[amount]
+        counts[size] = counts.get(size, 0) + 1
+        amount -= size
+
+    return tuple(sorted(counts.items(), reverse=True))
+
+
+def _horizon_days(med: dict, horizon_days: int | None, today: date) -> int:
+    """Горизонт планирования для лекарства в днях (не больше PLAN_MAX_HORIZON_DAYS)."""
+    if horizon_days is not None:
+        return min(horizon_days, PLAN_MAX_HORIZON_DAYS)
+
+    if med.get("expiry_date"):
+        expiry = date.fromisoformat(med["expiry_date"])
+        if expiry > today:
+            return min((expiry - today).days, PLAN_MAX_HORIZON_DAYS)
+
+    return PLAN_DEFAULT_HORIZON_DAYS
+
+
+def plan_purchases(medicines: list, horizon_days: int = None, rates: dict = None, today: date = None):
+    """Рекомендации по покупке для всех лекарств разом.
+
+    rates - фактический расход (medicine_id -> в день), если прогноз идёт по нему.
+    Возвращает список словарей, отсортированный по нехватке (сначала то, что нужно купить).
+    """
+    today = today or date.today()
+    plan = []
+
+    for med in medicines:
+        days = _horizon_days(med, horizon_days, today)
+
+        if rates and med["id"] in rates:
+            required = rates[med["id"]] * days
+        else:
+            required = dose_schedule.consumption_for_days(
+                med["dose_schedule"], med["daily_dose"], days, today
+            )
+
+        need = max(0, math.ceil(required - med["current_stock"]))
+        sizes = tuple(med.get("package_sizes") or ())
+        packs = best_pack_combination(need, sizes)
+        units = sum(size * count for size, count in packs) if sizes else need
+
+        plan.append({
+            "medicine_id": med["id"],
+            "name": med["name"],
+            "horizon_days": days,
+            "required": required,
+            "need": need,
+            "packs": packs,
+            "units": units,
+            "leftover": units - need
+        })
+
+    plan.sort(key=lambda item: -item["need"])
+    return plan
+
+
+def format_packs(packs: tuple) -> str:
+    """Текстовое описание набора упаковок: "2 × 30 + 1 × 50"."""
+    return " + ".join(f"{count} × {size}" for size, count in packs)
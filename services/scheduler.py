@@ -1,105 +1,121 @@
 import logging
-from datetime import datetime, date
+from datetime import date, datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from aiogram import Bot
 
+from config import SCHEDULER_HEARTBEAT_SECONDS
 from services import meds_service
+from services import leader_election
+from services import status_board
+from services import backup
 from utils.emojis import EMOJI_REMINDER_PRESCRIPTION, EMOJI_REMINDER_MEDICINE
+from utils import perf, sql_trace
 
 logger = logging.getLogger(__name__)
 
 scheduler = None
+is_leader = False
+
+# Ночные задачи: id задачи -> функция. Выполняются только ведущим процессом
+NIGHTLY_JOBS = {}
 
 
 async def check_prescriptions(bot: Bot):
-    """Проверяет рецепты и отправляет напоминания за 30 дней до окончания."""
+    """Проверяет рецепты всех домохозяйств и отправляет напоминания за 30 дней до окончания."""
+    try:
+        for household in meds_service.get_all_households():
+            await check_household_prescriptions(bot, household)
+    except Exception as e:
+        logger.error(f"Ошибка при проверке рецептов: {e}")
+
+
+async def check_household_prescriptions(bot: Bot, household: dict):
+    """Проверяет рецепты одного домохозяйства и напоминает его участникам."""
     try:
-        medicines = meds_service.get_all_medicines()
-        today = date.today()
-        users = meds_service.get_all_users()
+        users = meds_service.get_household_user_ids(household["id"])
         
         if not users:
-            logger.info("Нет зарегистрированных пользователей для отправки напоминаний")
+            logger.info(f"Нет пользователей для отправки напоминаний (household_id={household['id']})")
             return
         
-        for med in medicines:
-            medicine_id = med["id"]
-            expiry_date_str = meds_service.get_prescription_expiry(medicine_id)
-            
-            if not expiry_date_str:
-                continue
+        # Рецепты, которые заканчиваются ровно через 30 дней - выборка по дате в SQL
+        expiry_date = date.today() + timedelta(days=30)
+        
+        for name in meds_service.get_prescriptions_expiring_on(household["id"], expiry_date):
+            message = (
+                f"{EMOJI_REMINDER_PRESCRIPTION} Через месяц заканчивается рецепт на <b>{name}</b> "
+                f"({household['name']}).\n"
+                f"Свяжись с врачом и получи новый рецепт."
+            )
             
-            # Парсим дату окончания
-            try:
-                expiry_date = datetime.fromisoformat(expiry_date_str).date()
-            except (ValueError, AttributeError):
-                # Если формат не ISO, пробуем YYYY-MM-DD
+            for tg_user_id in users:
                 try:
-                    expiry_date = datetime.strptime(expiry_date_str, "%Y-%m-%d").date()
-                except ValueError:
-                    logger.warning(f"Не удалось распарсить дату рецепта: {expiry_date_str}")
-                    continue
-            
-            days_left = (expiry_date - today).days
-            
-            if days_left == 30:
-                message = (
-                    f"{EMOJI_REMINDER_PRESCRIPTION} Через месяц заканчивается рецепт на <b>{med['name']}</b>.\n"
-                    f"Свяжись с врачом и получи новый рецепт."
-                )
-                
-                for tg_user_id in users:
-                    try:
-                        await bot.send_message(tg_user_id, message)
-                        logger.info(f"Отправлено напоминание о рецепте для {med['name']} пользователю {tg_user_id}")
-                    except Exception as e:
-                        logger.error(f"Ошибка при отправке напоминания пользователю {tg_user_id}: {e}")
+                    await bot.send_message(tg_user_id, message)
+                    perf.increment("reminders.sent")
+                    logger.info(f"Отправлено напоминание о рецепте для {name} пользователю {tg_user_id}")
+                except Exception as e:
+                    perf.increment("reminders.failed")
+                    logger.error(f"Ошибка при отправке напоминания пользователю {tg_user_id}: {e}")
     
     except Exception as e:
-        logger.error(f"Ошибка при проверке рецептов: {e}")
+        logger.error(f"Ошибка при проверке рецептов (household_id={household['id']}): {e}")
 
 
 async def check_stock(bot: Bot):
-    """Проверяет остатки лекарств и отправляет напоминания за notify_before_days дней до окончания."""
+    """Проверяет остатки лекарств всех домохозяйств."""
     try:
-        # Сначала уменьшаем остатки на daily_dose
-        meds_service.decrease_daily_stock()
+        for household in meds_service.get_all_households():
+            await check_household_stock(bot, household)
+    except Exception as e:
+        logger.error(f"Ошибка при проверке остатков: {e}")
+
+
+async def check_household_stock(bot: Bot, household: dict):
+    """Уменьшает остатки домохозяйства и отправляет напоминания за notify_before_days дней до окончания."""
+    try:
+        # Сначала уменьшаем остатки на сегодняшнюю дозу
+        meds_service.decrease_daily_stock(household["id"])
         
-        medicines = meds_service.get_all_medicines()
-        users = meds_service.get_all_users()
+        # Остатки и дата в заголовке поменялись - обновляем закреплённые сводки
+        await status_board.refresh_household(bot, household["id"])
+        
+        users = meds_service.get_household_user_ids(household["id"])
         
         if not users:
-            logger.info("Нет зарегистрированных пользователей для отправки напоминаний")
+            logger.info(f"Нет пользователей для отправки напоминаний (household_id={household['id']})")
             return
         
+        medicines = meds_service.get_all_medicines(household["id"])
+        rates = meds_service.get_projection_rates(household["id"])
+        patient = household["name"]
+        
         for med in medicines:
-            medicine_id = med["id"]
             name = med["name"]
             daily_dose = med["daily_dose"]
             current_stock = med["current_stock"]
             notify_before_days = med["notify_before_days"]
             
-            if daily_dose <= 0:
+            if daily_dose <= 0 and not med["dose_schedule"]:
                 continue
             
             # Рассчитываем дни до окончания
-            days_left = int(current_stock / daily_dose) if current_stock > 0 else 0
+            days_left = meds_service.calculate_medicine_days_left(med, rates)
             
             # Проверяем, нужно ли отправить напоминание
             message = None
             if days_left == notify_before_days:
                 message = (
-                    f"{EMOJI_REMINDER_MEDICINE} Через {notify_before_days} дней у мамы закончится <b>{name}</b>.\n"
+                    f"{EMOJI_REMINDER_MEDICINE} Через {notify_before_days} дней закончится <b>{name}</b> ({patient}).\n"
                     f"Купи, пожалуйста, новые упаковки."
                 )
             elif days_left == 5 and notify_before_days != 5:
                 message = (
-                    f"{EMOJI_REMINDER_MEDICINE} Осталось 5 дней до окончания <b>{name}</b>.\n"
+                    f"{EMOJI_REMINDER_MEDICINE} Осталось 5 дней до окончания <b>{name}</b> ({patient}).\n"
                     f"Напоминаю купить новые упаковки."
                 )
             elif days_left == 0:
                 message = (
-                    f"{EMOJI_REMINDER_MEDICINE} У мамы закончилось <b>{name}</b>!\n"
+                    f"{EMOJI_REMINDER_MEDICINE} Закончилось <b>{name}</b> ({patient})!\n"
                     f"Срочно купи новые упаковки."
                 )
 
@@ -107,16 +123,93 @@ async def check_stock(bot: Bot):
                 for tg_user_id in users:
                     try:
                         await bot.send_message(tg_user_id, message)
+                        perf.increment("reminders.sent")
                         logger.info(f"Отправлено напоминание об остатке для {name} пользователю {tg_user_id}")
                     except Exception as e:
+                        perf.increment("reminders.failed")
                         logger.error(f"Ошибка при отправке напоминания пользователю {tg_user_id}: {e}")
     
     except Exception as e:
-        logger.error(f"Ошибка при проверке остатков: {e}")
+        logger.error(f"Ошибка при проверке остатков (household_id={household['id']}): {e}")
+
+
+async def backup_database(bot: Bot):
+    """Снимает ночную резервную копию БД."""
+    try:
+        await backup.create_backup()
+    except Exception as e:
+        logger.error(f"Ошибка при резервном копировании БД: {e}")
+
+
+NIGHTLY_JOBS.update({
+    "check_prescriptions": check_prescriptions,
+    "check_stock": check_stock,
+    "backup_database": backup_database,
+})
+
+
+async def run_nightly_job(job_id: str, bot: Bot):
+    """Запускает ночную задачу, если этот процесс ведущий и задача сегодня ещё не выполнялась."""
+    global is_leader
+    
+    # Продлеваем аренду прямо перед запуском: за время с последнего heartbeat
+    # ведущим мог стать другой процесс
+    is_leader = leader_election.try_acquire_lease()
+    if not is_leader:
+        logger.info(f"Задача {job_id} пропущена: процесс {leader_election.WORKER_ID} не ведущий")
+        return
+    
+    run_date = date.today().isoformat()
+    if not leader_election.claim_job_run(job_id, run_date):
+        logger.info(f"Задача {job_id} за {run_date} уже выполнялась")
+        return
+    
+    with perf.Timer(f"job.{job_id}"), sql_trace.unit_of_work(f"job:{job_id}"):
+        await NIGHTLY_JOBS[job_id](bot)
+    leader_election.finish_job_run(job_id, run_date)
+
+
+async def leader_heartbeat(bot: Bot):
+    """Продлевает аренду ведущего; новый ведущий догоняет пропущенные за сегодня задачи."""
+    global is_leader
+    
+    was_leader = is_leader
+    previous_holder = None if was_leader else leader_election.get_lease_holder()
+    is_leader = leader_election.try_acquire_lease()
+    
+    if is_leader and not was_leader:
+        logger.info(f"Процесс {leader_election.WORKER_ID} стал ведущим планировщиком")
+        
+        # Аренда освобождается при штатной остановке, поэтому чужая запись
+        # означает, что прежний ведущий упал. Тогда выполняем задачи, которые
+        # сегодня ещё не запускались
+        if previous_holder is None or previous_holder == leader_election.WORKER_ID:
+            return
+        
+        # Задачи запускаются отдельными разовыми заданиями, а не здесь: долгий
+        # догоняющий запуск не должен задерживать продление аренды
+        run_date = date.today().isoformat()
+        for job_id in NIGHTLY_JOBS:
+            if not leader_election.has_job_run(job_id, run_date):
+                logger.info(f"Догоняющий запуск задачи {job_id} за {run_date}")
+                scheduler.add_job(
+                    run_nightly_job,
+                    args=(job_id, bot),
+                    id=f"{job_id}_catch_up",
+                    replace_existing=True,
+                    misfire_grace_time=None,
+                    next_run_time=datetime.now()
+                )
+    elif was_leader and not is_leader:
+        logger.warning(f"Процесс {leader_election.WORKER_ID} потерял роль ведущего")
 
 
 async def start_scheduler(bot: Bot):
-    """Запускает планировщик задач."""
+    """Запускает планировщик задач.
+    
+    Планировщик запускается в каждом процессе бота, но ночные задачи
+    выполняет только держатель аренды в scheduler_leases.
+    """
     global scheduler
     
     if scheduler is not None:
@@ -125,27 +218,45 @@ async def start_scheduler(bot: Bot):
     
     scheduler = AsyncIOScheduler()
     
-    # Ежедневная проверка в полночь (00:00)
-    scheduler.add_job(
-        check_prescriptions,
-        trigger="cron",
-        hour=0,
-        minute=0,
-        args=(bot,),
-        id="check_prescriptions",
-        replace_existing=True
-    )
+    # Ежедневные проверки в полночь (00:00)
+    for job_id in NIGHTLY_JOBS:
+        scheduler.add_job(
+            run_nightly_job,
+            trigger="cron",
+            hour=0,
+            minute=0,
+            args=(job_id, bot),
+            id=job_id,
+            replace_existing=True
+        )
     
     scheduler.add_job(
-        check_stock,
-        trigger="cron",
-        hour=0,
-        minute=0,
+        leader_heartbeat,
+        trigger="interval",
+        seconds=SCHEDULER_HEARTBEAT_SECONDS,
         args=(bot,),
-        id="check_stock",
-        replace_existing=True
+        id="leader_heartbeat",
+        replace_existing=True,
+        next_run_time=datetime.now()
     )
     
     scheduler.start()
-    logger.info("Планировщик задач запущен (проверки в 00:00 ежедневно)")
+    logger.info(
+        f"Планировщик задач запущен (проверки в 00:00 ежедневно, "
+        f"процесс {leader_election.WORKER_ID})"
+    )
 
+
+async def stop_scheduler():
+    """Останавливает планировщик и освобождает аренду ведущего."""
+    global scheduler, is_leader
+    
+    if scheduler is None:
+        return
+    
+    scheduler.shutdown(wait=False)
+    scheduler = None
+    
+    if is_leader:
+        leader_election.release_lease()
+        is_leader = False
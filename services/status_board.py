@@ -0,0 +1,203 @@
+"""
+Живая сводка: одно закреплённое сообщение на пользователя (/live_status on).
+
+Сводка пересобирается после покупки, изменения рецепта и ночной проверки
+остатков, но сообщение редактируется (edit_message_text), только если
+изменился sha256 отрисованного текста - так одинаковые сводки не тратят
+вызовы Bot API и не вызывают ошибку «message is not modified».
+"""
+import hashlib
+import logging
+from datetime import date, datetime
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
+from db import get_connection
+from services import meds_service
+from utils import perf
+from utils.emojis import EMOJI_MEDICINE, EMOJI_STATUS
+
+logger = logging.getLogger(__name__)
+
+
+def format_status_card(item: dict) -> list:
+    """Строки карточки лекарства из get_status_for_user (для /status, inline-режима и сводки)."""
+    lines = []
+
+    # Формируем название с латинским названием, если есть
+    latin_name = item.get('latin_name')
+    if latin_name:
+        lines.append(f"{EMOJI_MEDICINE} <b>{item['name']}</b> ({latin_name})")
+    else:
+        lines.append(f"{EMOJI_MEDICINE} <b>{item['name']}</b>")
+
+    if item['schedule']:
+        lines.append(f"  Схема приёма: {item['schedule']}")
+    else:
+        lines.append(f"  Доза в день: {item['daily_dose']}")
+    lines.append(f"  Остаток: {item['current_stock']} единиц")
+    lines.append(f"  Хватит примерно на: {item['days_left']} дней")
+
+    if item['expiry_date']:
+        lines.append(f"  Рецепт до: {item['expiry_date']}")
+    else:
+        lines.append(f"  Рецепт: не задан")
+
+    return lines
+
+
+def render_board(household_id: int) -> str:
+    """Текст сводки. Время обновления не выводится - иначе текст менялся бы всегда."""
+    household = meds_service.get_household(household_id)
+    title = f"{EMOJI_STATUS} <b>Запас на {date.today().strftime('%d.%m.%Y')}</b>"
+    if household:
+        title += f" — {household['name']}"
+
+    text_lines = [title, ""]
+    for item in meds_service.get_status_for_user(household_id):
+        text_lines.extend(format_status_card(item))
+        text_lines.append("")
+    return "\n".join(text_lines).strip()
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _save_board(tg_user_id: int, chat_id: int, message_id: int, content_hash: str):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """INSERT INTO status_boards (tg_user_id, chat_id, message_id, content_hash, updated_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(tg_user_id) DO UPDATE SET
+                   chat_id = excluded.chat_id,
+                   message_id = excluded.message_id,
+                   content_hash = excluded.content_hash,
+                   updated_at = excluded.updated_at""",
+            (tg_user_id, chat_id, message_id, content_hash, datetime.now().isoformat())
+        )
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении сводки пользователя {tg_user_id}: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def get_board(tg_user_id: int):
+    """Закреплённая сводка пользователя: {"chat_id", "message_id", "content_hash"} или None."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT chat_id, message_id, content_hash FROM status_boards WHERE tg_user_id = ?",
+            (tg_user_id,)
+        )
+        row = cursor.fetchone()
+        if row:
+            return {"chat_id": row[0], "message_id": row[1], "content_hash": row[2]}
+        return None
+    finally:
+        conn.close()
+
+
+def _delete_board(tg_user_id: int):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("DELETE FROM status_boards WHERE tg_user_id = ?", (tg_user_id,))
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Ошибка при удалении сводки пользователя {tg_user_id}: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _household_boards(household_id: int):
+    """Сводки участников домохозяйства: (tg_user_id, chat_id, message_id, content_hash)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """SELECT b.tg_user_id, b.chat_id, b.message_id, b.content_hash
+               FROM status_boards b
+               JOIN users u ON u.tg_user_id = b.tg_user_id
+               WHERE u.household_id = ?""",
+            (household_id,)
+        )
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+async def enable(bot: Bot, tg_user_id: int, chat_id: int, household_id: int):
+    """Отправляет и закрепляет новую сводку (старая, если была, открепляется)."""
+    old = get_board(tg_user_id)
+    if old:
+        try:
+            await bot.unpin_chat_message(chat_id=old["chat_id"], message_id=old["message_id"])
+        except TelegramBadRequest as e:
+            logger.info(f"Старая сводка пользователя {tg_user_id} не откреплена: {e}")
+
+    text = render_board(household_id)
+    message = await bot.send_message(chat_id, text)
+    await bot.pin_chat_message(chat_id=chat_id, message_id=message.message_id, disable_notification=True)
+    _save_board(tg_user_id, chat_id, message.message_id, _content_hash(text))
+    logger.info(f"Включена живая сводка для пользователя {tg_user_id}")
+
+
+async def disable(bot: Bot, tg_user_id: int) -> bool:
+    """Открепляет сводку и перестаёт её обновлять. False - сводки не было."""
+    board = get_board(tg_user_id)
+    if not board:
+        return False
+
+    try:
+        await bot.unpin_chat_message(chat_id=board["chat_id"], message_id=board["message_id"])
+    except TelegramBadRequest as e:
+        logger.info(f"Сводка пользователя {tg_user_id} не откреплена: {e}")
+    _delete_board(tg_user_id)
+    logger.info(f"Выключена живая сводка для пользователя {tg_user_id}")
+    return True
+
+
+async def refresh_household(bot: Bot, household_id: int):
+    """Обновляет сводки участников домохозяйства, у которых изменился текст.
+
+    Ошибки только пишутся в лог: сводка не должна ломать покупку или ночную задачу.
+    """
+    try:
+        boards = _household_boards(household_id)
+        if not boards:
+            return
+
+        text = render_board(household_id)
+        content_hash = _content_hash(text)
+
+        for tg_user_id, chat_id, message_id, old_hash in boards:
+            if old_hash == content_hash:
+                perf.increment("status_board.unchanged")
+                continue
+
+            try:
+                await bot.edit_message_text(text=text, chat_id=chat_id, message_id=message_id)
+                perf.increment("status_board.edited")
+            except TelegramBadRequest as e:
+                if "not modified" not in str(e):
+                    # Сообщение удалено пользователем - больше не обновляем
+                    logger.warning(f"Сводка пользователя {tg_user_id} недоступна, отключаем: {e}")
+                    _delete_board(tg_user_id)
+                    continue
+            _save_board(tg_user_id, chat_id, message_id, content_hash)
+    except Exception as e:
+        logger.error(f"Ошибка при обновлении сводок (household_id={household_id}): {e}")
@@ -0,0 +1,130 @@
+"""
+График остатка лекарства для /chart.
+
+История остатка начинается не раньше первой покупки лекарства и
+восстанавливается назад от текущего значения: за каждый день прибавляется
+списанная доза (по схеме приёма, daily_dose или фактическому расходу при
+USE_OBSERVED_CONSUMPTION) и вычитаются покупки этого дня. Ночная задача не
+списывает с нулевого остатка, поэтому назад от дня, когда лекарство
+кончилось, остаток не восстановить - эти дни считаются вперёд от первой
+покупки (с нулевого остатка, доза не списывается, пока остаток 0). Прогноз - тот же расход вперёд до даты окончания, не дальше
+CHART_FORECAST_DAYS дней.
+
+Ряды собираются в процессе бота (несколько лёгких запросов), а рисуются в
+рабочем процессе (services/workers.py). Готовый PNG кэшируется по
+отпечатку рядов: пока не изменились остаток, покупки, доза, рецепт или
+текущая дата, повторный /chart отдаётся из кэша без рисования.
+"""
+import hashlib
+import json
+import logging
+from datetime import date, timedelta
+
+from config import CHART_HISTORY_DAYS, CHART_FORECAST_DAYS
+from services import dose_schedule, meds_service, workers
+from services.chart_render import render_stock_chart
+from utils import perf
+
+logger = logging.getLogger(__name__)
+
+# medicine_id -> (отпечаток рядов, PNG)
+_cache = {}
+
+
+def build_chart_data(medicine: dict, rates: dict = None, today: date = None) -> dict:
+    """Ряды для графика (только сериализуемые значения - передаются в рабочий процесс)."""
+    today = today or date.today()
+    start = today - timedelta(days=CHART_HISTORY_DAYS)
+    schedule_json = medicine["dose_schedule"]
+    schedule = dose_schedule.parse_schedule(schedule_json)
+    rate = (rates or {}).get(medicine["id"])
+
+    def dose(day: date) -> float:
+        return rate if rate is not None else dose_schedule.dose_on(schedule, medicine["daily_dose"], day)
+
+    # Все покупки, а не только за период: с первой из них считается история
+    purchases = meds_service.get_daily_purchase_totals(medicine["id"], "")
+    first_purchase = date.fromisoformat(min(purchases)) if purchases else None
+    if first_purchase and first_purchase > start:
+        start = first_purchase
+
+    # Назад от сегодняшнего остатка: до списания и покупок дня остаток был
+    # больше на дозу и меньше на покупки. Если после списания остаток был 0,
+    # дозу могли и не списывать - дальше назад остаток неизвестен
+    stock = medicine["current_stock"]
+    history = [(today.isoformat(), stock)]
+    day = today
+    while day > start:
+        stock -= purchases.get(day.isoformat(), 0)
+        if stock <= 0:
+            break
+        stock += dose(day)
+        day -= timedelta(days=1)
+        history.append((day.isoformat(), round(stock, 2)))
+
+    if day > start:
+        # Дни до этого считаются вперёд от первой покупки с нулевого остатка
+        forward = []
+        stock = 0
+        current = first_purchase or start
+        while current < day:
+            if stock > 0:
+                stock = max(0, stock - dose(current))
+            stock += purchases.get(current.isoformat(), 0)
+            if current >= start:
+                forward.append((current.isoformat(), round(stock, 2)))
+            current += timedelta(days=1)
+        history.extend(reversed(forward))
+    history.reverse()
+
+    forecast = []
+    runout = None
+    if rate is not None or medicine["daily_dose"] > 0 or schedule:
+        days_left = meds_service.calculate_medicine_days_left(medicine, rates)
+        runout = today + timedelta(days=days_left)
+        for offset in range(min(days_left, CHART_FORECAST_DAYS) + 1):
+            if rate is not None:
+                consumed = rate * offset
+            else:
+                consumed = dose_schedule.consumption_for_days(
+                    schedule_json, medicine["daily_dose"], offset, today
+                )
+            forecast.append(((today + timedelta(days=offset)).isoformat(),
+                             round(max(0, medicine["current_stock"] - consumed), 2)))
+        if days_left < CHART_FORECAST_DAYS:
+            forecast.append((runout.isoformat(), 0))
+
+    return {
+        "name": medicine["name"],
+        "today": today.isoformat(),
+        "end": (today + timedelta(days=CHART_FORECAST_DAYS)).isoformat(),
+        "history": history,
+        "forecast": forecast,
+        "purchases": sorted(
+            (day, quantity) for day, quantity in purchases.items() if quantity > 0 and day >= start.isoformat()
+        ),
+        "runout_date": runout.isoformat() if runout else None,
+        "expiry_date": medicine["expiry_date"],
+    }
+
+
+def _fingerprint(data: dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+async def get_chart(medicine: dict, rates: dict = None) -> bytes:
+    """PNG графика лекарства; рисуется заново, только если изменились данные."""
+    data = build_chart_data(medicine, rates)
+    fingerprint = _fingerprint(data)
+
+    cached = _cache.get(medicine["id"])
+    if cached and cached[0] == fingerprint:
+        perf.increment("chart.cached")
+        return cached[1]
+
+    with perf.Timer("chart.render"):
+        png = await workers.run(render_stock_chart, data)
+    _cache[medicine["id"]] = (fingerprint, png)
+    perf.increment("chart.rendered")
+    logger.info(f"Нарисован график medicine_id={medicine['id']} ({len(png)} байт)")
+    return png
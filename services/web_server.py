@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config import PERF_METRICS_ENABLED, READINESS_POLLING_STALE_SECONDS
+from db import get_connection
+from services import calendar_feed, leader_election, metrics, scheduler
+from utils import perf
+
+logger = logging.getLogger(__name__)
+
+CONFIG_KEY = web.AppKey("config", object)
+
+
+async def handle_healthz(request: web.Request) -> web.Response:
+    """Простая проверка живости процесса (для reverse proxy и оркестратора)."""
+    return web.json_response({"status": "ok"})
+
+
+def _ping_database():
+    """SELECT 1 и время последнего завершённого запуска ночных задач."""
+    conn = get_connection()
+    try:
+        conn.execute("SELECT 1").fetchone()
+    finally:
+        conn.close()
+    runs = leader_election.get_last_finished_runs()
+    return max(runs.values()) if runs else None
+
+
+async def handle_readyz(request: web.Request) -> web.Response:
+    """Готовность: БД отвечает, планировщик запущен, polling получает обновления.
+
+    Время последнего ночного запуска только сообщается: в свежей установке
+    его ещё нет, а задачи выполняет лишь один процесс из нескольких.
+    """
+    config = request.app[CONFIG_KEY]
+    checks = {}
+    body = {}
+
+    try:
+        body["last_nightly_run"] = await asyncio.to_thread(_ping_database)
+        checks["database"] = True
+    except Exception as e:
+        logger.error(f"Проверка готовности: БД недоступна: {e}")
+        checks["database"] = False
+
+    checks["scheduler"] = scheduler.scheduler is not None and scheduler.scheduler.running
+    body["scheduler_leader"] = scheduler.is_leader
+
+    # В режиме polling последний успешный getUpdates виден через ApiCallMiddleware
+    if config.BOT_MODE == "polling" and PERF_METRICS_ENABLED:
+        last_poll = perf.last_success("GetUpdates")
+        checks["polling"] = last_poll is not None and time.time() - last_poll < READINESS_POLLING_STALE_SECONDS
+        body["last_poll"] = datetime.fromtimestamp(last_poll).isoformat(timespec="seconds") if last_poll else None
+
+    ready = all(checks.values())
+    body.update(status="ok" if ready else "unavailable", checks=checks)
+    return web.json_response(body, status=200 if ready else 503)
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """Метрики в текстовом формате Prometheus."""
+    text = await metrics.render_metrics()
+    return web.Response(text=text, content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def handle_calendar(request: web.Request) -> web.Response:
+    """Отдаёт календарь .ics домохозяйства по ссылке с токеном."""
+    config = request.app[CONFIG_KEY]
+    household_id = int(request.match_info["household_id"])
+
+    if not calendar_feed.check_feed_token(household_id, request.match_info["token"], config.CALENDAR_SECRET):
+        raise web.HTTPNotFound()
+
+    feed = await asyncio.to_thread(calendar_feed.build_feed, household_id)
+    return web.Response(body=feed, content_type="text/calendar", charset="utf-8")
+
+
+def create_app(bot: Bot, dp: Dispatcher, config) -> web.Application:
+    """Создаёт aiohttp-приложение: health/readiness, метрики, календарь и (в режиме webhook) webhook-обработчик."""
+    app = web.Application()
+    app[CONFIG_KEY] = config
+    app.router.add_get("/healthz", handle_healthz)
+    app.router.add_get("/readyz", handle_readyz)
+    if config.METRICS_ENABLED:
+        app.router.add_get("/metrics", handle_metrics)
+
+    if config.CALENDAR_SECRET:
+        app.router.add_get(r"/calendar/{household_id:\d+}/{token:[0-9a-f]+}.ics", handle_calendar)
+
+    if config.BOT_MODE == "webhook":
+        # Обработчик webhook сам проверяет заголовок X-Telegram-Bot-Api-Secret-Token
+        # и отвечает 401, если секрет не совпал
+        SimpleRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            secret_token=config.WEBHOOK_SECRET
+        ).register(app, path=config.WEBHOOK_PATH)
+
+        # Привязываем startup/shutdown диспетчера к жизненному циклу приложения
+        setup_application(app, dp, bot=bot)
+
+    return app
+
+
+async def start_http_server(bot: Bot, dp: Dispatcher, config) -> web.AppRunner:
+    """Запускает HTTP-сервер и возвращает runner (остановить - runner.cleanup())."""
+    app = create_app(bot, dp, config)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=config.WEB_SERVER_HOST, port=config.WEB_SERVER_PORT)
+    await site.start()
+    logger.info(f"HTTP-сервер запущен на {config.WEB_SERVER_HOST}:{config.WEB_SERVER_PORT}")
+    return runner
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher, config):
+    """Запускает HTTP-сервер и регистрирует webhook в Telegram."""
+    if config.WEBHOOK_BASE_URL:
+        webhook_url = config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH
+        await bot.set_webhook(
+            url=webhook_url,
+            secret_token=config.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info(f"Webhook зарегистрирован: {webhook_url}")
+    else:
+        logger.warning("WEBHOOK_BASE_URL не задан — set_webhook не вызывается (локальный режим)")
+
+    runner = await start_http_server(bot, dp, config)
+    logger.info(f"Webhook: {config.WEBHOOK_PATH}")
+
+    try:
+        # Работаем, пока процесс не остановят
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
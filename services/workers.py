@@ -0,0 +1,55 @@
+"""
+Пул процессов для тяжёлой работы вне цикла событий (графики, отчёты).
+
+Рисование и сборка больших документов занимают процессор на сотни
+миллисекунд; в потоке они держали бы GIL и тормозили хендлеры, поэтому
+выполняются в отдельных процессах. Пул создаётся при первом обращении
+(WORKER_PROCESSES процессов) и запускает их через spawn: fork процесса,
+в котором уже работают потоки и цикл событий, небезопасен.
+
+Функции для пула должны быть на уровне модуля, а аргументы и результат -
+сериализуемыми (pickle).
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from config import WORKER_PROCESSES
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=WORKER_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Запущен пул рабочих процессов ({WORKER_PROCESSES})")
+    return _pool
+
+
+async def run(func, *args, **kwargs):
+    """Выполняет func(*args, **kwargs) в рабочем процессе и возвращает результат."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), partial(func, *args, **kwargs))
+    except BrokenProcessPool:
+        # Рабочий процесс упал (например, из-за нехватки памяти) - следующий вызов создаст новый пул
+        logger.error("Пул рабочих процессов сломан, будет пересоздан")
+        shutdown()
+        raise
+
+
+def shutdown():
+    """Останавливает пул (при остановке бота)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
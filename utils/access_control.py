@@ -2,10 +2,10 @@ import logging
 from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware, Bot
-from aiogram.types import Update, Message, CallbackQuery, TelegramObject
+from aiogram.types import Update, Message, CallbackQuery, InlineQuery, TelegramObject
 from aiogram.filters import BaseFilter
 
-from config import ALLOWED_USER_IDS
+from config import ALLOWED_USER_IDS, ADMIN_USER_IDS
 
 logger = logging.getLogger(__name__)
 
@@ -15,14 +15,17 @@ def check_user_access(user_id: int) -> bool:
     return user_id in ALLOWED_USER_IDS
 
 
+def check_admin_access(user_id: int) -> bool:
+    """Проверяет, является ли пользователь администратором бота."""
+    return user_id in ADMIN_USER_IDS
+
+
 class AccessControlFilter(BaseFilter):
     """Фильтр для проверки доступа пользователей по whitelist."""
     
-    async def __call__(self, message: Message | CallbackQuery, *args, **kwargs) -> bool:
+    async def __call__(self, message: Message | CallbackQuery | InlineQuery, *args, **kwargs) -> bool:
         user_id = None
-        if isinstance(message, Message) and message.from_user:
-            user_id = message.from_user.id
-        elif isinstance(message, CallbackQuery) and message.from_user:
+        if isinstance(message, (Message, CallbackQuery, InlineQuery)) and message.from_user:
             user_id = message.from_user.id
         
         if user_id is None:
@@ -47,21 +50,27 @@ class AccessControlMiddleware(BaseMiddleware):
         user_id = None
         message = None
         callback_query = None
+        inline_query = None
         
-        # Если это Update, извлекаем Message или CallbackQuery
+        # Если это Update, извлекаем Message, CallbackQuery или InlineQuery
         if isinstance(event, Update):
             message = event.message or event.edited_message
             callback_query = event.callback_query
+            inline_query = event.inline_query
         elif isinstance(event, Message):
             message = event
         elif isinstance(event, CallbackQuery):
             callback_query = event
+        elif isinstance(event, InlineQuery):
+            inline_query = event
         
-        # Получаем user_id из сообщения или callback-запроса
+        # Получаем user_id из сообщения, callback-запроса или inline-запроса
         if message and message.from_user:
             user_id = message.from_user.id
         elif callback_query and callback_query.from_user:
             user_id = callback_query.from_user.id
+        elif inline_query and inline_query.from_user:
+            user_id = inline_query.from_user.id
         
         # Проверяем доступ только если есть user_id
         if user_id is not None:
@@ -82,11 +91,14 @@ class AccessControlMiddleware(BaseMiddleware):
                             )
                         elif callback_query:
                             await callback_query.answer("❌ Доступ запрещён.", show_alert=True)
+                        elif inline_query:
+                            # Пустой ответ, чтобы чужой inline-запрос не висел до таймаута
+                            await inline_query.answer([], cache_time=0, is_personal=True)
                     except Exception as e:
                         logger.error(f"Ошибка при отправке сообщения об отказе в доступе: {e}")
                 
                 # Блокируем обработку - НЕ вызываем handler
                 return
         
-        # Если пользователь в whitelist или это не сообщение/callback, продолжаем обработку
+        # Если пользователь в whitelist или это не сообщение/callback/inline-запрос, продолжаем обработку
         return await handler(event, data)
@@ -0,0 +1,31 @@
+from datetime import date, datetime
+
+# Форматы, в которых даты могли попасть в БД до перехода на YYYY-MM-DD
+LEGACY_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y", "%Y/%m/%d")
+
+
+def to_iso_date(value) -> str:
+    """Приводит дату к каноническому виду YYYY-MM-DD для хранения в БД.
+    
+    Принимает date/datetime или строку в ISO-формате (в том числе с временем)
+    либо в одном из LEGACY_DATE_FORMATS. Бросает ValueError, если дату
+    не удалось распознать.
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        pass
+    
+    for date_format in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    
+    raise ValueError(f"не удалось распознать дату: {value!r}")
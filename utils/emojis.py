@@ -20,6 +20,9 @@ EMOJI_CALENDAR = "📅"  # Календарь/дата
 EMOJI_BOX = "📦"  # Коробка/пусто
 EMOJI_CLOCK = "⏰"  # Часы/время
 EMOJI_DOWN = "⬇️"  # Стрелка вниз
+EMOJI_CHART = "📈"  # Аналитика/график
+EMOJI_WARNING = "⚠️"  # Предупреждение
+EMOJI_CART = "🛒"  # План покупок
 
 # Эмодзи для напоминаний
 EMOJI_REMINDER_PRESCRIPTION = "‼️"  # Напоминание о рецепте
@@ -0,0 +1,3 @@
+def format_money(amount: float) -> str:
+    """Сумма в рублях с пробелами между разрядами: 12 345 ₽."""
+    return f"{amount:,.0f}".replace(",", " ") + " ₽"
@@ -0,0 +1,194 @@
+"""
+Встроенные счётчики производительности (в памяти процесса).
+
+- время обработки обновлений по хендлерам (PerfMiddleware);
+- число и время SQL-запросов (db.get_connection при PERF_METRICS_ENABLED);
+- длительность ночных задач (services/scheduler.py);
+- вызовы Bot API: успешные и с ошибкой (ApiCallMiddleware на сессии бота).
+
+Для каждой метрики хранится не больше PERF_RESERVOIR_SIZE замеров
+(reservoir sampling), поэтому память не растёт со временем работы, а
+перцентили остаются несмещённой оценкой по всем замерам. Счётчик и
+максимум считаются точно.
+"""
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+
+from config import PERF_RESERVOIR_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class Reservoir:
+    """Ограниченная выборка замеров (мс) с точными count, total и max."""
+
+    def __init__(self, size: int = PERF_RESERVOIR_SIZE):
+        self.size = size
+        self.samples = []
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            # Алгоритм R: каждый замер остаётся в выборке с вероятностью size / count
+            index = random.randrange(self.count)
+            if index < self.size:
+                self.samples[index] = value
+
+    def percentile(self, percent: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "max_ms": round(self.max, 3),
+        }
+
+
+_timings: Dict[str, Reservoir] = {}
+_counters: Dict[str, int] = {}
+# Время (unix) последнего успешного вызова Bot API по методу - для проверки готовности
+_last_success: Dict[str, float] = {}
+
+
+def record_timing(name: str, duration_ms: float):
+    """Добавляет замер времени в метрику name (например, "handler.purchases.cmd_add_purchase")."""
+    reservoir = _timings.get(name)
+    if reservoir is None:
+        reservoir = _timings[name] = Reservoir()
+    reservoir.add(duration_ms)
+
+
+def increment(name: str, value: int = 1):
+    """Увеличивает счётчик name."""
+    _counters[name] = _counters.get(name, 0) + value
+
+
+def timings(prefix: str = "") -> Dict[str, dict]:
+    """Сводка по метрикам времени, имена которых начинаются с prefix."""
+    return {
+        name: reservoir.summary()
+        for name, reservoir in sorted(_timings.items())
+        if name.startswith(prefix)
+    }
+
+
+def reservoirs(prefix: str = "") -> Dict[str, Reservoir]:
+    """Выборки замеров, имена которых начинаются с prefix (для экспорта в /metrics)."""
+    return {name: reservoir for name, reservoir in sorted(_timings.items()) if name.startswith(prefix)}
+
+
+def counters(prefix: str = "") -> Dict[str, int]:
+    """Значения счётчиков, имена которых начинаются с prefix."""
+    return {name: value for name, value in sorted(_counters.items()) if name.startswith(prefix)}
+
+
+def last_success(method: str):
+    """Время (unix) последнего успешного вызова метода Bot API (например, "GetUpdates") или None."""
+    return _last_success.get(method)
+
+
+def reset():
+    """Сбрасывает все метрики."""
+    _timings.clear()
+    _counters.clear()
+
+
+class Timer:
+    """Контекстный менеджер: with Timer("job.check_stock"): ..."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_timing(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+def handler_name(data: Dict[str, Any]) -> str:
+    """Имя хендлера вида "purchases.cmd_add_purchase" (модуль без пакета handlers)."""
+    handler = data.get("handler")
+    callback = getattr(handler, "callback", None)
+    if callback is None:
+        return "unknown"
+    module = callback.__module__.rsplit(".", 1)[-1]
+    return f"{module}.{callback.__name__}"
+
+
+class PerfMiddleware(BaseMiddleware):
+    """Замеряет время хендлеров сообщений и callback-запросов.
+
+    Регистрируется на диспетчере как внутренний middleware, поэтому
+    срабатывает только для обновлений, которые нашли хендлер.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        name = handler_name(data)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            increment(f"handler_errors.{name}")
+            raise
+        finally:
+            record_timing(f"handler.{name}", (time.perf_counter() - started) * 1000)
+
+
+class ApiCallMiddleware(BaseRequestMiddleware):
+    """Считает вызовы Bot API (успешные и с ошибкой) и их время."""
+
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            response = await make_request(bot, method)
+        except Exception:
+            increment(f"api.{name}.failed")
+            raise
+        finally:
+            record_timing(f"api.{name}", (time.perf_counter() - started) * 1000)
+        increment(f"api.{name}.ok")
+        _last_success[name] = time.time()
+        return response
+
+
+class UpdateCounterMiddleware(BaseMiddleware):
+    """Считает входящие обновления по типу (message, callback_query, ...)."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        increment(f"updates.{getattr(event, 'event_type', 'unknown')}")
+        return await handler(event, data)
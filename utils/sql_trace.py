@@ -0,0 +1,125 @@
+"""
+Трассировка SQL по единицам работы (обработка одного обновления или ночная задача).
+
+При SQL_TRACE_ENABLED каждый запрос из db.get_connection попадает в текущую
+единицу работы (contextvars, поэтому параллельные обновления не смешиваются).
+Запросы группируются по «форме» - тексту с литералами, заменёнными на ?.
+В конце единицы работы в лог пишется сводка (число запросов, время, самые
+частые формы), а если одна форма выполнилась больше SQL_TRACE_REPEAT_THRESHOLD
+раз - предупреждение о возможном N+1 (запрос в цикле вместо одного запроса
+со списком или JOIN).
+"""
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from config import SQL_TRACE_REPEAT_THRESHOLD
+from utils.perf import handler_name
+
+logger = logging.getLogger(__name__)
+
+# Сколько самых частых форм запросов показывать в сводке
+SUMMARY_TOP_SHAPES = 5
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class UnitOfWork:
+    """Запросы одной единицы работы: форма -> [количество, суммарное время мс]."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements = {}
+        self.started = time.perf_counter()
+
+    def add(self, sql: str, duration_ms: float):
+        stats = self.statements.setdefault(normalize(sql), [0, 0.0])
+        stats[0] += 1
+        stats[1] += duration_ms
+
+    @property
+    def query_count(self) -> int:
+        return sum(count for count, _ in self.statements.values())
+
+    @property
+    def query_time_ms(self) -> float:
+        return sum(total for _, total in self.statements.values())
+
+    def repeated(self, threshold: int = SQL_TRACE_REPEAT_THRESHOLD):
+        """Формы, выполненные больше threshold раз (кандидаты в N+1)."""
+        return [
+            (shape, count, total)
+            for shape, (count, total) in self.statements.items()
+            if count > threshold
+        ]
+
+
+_current_unit: ContextVar = ContextVar("sql_trace_unit", default=None)
+
+
+def normalize(sql: str) -> str:
+    """Форма запроса: литералы заменены на ?, списки IN (?, ?, ...) свёрнуты, пробелы схлопнуты."""
+    shape = _STRING_LITERAL.sub("?", sql)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("(?, ...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def record(sql: str, duration_ms: float):
+    """Добавляет запрос в текущую единицу работы (если она есть)."""
+    unit = _current_unit.get()
+    if unit is not None:
+        unit.add(sql, duration_ms)
+
+
+def _report(unit: UnitOfWork):
+    elapsed_ms = (time.perf_counter() - unit.started) * 1000
+    top = sorted(unit.statements.items(), key=lambda item: item[1][0], reverse=True)[:SUMMARY_TOP_SHAPES]
+    top_text = "; ".join(f"{count}× {shape[:120]}" for shape, (count, _) in top)
+    logger.info(
+        f"SQL [{unit.name}]: запросов {unit.query_count}, форм {len(unit.statements)}, "
+        f"SQL {unit.query_time_ms:.1f} мс из {elapsed_ms:.1f} мс. Чаще всего: {top_text}"
+    )
+
+    for shape, count, total in unit.repeated():
+        logger.warning(
+            f"Возможный N+1 в [{unit.name}]: запрос выполнен {count} раз ({total:.1f} мс): {shape}"
+        )
+
+
+@contextmanager
+def unit_of_work(name: str):
+    """Единица работы для трассировки. Вложенная единица работы сливается с внешней."""
+    if _current_unit.get() is not None:
+        yield _current_unit.get()
+        return
+
+    unit = UnitOfWork(name)
+    token = _current_unit.set(unit)
+    try:
+        yield unit
+    finally:
+        _current_unit.reset(token)
+        _report(unit)
+
+
+class SqlTraceMiddleware(BaseMiddleware):
+    """Оборачивает каждый хендлер в единицу работы трассировки SQL."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        with unit_of_work(f"handler:{handler_name(data)}"):
+            return await handler(event, data)